@@ -1,109 +1,334 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from bs4 import BeautifulSoup
-from io import StringIO
+import argparse
+import re
+import os
 import pandas as pd
 import time
 
-driver=webdriver.Chrome()
-# các liên kết đến các bảng dữ liệu
-links = {
-    "Standard": ("https://fbref.com/en/comps/9/stats/Premier-League-Stats", "stats_standard"),
-    "Goalkeeping": ("https://fbref.com/en/comps/9/keepers/Premier-League-Stats", "stats_keeper"),
-    "Shooting": ("https://fbref.com/en/comps/9/shooting/Premier-League-Stats", "stats_shooting"),
-    "Passing": ("https://fbref.com/en/comps/9/passing/Premier-League-Stats", "stats_passing"),
-    "GnS Creation": ("https://fbref.com/en/comps/9/gca/Premier-League-Stats", "stats_gca"),
-    "Defensive act": ("https://fbref.com/en/comps/9/defense/Premier-League-Stats", "stats_defense"),
-    "Possession": ("https://fbref.com/en/comps/9/possession/Premier-League-Stats", "stats_possession"),
-    "Misc": ("https://fbref.com/en/comps/9/misc/Premier-League-Stats", "stats_misc")
+from fetcher import make_fetcher, fetch_concurrently
+from cleaning import clean_fbref_table
+from table_extract import extract_table
+from http_cache import CACHE_MODES
+from jobs import JobLedger, run_jobs
+from incremental import Manifest, SnapshotStore, fingerprint_config, fingerprint_text, table_markup
+from schema import (PARTITIONS_DIR, RESULTS_CSV_PATH, columns_to_keep, partition_csv_path,
+                    partition_id, typed_path, write_results)
+from instrumentation import traced
+
+# --- Cấu hình tải trang ---
+MAX_WORKERS = 4  # Số bảng được tải song song
+MIN_REQUEST_INTERVAL_S = 3.0  # Khoảng cách tối thiểu giữa 2 request tới cùng host
+FETCHER_BACKEND = "http"  # "http": HTTP thuần, chỉ mở Chrome khi thiếu bảng; "selenium": luôn dùng Chrome
+CACHE_MODE = "default"  # "default" | "refresh" | "cache-only" (không cần mạng) | "off"
+OUTPUT_CSV_PATH = RESULTS_CSV_PATH
+JOIN_KEYS = ["Player", "Squad"]
+TABLE_FORMAT_VERSION = 2  # Tăng khi cách phân tích bảng thay đổi để các bản Parquet cũ bị tạo lại
+
+# Các giải đấu: tên dùng trên URL của fbref -> mã giải
+COMPETITIONS = {
+    "Premier-League": 9,
+    "La-Liga": 12,
+    "Serie-A": 11,
+    "Bundesliga": 20,
+    "Ligue-1": 13,
+}
+# Các bảng thống kê: tên bảng -> (đường dẫn trang trên fbref, id của bảng)
+TABLE_PAGES = {
+    "Standard": ("stats", "stats_standard"),
+    "Goalkeeping": ("keepers", "stats_keeper"),
+    "Shooting": ("shooting", "stats_shooting"),
+    "Passing": ("passing", "stats_passing"),
+    "GnS Creation": ("gca", "stats_gca"),
+    "Defensive act": ("defense", "stats_defense"),
+    "Possession": ("possession", "stats_possession"),
+    "Misc": ("misc", "stats_misc"),
 }
 
-dfs=[]
+def build_links(competition="Premier-League", season=None):
+    """
+    Tạo các liên kết đến 8 bảng dữ liệu của một giải trong một mùa.
+    `season` dạng "2023-2024"; None là mùa hiện tại.
+    """
+    comp_id = COMPETITIONS[competition]
+    season_path = f"{season}/" if season else ""
+    season_prefix = f"{season}-" if season else ""
+    return {
+        name: (f"https://fbref.com/en/comps/{comp_id}/{season_path}{page}/{season_prefix}{competition}-Stats", table_id)
+        for name, (page, table_id) in TABLE_PAGES.items()
+    }
+
+# các liên kết đến các bảng dữ liệu (Premier League, mùa hiện tại)
+links = build_links()
+
+# Hàm tách bảng từ mã HTML của trang
+@traced()
+def parse_table(html, table_id):
+    # Chỉ phân tích đoạn mã của bảng (kể cả bảng nằm trong comment), không dựng cây cho cả trang
+    df = extract_table(html, table_id)
+    # Bỏ hàng tiêu đề lặp lại / hàng phân cách và chuyển các cột số sang kiểu số
+    return clean_fbref_table(df)
+
+def table_key(url, table_id):
+    return f"{url}#{table_id}"
+
 # Hàm để lấy dữ liệu từ các bảng
-def scraping(url, table_id):
-    driver.get(url)
-    time.sleep(5)
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    table = soup.find("table", {"id": table_id})
-    df = pd.read_html(StringIO(str(table)), header=1)[0]
-    df=df[~df["Rk"].str.contains("Rk", na=False)]
-    df = df[df.apply(lambda row: not any(row.astype(str) == row.name), axis=1)]
+@traced()
+def scraping(url, table_id, fetcher, manifest=None, store=None):
+    """
+    Tải và phân tích một bảng. Nếu có `manifest` và `store`, bảng chỉ được phân tích lại
+    khi nội dung bảng khác với lần trước; ngược lại đọc từ bản Parquet đã lưu.
+    """
+    html = fetcher.fetch(url, table_id=table_id)
+    if manifest is None or store is None:
+        return parse_table(html, table_id)
+    key = table_key(url, table_id)
+    fingerprint = fingerprint_text(f"{TABLE_FORMAT_VERSION}:{table_markup(html, table_id)}")
+    if manifest.table_fingerprint(key) == fingerprint and store.exists(key):
+        return store.load(key)
+    df = parse_table(html, table_id)
+    store.save(key, df)
+    manifest.set_table_fingerprint(key, fingerprint)
+    print(f"Bảng {table_id} có nội dung mới, đã cập nhật bản lưu.")
     return df
-all_df = None
-# Duyệt qua từng liên kết và lấy dữ liệu, sau đó gộp lại
-for name, (url, table_id) in links.items():
-    df = scraping(url, table_id)
-    if all_df is None:
-        all_df = df
-    else:
-        all_df = pd.merge(all_df, df, on=["Player", "Squad"], how="outer", suffixes=("", f"_{name}"))
-        print(f"Gộp với {name} xong, kích thước all_df: {all_df.shape}")
-# Các cột cần giữ lại trong DataFrame
-columns_to_keep = [
-    # Thông tin cơ bản
-    "Player", "Squad", "Nation", "Pos", "Age",
-    # Thời gian thi đấu
-    "MP", "Starts", "Min",
-    # Hiệu suất thi đấu
-    "Gls", "Ast", "CrdY", "CrdR",
-    # Chỉ số kỳ vọng
-    "xG", "xAG",
-    # Tiến triển bóng
-    "PrgC", "PrgP", "PrgR",
-    # Thống kê theo 90 phút
-    "Gls.1", "Ast.1", "xG.1", "xAG.1",
-    # Thủ môn - Performance
-    "GA90", "Save%", "CS%",
-    # Thủ môn - Penalty
-    "PKsv",
-    # Dứt điểm - Standard
-    "SoT%", "SoT/90", "G/Sh", "Dist",
-    # Chuyền bóng - Tổng
-    "Cmp", "Cmp%", "TotDist",
-    # Chuyền bóng - Ngắn / Trung bình / Dài
-    "Cmp%.1", "Cmp%.2", "Cmp%.3",
-    # Chuyền bóng - Kỳ vọng & sáng tạo
-    "KP", "1/3", "PPA", "CrsPA", "PrgP_Passing",
-    # Kiến tạo và tạo cơ hội ghi bàn
-    "SCA", "SCA90", "GCA", "GCA90",
-    # Phòng ngự - Tắc bóng & tranh chấp
-    "Tkl", "TklW", "Att_Defensive act", "Lost",
-    # Phòng ngự - Chặn bóng
-    "Blocks", "Sh_Defensive act", "Pass", "Int",
-    # Kiểm soát bóng - Chạm bóng
-    "Touches", "Def Pen", "Def 3rd_Possession",
-    "Mid 3rd_Possession", "Att 3rd_Possession", "Att Pen",
-    # Kiểm soát bóng - Đi bóng
-    "Att_Possession", "Succ%", "Tkld%",
-    # Kiểm soát bóng - Carry
-    "Carries", "PrgDist_Possession", "PrgC_Possession",
-    "1/3_Possession", "CPA", "Mis", "Dis",
-    # Nhận bóng
-    "Rec", "PrgR_Possession",
-    # Thống kê khác - Hiệu suất
-    "Fls", "Fld_Misc", "Off", "Crs", "Recov",
-    # Không chiến
-    "Won", "Lost_Misc", "Won%"
-]
-
-if "Min" in all_df.columns:
-    all_df["Min"] = pd.to_numeric(all_df["Min"], errors="coerce")
-    all_df = all_df[all_df["Min"] > 90]
-
-# Thay thế giá trị NaN bằng "N/a"
-all_df.fillna("N/a", inplace=True)
-#  Thay thế giá trị "N/a" bằng NaN
-all_df["First_name"] = all_df["Player"].apply(lambda x: x.split()[0] if isinstance(x, str) else "N/a")
-
-# Sắp xếp DataFrame theo First_name
-all_df = all_df.sort_values(by="First_name")
-
-# Lọc các cột cần thiết
-all_df = all_df[[col for col in columns_to_keep if col in all_df.columns]]
-# Replace missing values with "N/a"
-all_df.fillna("N/a", inplace=True)
-
-# Lưu DataFrame vào file CSV
-all_df.to_csv("results.csv", index=False, encoding="utf-8-sig")
-print("Dữ liệu đã được lưu vào file results.csv.")
\ No newline at end of file
+
+@traced()
+def fetch_all_tables(links, fetcher, max_workers=MAX_WORKERS, manifest=None, store=None):
+    """
+    Tải song song tất cả các bảng trong `links` (giới hạn tốc độ nằm trong fetcher).
+
+    Returns:
+        dict: {tên bảng: DataFrame}, theo đúng thứ tự của `links`.
+    """
+    worker = lambda url, table_id: scraping(url, table_id, fetcher, manifest, store)
+    return fetch_concurrently(links, worker, max_workers=max_workers)
+
+def merge_tables(tables):
+    all_df = None
+    # Gộp các bảng theo thứ tự của links
+    for name, df in tables.items():
+        if all_df is None:
+            all_df = df
+        else:
+            all_df = pd.merge(all_df, df, on=JOIN_KEYS, how="outer", suffixes=("", f"_{name}"))
+            print(f"Gộp với {name} xong, kích thước all_df: {all_df.shape}")
+    return all_df
+
+def merged_column_names(tables):
+    """
+    Tính trước tên cột sau khi gộp, giống hệt chuỗi pd.merge(..., suffixes=("", f"_{name}"))
+    trong merge_tables: cột của bảng sau trùng tên với một cột đã có thì thêm hậu tố "_{tên bảng}".
+
+    Returns:
+        dict: {tên bảng: {tên cột gốc: tên cột sau khi gộp}} (không gồm cột khóa).
+    """
+    seen = set()
+    names = {}
+    for name, df in tables.items():
+        mapping = {}
+        for col in df.columns:
+            if col in JOIN_KEYS:
+                continue
+            mapping[col] = f"{col}_{name}" if col in seen else col
+        seen.update(mapping.values())
+        names[name] = mapping
+    return names
+
+@traced()
+def join_tables(tables, columns=None):
+    """
+    Gộp tất cả các bảng trong một lần: mỗi bảng chỉ giữ các cột cần thiết (`columns`),
+    đặt chỉ mục (Player, Squad) rồi nối ngang bằng pd.concat thay vì 7 lần pd.merge liên tiếp.
+    Kết quả có cùng tên cột và thứ tự hàng như merge_tables (chỉ khác thứ tự cột).
+    Nếu một bảng có khóa (Player, Squad) bị trùng, quay lại dùng merge_tables.
+    """
+    names = merged_column_names(tables)
+    wanted = set(columns) if columns is not None else None
+    parts = []
+    for name, df in tables.items():
+        mapping = {col: new for col, new in names[name].items() if wanted is None or new in wanted}
+        keys = pd.MultiIndex.from_frame(df[JOIN_KEYS])
+        if not keys.is_unique:
+            print(f"Bảng {name} có cầu thủ trùng khóa (Player, Squad), dùng cách gộp tuần tự.")
+            all_df = merge_tables(tables)
+            return all_df if wanted is None else all_df[[c for c in all_df.columns if c in wanted or c in JOIN_KEYS]]
+        parts.append(df[list(mapping)].rename(columns=mapping).set_axis(keys))
+    # Tập khóa chung (đã sắp xếp như khi pd.merge(how="outer")), mỗi bảng chỉ reindex một lần
+    all_keys = parts[0].index
+    for part in parts[1:]:
+        all_keys = all_keys.union(part.index, sort=False)
+    all_keys = all_keys.sort_values()
+    all_df = pd.concat([part.reindex(all_keys) for part in parts], axis=1)
+    print(f"Gộp {len(parts)} bảng xong, kích thước all_df: {all_df.shape}")
+    return all_df.reset_index()
+
+@traced()
+def build_results(all_df):
+    if "Min" in all_df.columns:
+        all_df["Min"] = pd.to_numeric(all_df["Min"], errors="coerce")
+        all_df = all_df[all_df["Min"] > 90]
+
+    # Giá trị thiếu giữ là NaN để các cột số giữ kiểu số, chỉ ghi thành "N/a" khi xuất CSV
+    all_df["First_name"] = all_df["Player"].apply(lambda x: x.split()[0] if isinstance(x, str) else "N/a")
+
+    # Sắp xếp DataFrame theo First_name
+    all_df = all_df.sort_values(by="First_name")
+
+    # Lọc các cột cần thiết
+    all_df = all_df[[col for col in columns_to_keep if col in all_df.columns]]
+    return all_df
+
+def scrape_partitions(competitions, seasons, fetcher, ledger, manifest, store,
+                      partitions_dir=PARTITIONS_DIR, max_workers=MAX_WORKERS):
+    """
+    Thu thập nhiều (giải, mùa) cùng lúc: mọi bảng của mọi phân vùng được đưa vào một pool
+    luồng chung, giới hạn tốc độ nằm trong fetcher nên áp dụng cho toàn bộ các job.
+    Trạng thái từng bảng và từng phân vùng được ghi vào `ledger` nên khi chạy lại sau lỗi
+    hay bị ngắt, các bảng đã xong được đọc lại từ bản Parquet thay vì tải lại.
+    Mỗi phân vùng được ghi ra một thư mục riêng ngay khi đủ 8 bảng.
+    """
+    partitions = {(c, s): build_links(c, s) for c in competitions for s in seasons}
+    todo = {key: part_links for key, part_links in partitions.items()
+            if not ledger.is_done(partition_id(*key))}
+    print(f"{len(partitions) - len(todo)}/{len(partitions)} phân vùng đã xong từ trước.")
+
+    tables = {key: {} for key in todo}
+    jobs = {}
+    for (competition, season), part_links in todo.items():
+        for name, (url, table_id) in part_links.items():
+            job_id = f"{partition_id(competition, season)}/{name}"
+            key = table_key(url, table_id)
+            if ledger.is_done(job_id) and store.exists(key):
+                tables[(competition, season)][name] = store.load(key)
+            else:
+                jobs[job_id] = (url, table_id)
+    if jobs:
+        ledger.reset(list(jobs))  # Một lần ghi sổ cho mọi bảng cần tải lại
+
+    def finish_partition(competition, season):
+        part_links = partitions[(competition, season)]
+        ordered = {name: tables[(competition, season)][name] for name in part_links}
+        all_df = build_results(join_tables(ordered, columns_to_keep))
+        csv_path = partition_csv_path(competition, season, partitions_dir)
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        write_results(all_df, csv_path)
+        ledger.mark(partition_id(competition, season), "done", rows=len(all_df), path=csv_path)
+        print(f"Đã ghi phân vùng {competition} {season}: {len(all_df)} cầu thủ.")
+
+    def collect(job_id, df):
+        competition, season, name = job_id.split("/", 2)
+        tables[(competition, season)][name] = df
+        if len(tables[(competition, season)]) == len(TABLE_PAGES):
+            finish_partition(competition, season)
+
+    # Phân vùng mà mọi bảng đều đã có sẵn từ lần chạy trước
+    for (competition, season), part_tables in tables.items():
+        if len(part_tables) == len(TABLE_PAGES):
+            finish_partition(competition, season)
+
+    worker = lambda url, table_id: scraping(url, table_id, fetcher, manifest, store)
+    run_jobs(jobs, worker, ledger, max_workers=max_workers, on_result=collect)
+    failed = [partition_id(*key) for key in todo if not ledger.is_done(partition_id(*key))]
+    if failed:
+        print(f"CẢNH BÁO: {len(failed)} phân vùng chưa xong, chạy lại để tiếp tục: {', '.join(failed)}")
+
+@traced()
+def scrape_tables(source=None, backend=FETCHER_BACKEND, cache_mode=CACHE_MODE, max_workers=MAX_WORKERS,
+                  min_interval=MIN_REQUEST_INTERVAL_S):
+    """
+    Tải 8 bảng trong `links`; bảng có nội dung mới được lưu bản Parquet và dấu vân tay vào manifest.
+
+    Returns:
+        dict: {tên bảng: DataFrame}, theo đúng thứ tự của `links`.
+    """
+    fetcher = make_fetcher(source, backend=backend, pool_size=max_workers, min_interval=min_interval,
+                           cache_mode=cache_mode)
+    start = time.perf_counter()
+    try:
+        tables = fetch_all_tables(links, fetcher, max_workers, Manifest(), SnapshotStore())
+    finally:
+        fetcher.close()
+    print(f"Đã tải {len(tables)} bảng trong {time.perf_counter() - start:.1f}s")
+    return tables
+
+@traced()
+def build_results_file(tables=None, force=False, output_csv_path=OUTPUT_CSV_PATH):
+    """
+    Gộp các bảng thành results.feather và results.csv, chỉ khi có bảng thay đổi nội dung
+    (hoặc tệp kết quả bị mất/sửa, hoặc `force`).
+
+    Args:
+        tables (dict, optional): Kết quả của scrape_tables; None để đọc các bản Parquet đã lưu
+            (bước "clean" của pipeline.py chạy ở tiến trình khác với bước tải).
+
+    Returns:
+        bool: True nếu tệp kết quả được ghi lại.
+    """
+    manifest = Manifest()
+    inputs = {name: manifest.table_fingerprint(table_key(url, table_id)) for name, (url, table_id) in links.items()}
+    inputs["config"] = fingerprint_config(columns_to_keep=columns_to_keep)
+    outputs = [typed_path(output_csv_path), output_csv_path]
+    if not force and manifest.is_up_to_date("P1", inputs, outputs):
+        print(f"Không có bảng nào thay đổi, giữ nguyên {output_csv_path}.")
+        return False
+    if tables is None:
+        store = SnapshotStore()
+        tables = {name: store.load(table_key(url, table_id)) for name, (url, table_id) in links.items()}
+    all_df = build_results(join_tables(tables, columns_to_keep))
+
+    # Lưu DataFrame vào file Feather có kiểu (cho P2-P4) và file CSV (để xuất, thiếu ghi "N/a")
+    write_results(all_df, output_csv_path)
+    manifest.record("P1", inputs, outputs)
+    print(f"Dữ liệu đã được lưu vào file {typed_path(output_csv_path)} và {output_csv_path}.")
+    return True
+
+def _valid_season(season: str) -> bool:
+    """Mùa dạng "2023-2024": hai năm liên tiếp."""
+    match = re.fullmatch(r"(\d{4})-(\d{4})", season)
+    return match is not None and int(match.group(2)) == int(match.group(1)) + 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Thu thập thống kê cầu thủ từ fbref.")
+    parser.add_argument("--source", default=None,
+                        help="Máy chủ giả lập (http://host:port) hoặc thư mục HTML đã lưu thay cho fbref.com")
+    parser.add_argument("--fetcher", choices=["http", "selenium"], default=FETCHER_BACKEND,
+                        help="Cách tải trang web")
+    parser.add_argument("--cache", choices=CACHE_MODES, default=CACHE_MODE,
+                        help="Chế độ bộ đệm trang web trên đĩa")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Số bảng tải song song")
+    parser.add_argument("--min-interval", type=float, default=MIN_REQUEST_INTERVAL_S,
+                        help="Khoảng cách tối thiểu (giây) giữa 2 request tới cùng host")
+    parser.add_argument("--force", action="store_true",
+                        help="Gộp và ghi lại results.csv kể cả khi không bảng nào thay đổi")
+    parser.add_argument("--competitions", nargs="+", choices=list(COMPETITIONS), default=None,
+                        help="Thu thập nhiều giải (ghi theo phân vùng giải/mùa thay vì results.csv)")
+    parser.add_argument("--seasons", nargs="+", default=None,
+                        help="Các mùa cần thu thập, dạng 2023-2024")
+    parser.add_argument("--partitions-dir", default=PARTITIONS_DIR, help="Thư mục chứa các phân vùng")
+    parser.add_argument("--restart", action="store_true",
+                        help="Bỏ sổ ghi công việc cũ, thu thập lại mọi phân vùng từ đầu")
+    args = parser.parse_args()
+
+    if args.competitions or args.seasons:
+        # Kiểm tra tham số trước khi xóa sổ ghi công việc hay mở trình duyệt
+        if not args.seasons:
+            parser.error("--seasons là bắt buộc khi thu thập theo phân vùng")
+        invalid = [season for season in args.seasons if not _valid_season(season)]
+        if invalid:
+            parser.error(f"Mùa không hợp lệ: {', '.join(invalid)} (dạng 2023-2024)")
+        competitions = args.competitions or list(COMPETITIONS)
+        ledger = JobLedger()
+        if args.restart:
+            ledger.reset()
+        fetcher = make_fetcher(args.source, backend=args.fetcher, pool_size=args.workers,
+                               min_interval=args.min_interval, cache_mode=args.cache)
+        try:
+            scrape_partitions(competitions, args.seasons, fetcher, ledger, Manifest(), SnapshotStore(),
+                              args.partitions_dir, args.workers)
+        finally:
+            fetcher.close()
+        return
+
+    tables = scrape_tables(args.source, args.fetcher, args.cache, args.workers, args.min_interval)
+    build_results_file(tables, force=args.force)
+
+if __name__ == "__main__":
+    main()
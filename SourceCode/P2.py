@@ -1,8 +1,47 @@
+import argparse
 import pandas as pd
 import numpy as np # Mặc dù không dùng trực tiếp, pandas cần numpy
 import matplotlib.pyplot as plt
 import os # Để làm việc với thư mục
 
+from group_stats import group_stats, is_quantile_aggregate
+from ranking import rank_top_bottom, write_rankings, write_rankings_text
+from histograms import DEFAULT_HISTOGRAM_DIR, DEFAULT_LAYOUT, DEFAULT_MAX_WORKERS, LAYOUTS, render_histograms
+from incremental import Manifest, fingerprint_config, fingerprint_file
+from schema import load_results, typed_path
+from streaming_stats import DEFAULT_MEMORY_MB, MIN_SKETCH_K, SKETCH_K, SKETCH_SEED, stream_stats
+from instrumentation import traced
+
+# Các tệp do P2 tạo ra, chỉ ghi lại khi results.csv thay đổi
+P2_OUTPUTS = ["top_3.txt", "top_3.json", "results2.csv"]
+# Chế độ theo khối: median/phân vị gần đúng nên ghi ra tệp riêng, không ghi đè results2.csv chính xác
+RESULTS2_APPROX_OUTPUT = "results2_approx.csv"
+P2_CHUNKED_OUTPUTS = ["top_3.txt", "top_3.json", RESULTS2_APPROX_OUTPUT]
+# Xếp hạng cao nhất/thấp nhất: số cầu thủ mỗi chiều, tệp có cấu trúc (.json hoặc .csv)
+TOP_K = 3
+RANKINGS_OUTPUT = "top_3.json"
+# Ghi thêm xếp hạng trong từng đội
+RANK_BY_SQUAD = False
+SQUAD_RANKINGS_OUTPUT = "top_3_by_squad.json"
+# Cách vẽ histogram và số tiến trình vẽ song song ở chế độ "save"
+HISTOGRAM_MODES = ("show", "save", "off")
+HISTOGRAM_WORKERS = DEFAULT_MAX_WORKERS
+# Các thống kê theo đội ghi vào results2.csv (thêm "min", "max", "q25"... nếu cần)
+RESULTS2_AGGREGATES = ("median", "mean", "std")
+
+def p2_stage_inputs(results_path: str, **settings) -> dict:
+    """
+    Đầu vào của bước "P2" trong manifest: dấu vân tay của `results_path` (và bản Feather) cùng cấu hình
+    quyết định nội dung đầu ra, để đổi cấu hình (TOP_K, RESULTS2_AGGREGATES...) cũng tạo lại các tệp.
+    """
+    inputs = {path: fingerprint_file(path) for path in (results_path, typed_path(results_path))}
+    inputs["config"] = fingerprint_config(top_k=TOP_K, aggregates=RESULTS2_AGGREGATES, rank_by_squad=RANK_BY_SQUAD,
+                                          rankings_output=RANKINGS_OUTPUT, squad_rankings_output=SQUAD_RANKINGS_OUTPUT,
+                                          **settings)
+    return inputs
+
+
+@traced()
 def plot_histograms(df: pd.DataFrame, numeric_cols: list, grouped_by_squad=None): # Bỏ output_dir
     """
     Vẽ và hiển thị biểu đồ histogram cho mỗi cột thống kê số.
@@ -46,9 +85,101 @@ def plot_histograms(df: pd.DataFrame, numeric_cols: list, grouped_by_squad=None)
     print("Hoàn tất việc chuẩn bị hiển thị histogram. Các cửa sổ biểu đồ sẽ lần lượt xuất hiện.")
 
 
+@traced()
+def write_top_3(df: pd.DataFrame, numeric_cols: list):
+    """
+    Ghi file top_3.txt: Top 3 cao nhất và thấp nhất cho mỗi thống kê,
+    kèm bản có cấu trúc top_3.json (và xếp hạng theo đội nếu RANK_BY_SQUAD).
+    """
+    rankings = rank_top_bottom(df, numeric_cols, k=TOP_K)
+    write_rankings_text(rankings, df, numeric_cols, "top_3.txt", k=TOP_K)
+    write_rankings(rankings, df, RANKINGS_OUTPUT)
+    if RANK_BY_SQUAD and 'Squad' in df.columns:
+        write_rankings(rank_top_bottom(df, numeric_cols, k=TOP_K, by='Squad'), df, SQUAD_RANKINGS_OUTPUT)
+    print("Ghi tệp 'top_3.txt' hoàn tất.")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Thống kê và vẽ histogram từ results.csv")
+    parser.add_argument("--histograms", choices=HISTOGRAM_MODES, default="show",
+                        help="show: mở cửa sổ từng biểu đồ; save: ghi ảnh PNG (không cần màn hình); off: không vẽ")
+    parser.add_argument("--hist-dir", default=DEFAULT_HISTOGRAM_DIR, help="Thư mục ghi ảnh ở chế độ save")
+    parser.add_argument("--hist-layout", choices=LAYOUTS, default=DEFAULT_LAYOUT,
+                        help="grid: một ảnh lưới cho mỗi thống kê; single: mỗi đội một ảnh")
+    parser.add_argument("--workers", type=int, default=HISTOGRAM_WORKERS, help="Số tiến trình vẽ song song")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Đọc results theo khối trong giới hạn --memory-mb (dữ liệu không vừa bộ nhớ); "
+                             f"ghi {RESULTS2_APPROX_OUTPUT} (median gần đúng) thay cho results2.csv, không vẽ histogram")
+    parser.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB, help="Ngân sách bộ nhớ ở chế độ --chunked")
+    args = parser.parse_args()
+    if args.chunked:
+        run_stats_chunked(memory_mb=args.memory_mb)
+    else:
+        run_stats(args.histograms, args.hist_dir, args.hist_layout, args.workers)
+
+
+@traced()
+def run_stats_chunked(results_path: str = "results.csv", memory_mb: float = DEFAULT_MEMORY_MB, force: bool = False):
+    """
+    Như run_stats nhưng không nạp cả bảng: đọc `results_path` theo khối (bộ nhớ giới hạn bởi `memory_mb`)
+    và ghi top_3.txt/top_3.json (giống hệt chế độ thường) cùng RESULTS2_APPROX_OUTPUT thay cho results2.csv:
+    mean/std/min/max giống chế độ thường, còn median và q<nn> lấy từ sketch phân vị (sai số hạng khoảng 1%,
+    xem streaming_stats.SKETCH_K). Manifest dùng bước riêng "P2-chunked" (kèm memory_mb và cấu hình sketch),
+    nên chuyển qua lại giữa hai chế độ không bao giờ giữ lại đầu ra của chế độ kia. Không vẽ histogram.
+
+    Args:
+        memory_mb (float): Ngân sách bộ nhớ (MB) cho khối dữ liệu và các cấu trúc tích lũy.
+        force (bool): Ghi lại các tệp dù results.csv không đổi.
+    """
+    manifest = Manifest()
+    stage_inputs = p2_stage_inputs(results_path, memory_mb=memory_mb, sketch_k=SKETCH_K, min_sketch_k=MIN_SKETCH_K,
+                                   sketch_seed=SKETCH_SEED)
+    if not force and manifest.is_up_to_date("P2-chunked", stage_inputs, P2_CHUNKED_OUTPUTS):
+        print(f"Bỏ qua việc tạo 'top_3.txt' và '{RESULTS2_APPROX_OUTPUT}' vì results.csv và cấu hình không đổi "
+              "từ lần chạy trước.")
+        return
+    stats = stream_stats(results_path, memory_mb, by='Squad', k=TOP_K, rank_by_group=RANK_BY_SQUAD)
+    if stats is None or not stats.numeric_cols:
+        print(f"Lỗi: '{results_path}' không có dữ liệu số.")
+        return
+
+    rankings, display = stats.rankings()
+    write_rankings_text(rankings, display, stats.numeric_cols, "top_3.txt", k=TOP_K)
+    write_rankings(rankings, display, RANKINGS_OUTPUT)
+    if RANK_BY_SQUAD and stats.group_names:
+        write_rankings(*stats.rankings(by_group=True), SQUAD_RANKINGS_OUTPUT)
+    print("Ghi tệp 'top_3.txt' hoàn tất.")
+
+    if not stats.group_names:
+        print(f"Bỏ qua việc tạo '{RESULTS2_APPROX_OUTPUT}' do thiếu cột 'Squad'.")
+        return
+    results2_df = stats.group_stats(RESULTS2_AGGREGATES)
+    results2_df.to_csv(RESULTS2_APPROX_OUTPUT, index=False, encoding='utf-8-sig')
+    print(f"Ghi tệp '{RESULTS2_APPROX_OUTPUT}' hoàn tất (không ghi đè 'results2.csv').")
+    approximate = [name for name in RESULTS2_AGGREGATES if is_quantile_aggregate(name)]
+    if approximate:
+        print(f"CẢNH BÁO: {', '.join(approximate)} trong '{RESULTS2_APPROX_OUTPUT}' là giá trị gần đúng "
+              f"(sketch phân vị k={stats.sketch_k}, sai số hạng khoảng {1.7 / stats.sketch_k:.1%}); "
+              "chạy P2 không có --chunked để có 'results2.csv' chính xác.")
+    manifest.record("P2-chunked", stage_inputs, P2_CHUNKED_OUTPUTS)
+    print("Bỏ qua việc vẽ histogram ở chế độ theo khối.")
+
+
+@traced()
+def run_stats(histograms: str = "show", hist_dir: str = DEFAULT_HISTOGRAM_DIR, hist_layout: str = DEFAULT_LAYOUT,
+              workers: int = HISTOGRAM_WORKERS, results_path: str = "results.csv", force: bool = False):
+    """
+    Tạo top_3.txt/top_3.json và results2.csv từ `results_path` (bỏ qua nếu tệp không đổi), rồi vẽ histogram.
+
+    Args:
+        histograms (str): Một trong HISTOGRAM_MODES.
+        hist_dir (str): Thư mục ghi ảnh ở chế độ "save".
+        hist_layout (str): Một trong LAYOUTS.
+        workers (int): Số tiến trình vẽ song song ở chế độ "save".
+        force (bool): Ghi lại các tệp dù results.csv không đổi.
+    """
     # --- 1. Đọc dữ liệu ---
-    df = pd.read_csv("results.csv", na_values='N/a')
+    df = load_results(results_path)
     # --- 2. Xử lý giá trị bị thiếu ---
     numeric_cols = df.select_dtypes(include='number').columns.tolist() 
     df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
@@ -57,28 +188,13 @@ def main():
     missing_text_cols = [col for col in required_text_cols if col not in df.columns]
     # --- 3. Ghi file top_3.txt: Top 3 cao nhất và thấp nhất mỗi thống kê ---
     
-    with open("top_3.txt", "w", encoding="utf-8") as f:
-        for col_stat in numeric_cols: 
-            f.write(f"----------- Thống kê: {col_stat} -----------\n")
-
-            display_cols_for_top_bottom = []
-            if 'Player' in df.columns:
-                display_cols_for_top_bottom.append('Player')
-            if 'Squad' in df.columns:
-                display_cols_for_top_bottom.append('Squad')
-            display_cols_for_top_bottom.append(col_stat)
-            
-            if df[col_stat].notna().any(): 
-                top3 = df.nlargest(3, col_stat)[display_cols_for_top_bottom]
-                bot3 = df.nsmallest(3, col_stat)[display_cols_for_top_bottom]
-                    
-                f.write(f"Top 3 CAO NHẤT theo {col_stat}:\n")
-                f.write(top3.to_string(index=False) + "\n")
-                f.write(f"Top 3 THẤP NHẤT theo {col_stat}:\n")
-                f.write(bot3.to_string(index=False) + "\n\n")
-            else:
-                f.write(f"Cột {col_stat} không có dữ liệu hợp lệ để tìm top/bottom 3.\n\n")
-    print("Ghi tệp 'top_3.txt' hoàn tất.")
+    manifest = Manifest()
+    stage_inputs = p2_stage_inputs(results_path)
+    outputs_up_to_date = not force and manifest.is_up_to_date("P2", stage_inputs, P2_OUTPUTS)
+    if outputs_up_to_date:
+        print("Bỏ qua việc tạo 'top_3.txt' vì results.csv và cấu hình không đổi từ lần chạy trước.")
+    else:
+        write_top_3(df, numeric_cols)
     
 
     # --- 4. Nhóm dữ liệu theo đội ---
@@ -88,62 +204,19 @@ def main():
     else:
         print("CẢNH BÁO: Không tìm thấy cột 'Squad'. Không thể nhóm theo đội.")
 
-    # --- 5. Tính median, mean, std cho toàn giải ---
-    all_league_stats = None
-    if numeric_cols: 
-        if not df[numeric_cols].empty:
-            all_league_stats = df[numeric_cols].agg(['median', 'mean', 'std']).T 
-            print("Đã tính toán median, mean, std cho toàn giải.")
-        else:
-            print("Không có dữ liệu số để tính thống kê toàn giải.")
-    else:
-        print("Không có cột số nào được xác định để tính thống kê toàn giải.")
-
-
-    # --- 6. Chuẩn bị kết quả và tạo file results2.csv ---
-    if numeric_cols and all_league_stats is not None and grouped_by_squad is not None:
+    # --- 5 & 6. Tính median, mean, std cho toàn giải và từng đội, tạo file results2.csv ---
+    if outputs_up_to_date:
+        print("Bỏ qua việc tạo 'results2.csv' vì results.csv và cấu hình không đổi.")
+    elif numeric_cols and grouped_by_squad is not None:
         print("Đang chuẩn bị dữ liệu cho 'results2.csv'...")
-        rows_for_results2 = []
-        
-        columns_for_results2 = ['Squad']
-        for col_stat in numeric_cols:
-            columns_for_results2.extend([f"Median của {col_stat}", f"Mean của {col_stat}", f"Std của {col_stat}"])
-
-        all_league_values = []
-        for col_stat in numeric_cols:
-            if col_stat in all_league_stats.index:
-                all_league_values.extend([
-                    all_league_stats.loc[col_stat, 'median'],
-                    all_league_stats.loc[col_stat, 'mean'],
-                    all_league_stats.loc[col_stat, 'std']
-                ])
-            else: 
-                all_league_values.extend([np.nan, np.nan, np.nan])
-
-        rows_for_results2.append(['all'] + all_league_values)
-
-        if not grouped_by_squad[numeric_cols].first().empty: # Kiểm tra nếu có dữ liệu số trong nhóm
-            team_aggregated_stats = grouped_by_squad[numeric_cols].agg(['median', 'mean', 'std'])
-            for team_name, team_specific_stats in team_aggregated_stats.iterrows():
-                team_values = []
-                for col_stat in numeric_cols:
-                    team_values.extend([
-                        team_specific_stats.get((col_stat, 'median'), np.nan), 
-                        team_specific_stats.get((col_stat, 'mean'), np.nan),
-                        team_specific_stats.get((col_stat, 'std'), np.nan)
-                    ])
-                rows_for_results2.append([team_name] + team_values)
-        else:
-            print("Cảnh báo: Không có dữ liệu số trong các nhóm đội để tổng hợp cho results2.csv.")
-
-
-        results2_df = pd.DataFrame(rows_for_results2, columns=columns_for_results2)
+        results2_df = group_stats(df, numeric_cols, by='Squad', aggregates=RESULTS2_AGGREGATES)
         results2_df.to_csv('results2.csv', index=False, encoding='utf-8-sig') 
         print("Ghi tệp 'results2.csv' hoàn tất.")
         print("\n5 dòng đầu của 'results2.csv':")
         print(results2_df.head())
+        manifest.record("P2", stage_inputs, P2_OUTPUTS)
     else:
-        print("Bỏ qua việc tạo 'results2.csv' do thiếu grouped_by_squad, all_league_stats hoặc numeric_cols.")
+        print("Bỏ qua việc tạo 'results2.csv' do thiếu cột 'Squad' hoặc không có cột số.")
 
     # --- 7. Vẽ Histograms CHỈ CHO CÁC CỘT TẤN CÔNG VÀ PHÒNG NGỰ ĐƯỢC CHỈ ĐỊNH ---
     attack_cols_defined = ["Gls", "Ast", "Dist"]
@@ -159,9 +232,15 @@ def main():
 
     if cols_to_plot_actual: 
         print(f"\nSẽ vẽ histogram cho các cột: {', '.join(cols_to_plot_actual)}")
-        plot_histograms(df, cols_to_plot_actual, grouped_by_squad)
+        if histograms == "show":
+            plot_histograms(df, cols_to_plot_actual, grouped_by_squad)
+        elif histograms == "save":
+            render_histograms(df, cols_to_plot_actual, 'Squad' if grouped_by_squad is not None else None,
+                              out_dir=hist_dir, layout=hist_layout, max_workers=workers)
+        else:
+            print("Bỏ qua việc vẽ histogram (--histograms off).")
     else:
         print("\nKhông có cột tấn công/phòng ngự hợp lệ nào được tìm thấy để vẽ histogram.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
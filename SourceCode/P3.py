@@ -1,69 +1,129 @@
+import argparse
+import os
+
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from sklearn.impute import SimpleImputer
-from sklearn.decomposition import PCA
 import matplotlib.pyplot as plt
 
-# Đọc dữ liệu
-df = pd.read_csv("results.csv")
-
-# Bỏ các cột định danh không dùng cho phân cụm
-cols_to_drop = ["Player", "Squad", "Nation", "Pos", "Age"]
-df_clean = df.drop(columns=cols_to_drop, errors='ignore')
-
-# Làm sạch và chuyển đổi sang kiểu số (loại bỏ % nếu có)
-def clean_numeric(col):
-    return pd.to_numeric(col.astype(str).str.replace('%', '', regex=False), errors='coerce')
-
-df_clean = df_clean.apply(clean_numeric)
-
-# Sử dụng SimpleImputer để điền giá trị NaN bằng trung bình của cột
-imputer = SimpleImputer(strategy="mean")
-df_clean_imputed = imputer.fit_transform(df_clean)
-
-# Chuẩn hóa dữ liệu
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(df_clean_imputed)
-
-# Áp dụng phương pháp Elbow để tìm số cụm tối ưu
-inertia = []
-K_range = range(1, 30)
-
-for k in K_range:
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-    kmeans.fit(X_scaled)
-    inertia.append(kmeans.inertia_)
-
-# Tính toán số K tối ưu từ sự thay đổi lớn nhất trong inertia
-# Tìm sự thay đổi lớn nhất giữa các inertia liên tiếp
-inertia_diff = [inertia[i] - inertia[i+1] for i in range(len(inertia)-1)]
-optimal_K = inertia_diff.index(max(inertia_diff)) + 2
-print(f"Số K tối ưu là {optimal_K}, vì từ K={optimal_K-1} tới K={optimal_K} ta nhận thấy giá trị của Inertia (quán tính) giảm mạnh nhất, và từ đó các sự thay đổi trở nên ít đi, tức là đã đạt đến điểm elbow")
-
-# Vẽ biểu đồ Elbow
-plt.figure(figsize=(8, 5))
-plt.plot(K_range, inertia, 'bo-', markersize=8)
-plt.xlabel('Số cụm (k)')
-plt.ylabel('Inertia')
-plt.title('Phương pháp Elbow để chọn số cụm K')
-plt.grid(True)
-plt.tight_layout()
-plt.show()
-
-# Áp dụng K-means phân cụm với số K tối ưu
-kmeans_optimal = KMeans(n_clusters=optimal_K, random_state=42, n_init=10)
-df_clean['Cluster'] = kmeans_optimal.fit_predict(X_scaled)
-
-# Giảm chiều dữ liệu xuống 2D với PCA
-pca = PCA(n_components=2)
-X_pca = pca.fit_transform(X_scaled)
-
-# Trực quan hóa kết quả phân cụm
-plt.figure(figsize=(8, 5))
-plt.scatter(X_pca[:, 0], X_pca[:, 1], c=df_clean['Cluster'], cmap='viridis', s=50)
-plt.title('Phân cụm K-means với số K tối ưu (PCA 2D)')
-plt.xlabel('PC 1')
-plt.ylabel('PC 2')
-plt.colorbar(label='Cluster')
-plt.show()
+from cluster_model import DEFAULT_DRIFT_THRESHOLD, DEFAULT_MODEL_DIR, feature_frame, fit_or_reuse
+from kselect import DEFAULT_K_RANGE
+from projection import CLUSTER_VIEWS, cluster_profiles, cluster_view, render_density
+from schema import load_results
+from instrumentation import traced
+
+# --- Cấu hình chọn số cụm ---
+K_RANGE = DEFAULT_K_RANGE
+KSELECT_MODE = "full"  # "full" (KMeans n_init=10 như trước), "minibatch" hoặc "warm"
+KSELECT_SCORE = "inertia"  # "inertia" (elbow), "silhouette" hoặc "calinski_harabasz" (tính trên mẫu con)
+# Dừng sớm theo tiêu chí elbow (nhanh hơn nhưng có thể chọn K khác lần quét đủ K_RANGE), mặc định tắt
+KSELECT_EARLY_STOP = False
+# Mô hình đã lưu: chỉ huấn luyện lại khi độ trôi inertia vượt ngưỡng (hoặc FORCE_RETRAIN)
+MODEL_DIR = DEFAULT_MODEL_DIR
+DRIFT_THRESHOLD = DEFAULT_DRIFT_THRESHOLD
+FORCE_RETRAIN = False
+# Cách vẽ biểu đồ: "show" mở cửa sổ (như trước), "save" ghi PNG vào PLOT_DIR (không cần màn hình), "off" không vẽ
+PLOT_MODES = ("show", "save", "off")
+PLOT_DIR = "plots"
+CLUSTERS_CSV_PATH = "clusters.csv"  # Cụm và tọa độ PCA 2D của từng cầu thủ
+CLUSTER_PROFILES_PATH = "cluster_profiles.csv"  # Số cầu thủ, tâm PCA và trung bình các cột của từng cụm
+# Biểu đồ không gian PCA: "auto" vẽ ảnh mật độ (không cần màn hình) khi có nhiều cầu thủ, xem projection.py
+CLUSTER_VIEW = "auto"
+
+def _finish_plot(plots: str, plot_dir: str, filename: str):
+    """Hiển thị hoặc lưu biểu đồ hiện tại theo `plots` (xem PLOT_MODES)."""
+    if plots == "show":
+        plt.show()
+    else:
+        os.makedirs(plot_dir, exist_ok=True)
+        plt.savefig(os.path.join(plot_dir, filename), dpi=100)
+        plt.close()
+
+
+@traced()
+def run_clustering(results_path: str = "results.csv", plots: str = "show", plot_dir: str = PLOT_DIR,
+                   force_retrain: bool = FORCE_RETRAIN, clusters_csv_path: str = CLUSTERS_CSV_PATH,
+                   profiles_path: str = CLUSTER_PROFILES_PATH, view: str = CLUSTER_VIEW) -> pd.DataFrame:
+    """
+    Phân cụm cầu thủ của `results_path`, ghi cụm và tọa độ PCA của từng cầu thủ ra `clusters_csv_path`,
+    hồ sơ từng cụm ra `profiles_path` và vẽ biểu đồ (`view`: xem CLUSTER_VIEWS).
+
+    Returns:
+        pd.DataFrame: Các cột số dùng để phân cụm, thêm cột 'Cluster'.
+    """
+    if plots != "show":
+        plt.switch_backend("Agg")
+    df = load_results(results_path)
+
+    # Bỏ các cột định danh không dùng cho phân cụm; các cột còn lại đã là kiểu số theo lược đồ trong schema.py
+    df_clean = feature_frame(df)
+
+    # Imputer (trung bình cột) -> StandardScaler -> KMeans -> PCA 2D: dùng lại mô hình đã lưu nếu dữ liệu
+    # chưa thay đổi nhiều, ngược lại chọn lại K bằng phương pháp Elbow và lưu phiên bản mô hình mới
+    pipeline, retrained = fit_or_reuse(df, MODEL_DIR, DRIFT_THRESHOLD, force=force_retrain, k_range=K_RANGE,
+                                       mode=KSELECT_MODE, score=KSELECT_SCORE, early_stop=KSELECT_EARLY_STOP)
+    optimal_K = pipeline.n_clusters
+
+    if retrained:
+        selection = pipeline.selection
+        inertia = selection.inertia
+        print(f"Đã thử {len(selection.ks)} giá trị k trong {selection.seconds:.2f}s.")
+        if KSELECT_SCORE == "inertia":
+            print(f"Số K tối ưu là {optimal_K}, vì từ K={optimal_K-1} tới K={optimal_K} ta nhận thấy giá trị của Inertia (quán tính) giảm mạnh nhất, và từ đó các sự thay đổi trở nên ít đi, tức là đã đạt đến điểm elbow")
+        else:
+            print(f"Số K tối ưu là {optimal_K}, có điểm {KSELECT_SCORE} cao nhất.")
+
+        # Vẽ biểu đồ Elbow
+        if plots != "off":
+            plt.figure(figsize=(8, 5))
+            plt.plot(selection.ks, inertia, 'bo-', markersize=8)
+            plt.xlabel('Số cụm (k)')
+            plt.ylabel('Inertia')
+            plt.title('Phương pháp Elbow để chọn số cụm K')
+            plt.grid(True)
+            plt.tight_layout()
+            _finish_plot(plots, plot_dir, "elbow.png")
+    else:
+        print(f"Số K tối ưu là {optimal_K} (theo mô hình đã lưu v{pipeline.version}).")
+
+    # Gán cụm và giảm chiều dữ liệu xuống 2D với PCA của mô hình
+    labels, X_pca = pipeline.predict(df)
+    df_clean['Cluster'] = labels
+    id_cols = [col for col in ("Player", "Squad") if col in df.columns]
+    df[id_cols].assign(Cluster=labels, PC1=X_pca[:, 0], PC2=X_pca[:, 1]).to_csv(
+        clusters_csv_path, index=False, encoding='utf-8-sig')
+    print(f"Đã lưu cụm của {len(df)} cầu thủ vào {clusters_csv_path}.")
+    profiles = cluster_profiles(df_clean.drop(columns='Cluster'), labels, X_pca)
+    profiles.to_csv(profiles_path, index=False, encoding='utf-8-sig')
+    print(f"Đã lưu hồ sơ {len(profiles)} cụm vào {profiles_path}.")
+
+    # Trực quan hóa kết quả phân cụm
+    if plots != "off":
+        if cluster_view(len(X_pca), view) == "density":
+            # Ảnh mật độ luôn được ghi ra tệp (backend Agg), kể cả ở chế độ "show"
+            path = render_density(X_pca, labels, profiles, os.path.join(plot_dir, "clusters_density.png"))
+            print(f"Đã lưu ảnh mật độ các cụm vào {path}.")
+        else:
+            plt.figure(figsize=(8, 5))
+            plt.scatter(X_pca[:, 0], X_pca[:, 1], c=df_clean['Cluster'], cmap='viridis', s=50)
+            plt.title('Phân cụm K-means với số K tối ưu (PCA 2D)')
+            plt.xlabel('PC 1')
+            plt.ylabel('PC 2')
+            plt.colorbar(label='Cluster')
+            _finish_plot(plots, plot_dir, "clusters_pca.png")
+    return df_clean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phân cụm cầu thủ từ results.csv")
+    parser.add_argument("--plots", choices=PLOT_MODES, default="show",
+                        help="show: mở cửa sổ biểu đồ; save: ghi ảnh PNG vào --plot-dir; off: không vẽ")
+    parser.add_argument("--plot-dir", default=PLOT_DIR)
+    parser.add_argument("--retrain", action="store_true", help="Huấn luyện lại dù độ trôi nhỏ")
+    parser.add_argument("--view", choices=CLUSTER_VIEWS, default=CLUSTER_VIEW,
+                        help="scatter: vẽ từng điểm; density: ảnh mật độ theo ô lục giác; auto: theo số cầu thủ")
+    args = parser.parse_args()
+    run_clustering(plots=args.plots, plot_dir=args.plot_dir, force_retrain=args.retrain or FORCE_RETRAIN,
+                   view=args.view)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,214 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+
+import lxml.html
 import pandas as pd
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from webdriver_manager.chrome import ChromeDriverManager
-import time
-from rapidfuzz import process, fuzz
+import numpy as np
+
+from cleaning import clean_numeric
+from fetcher import make_fetcher
+from http_cache import DEFAULT_CACHE_DIR
+from identity_map import DEFAULT_IDENTITY_DB_PATH, IdentityMap
+from name_matching import IncrementalMatcher, match_names
+from incremental import Manifest, fingerprint_config, fingerprint_file, fingerprint_frame
+from schema import load_results, typed_path
+from instrumentation import traced
 
 # --- Cấu hình Toàn cục ---
 # URL và Scraping
 BASE_URL_SCRAPING = "https://www.footballtransfers.com/us/values/players/most-valuable-soccer-players/playing-in-uk-premier-league"
-NUMBER_OF_PAGES_TO_SCRAPE = 22 
+NUMBER_OF_PAGES_TO_SCRAPE = None  # None: tự tìm trang cuối từ thanh phân trang của trang 1
+MAX_PAGES = 200  # Giới hạn an toàn khi không tìm thấy thanh phân trang
+PLAYER_TABLE_CLASS = "table table-hover no-cursor table-striped leaguetable mvp-table mb-0"
+PLAYER_COLUMNS = ["Player", "Team", "Value_Scraped"]
+MAX_WORKERS = 4  # Số trang tải cùng lúc (vẫn cách nhau ít nhất MIN_REQUEST_INTERVAL_S giữa 2 request)
+FETCHER_BACKEND = "http"  # "http": HTTP thuần, chỉ mở Chrome khi thiếu bảng; "selenium": luôn dùng Chrome
+MIN_REQUEST_INTERVAL_S = 3.0  # Khoảng cách tối thiểu giữa 2 request tới footballtransfers
+CACHE_MODE = "default"  # Bộ đệm trang web: "default" | "refresh" | "cache-only" (không cần mạng) | "off"
+# Bộ đệm riêng của footballtransfers, để P1 và P4 chạy song song (pipeline.py) không ghi đè index.json của nhau
+HTTP_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "footballtransfers")
 
 # Tệp CSV
 INPUT_STATS_CSV_PATH = "results.csv"
 OUTPUT_FINAL_CSV_PATH = "players_900mins_transfer_values.csv"
+SCRAPED_VALUES_CSV_PATH = os.path.join(".cache", "transfer_values.csv")  # Dữ liệu thô từ web, giữa 2 bước của pipeline.py
 
 # Lọc và So khớp
 MINIMUM_PLAYING_TIME_MINS = 900
 FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT = 80
 COLUMNS_TO_KEEP_FROM_STATS_FILE = ["Player", "Nation", "Pos", "Squad", "Age", "Min"]
+# Bảng định danh (Player, Squad) -> tên trên footballtransfers đã khớp ở các lần chạy trước; None để luôn so khớp lại
+IDENTITY_MAP_PATH = DEFAULT_IDENTITY_DB_PATH
 
 # --- Bước 1: Hàm Thu Thập Dữ Liệu từ Web ---
-def scrape_player_values(base_url: str, num_pages: int) -> pd.DataFrame:
+def _has_class(name: str) -> str:
+    """Điều kiện XPath: phần tử có class `name` (như class_ của BeautifulSoup)."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+_PLAYER_TABLE_XPATH = "//table[" + " and ".join(_has_class(name) for name in PLAYER_TABLE_CLASS.split()) + "]"
+_TEAM_NAME_XPATH = f".//span[{_has_class('td-team__teamname')}]"
+
+def create_chrome_driver():
+    return webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()))
+
+@traced()
+def parse_player_rows(html_source: str, page_number: int) -> list:
     """
-    Quét tên cầu thủ, đội bóng và giá trị chuyển nhượng từ footballtransfers.com.
+    Tách tên cầu thủ, đội bóng và giá trị chuyển nhượng từ HTML của một trang
+    (trình phân tích lxml, nhanh hơn nhiều so với "html.parser" của BeautifulSoup).
     """
     players_data = []
-    print("Đang khởi tạo WebDriver cho việc scraping...")
+    player_table = None
+    if html_source.strip():
+        matches = lxml.html.fromstring(html_source).xpath(_PLAYER_TABLE_XPATH)
+        player_table = matches[0] if matches else None
+
+    if player_table is not None:
+        for row_index, row in enumerate(player_table.iter("tr")):
+            if row_index == 0: continue
+            columns = list(row.iter("td"))
+            if columns and len(columns) > 4:
+                try:
+                    player_name_tag = columns[2].find(".//a")
+                    player_name = player_name_tag.text_content().strip() if player_name_tag is not None else "N/A"
+                    team_tags = columns[4].xpath(_TEAM_NAME_XPATH)
+                    team_name = team_tags[0].text_content().strip() if team_tags else "N/A"
+                    player_value = columns[-1].text_content().strip()
+                    if player_name != "N/A":
+                        players_data.append({"Player": player_name, "Team": team_name, "Value_Scraped": player_value})
+                except (IndexError, AttributeError) as e_parse:
+                     print(f"    Lỗi nhỏ khi phân tích hàng {row_index} ở trang {page_number}: {e_parse}")
+    else:
+        print(f"    Không tìm thấy bảng dữ liệu trên trang {page_number}.")
+    return players_data
+
+def page_url(base_url: str, page_number: int) -> str:
+    """URL của trang thứ `page_number` (trang 1 là `base_url`, các trang sau là `base_url`/<số trang>)."""
+    return base_url if page_number == 1 else f"{base_url.rstrip('/')}/{page_number}"
+
+def find_last_page(html_source: str, base_url: str):
+    """Số trang lớn nhất trong các liên kết phân trang (`base_url`/<số trang>) của một trang; None nếu không thấy."""
+    if not html_source.strip():
+        return None
+    base_path = urlsplit(base_url).path.rstrip("/")
+    page_re = re.compile(re.escape(base_path) + r"/(\d+)")
+    pages = []
+    for href in lxml.html.fromstring(html_source).xpath("//a/@href"):
+        match = page_re.fullmatch(urlsplit(urljoin(base_url, href)).path.rstrip("/"))
+        if match:
+            pages.append(int(match.group(1)))
+    return max(pages) if pages else None
+
+def create_fetcher(source: str = None, cache_mode: str = CACHE_MODE, min_interval: float = MIN_REQUEST_INTERVAL_S):
+    print(f"Đang khởi tạo fetcher '{FETCHER_BACKEND}' cho việc scraping...")
+    return make_fetcher(source, backend=FETCHER_BACKEND, driver_factory=create_chrome_driver, pool_size=MAX_WORKERS,
+                        min_interval=min_interval, cache_mode=cache_mode, cache_dir=HTTP_CACHE_DIR)
+
+def _fetch_page(fetcher, base_url: str, page_number: int) -> tuple:
+    html_source = fetcher.fetch(page_url(base_url, page_number), table_class=PLAYER_TABLE_CLASS)
+    return html_source, pd.DataFrame(parse_player_rows(html_source, page_number), columns=PLAYER_COLUMNS)
+
+@traced()
+def iter_player_pages(base_url: str, fetcher, num_pages: int = None, max_workers: int = MAX_WORKERS):
+    """
+    Tải các trang giá trị cầu thủ song song và trả về từng trang ngay khi trang đó xong (không theo thứ tự).
+    Số trang được đọc từ thanh phân trang của trang 1 nếu `num_pages` là None; nếu không tìm thấy,
+    các trang được tải theo từng đợt `max_workers` trang cho đến khi gặp trang không có cầu thủ nào.
+    Tốc độ gửi request tới host do HostRateLimiter của fetcher giới hạn (MIN_REQUEST_INTERVAL_S).
+
+    Yields:
+        tuple: (số trang, DataFrame các cột PLAYER_COLUMNS). Trang lỗi được báo và bỏ qua.
+    """
+    print(f"  Đang xử lý trang 1: {base_url}")
     try:
-        driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()))
-        print("WebDriver đã khởi tạo thành công.")
-    except Exception as e:
-        print(f"Lỗi nghiêm trọng khi khởi tạo WebDriver: {e}")
-        return pd.DataFrame(players_data)
-
-    print(f"Bắt đầu quét {num_pages} trang từ {base_url}...")
-    for i in range(1, num_pages + 1):
-        url_to_scrape = base_url
-        if i != 1:
-            url_to_scrape += "/" + str(i)
-        print(f"  Đang xử lý trang {i}: {url_to_scrape}")
-        try:
-            driver.get(url_to_scrape)
-            time.sleep(3) # Chờ trang tải - có thể cần điều chỉnh hoặc dùng WebDriverWait
-            html_source = driver.page_source
-            soup = BeautifulSoup(html_source, "html.parser")
-            player_table = soup.find("table", class_="table table-hover no-cursor table-striped leaguetable mvp-table mb-0")
-
-            if player_table:
-                table_rows = player_table.find_all("tr")
-                for row_index, row in enumerate(table_rows):
-                    if row_index == 0: continue
-                    columns = row.find_all("td")
-                    if columns and len(columns) > 4:
-                        try:
-                            player_name_tag = columns[2].find("a")
-                            player_name = player_name_tag.text.strip() if player_name_tag else "N/A"
-                            team_tag = columns[4].find("span", class_="td-team__teamname")
-                            team_name = team_tag.text.strip() if team_tag else "N/A"
-                            player_value = columns[-1].text.strip()
-                            if player_name != "N/A":
-                                players_data.append({"Player": player_name, "Team": team_name, "Value_Scraped": player_value})
-                        except (IndexError, AttributeError) as e_parse:
-                             print(f"    Lỗi nhỏ khi phân tích hàng {row_index} ở trang {i}: {e_parse}")
-            else:
-                print(f"    Không tìm thấy bảng dữ liệu trên trang {i}.")
-        except Exception as e_page:
-            print(f"    Lỗi không mong muốn khi xử lý trang {i}: {e_page}")
+        first_html, first_rows = _fetch_page(fetcher, base_url, 1)
+    except Exception as e_page:
+        print(f"    Lỗi không mong muốn khi xử lý trang 1: {e_page}")
+        first_html, first_rows = "", pd.DataFrame(columns=PLAYER_COLUMNS)
+    yield 1, first_rows
+    last_page = num_pages or find_last_page(first_html, base_url)
+    if last_page is None:
+        print(f"    Không tìm thấy thanh phân trang, tải theo từng đợt {max_workers} trang đến khi hết cầu thủ.")
+    else:
+        print(f"Bắt đầu quét {last_page} trang từ {base_url} với {max_workers} luồng...")
+
+    next_page, exhausted = 2, first_rows.empty
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while next_page <= (last_page or MAX_PAGES) and not exhausted:
+            stop = last_page if last_page is not None else min(next_page + max_workers - 1, MAX_PAGES)
+            futures = {pool.submit(_fetch_page, fetcher, base_url, page): page for page in range(next_page, stop + 1)}
+            next_page = stop + 1
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    _, rows = future.result()
+                except Exception as e_page:
+                    print(f"    Lỗi không mong muốn khi xử lý trang {page}: {e_page}")
+                    # Không biết trang cuối: trang lỗi (thường là 404 sau trang cuối) cũng kết thúc việc tải
+                    exhausted = exhausted or last_page is None
+                    continue
+                print(f"  Đã xử lý trang {page}: {len(rows)} cầu thủ")
+                exhausted = exhausted or (last_page is None and rows.empty)
+                yield page, rows
+
+@traced()
+def scrape_player_values(base_url: str, num_pages: int = None, fetcher=None,
+                         max_workers: int = MAX_WORKERS) -> pd.DataFrame:
+    """
+    Quét tên cầu thủ, đội bóng và giá trị chuyển nhượng từ footballtransfers.com (xem iter_player_pages).
+
+    Args:
+        num_pages (int, optional): Số trang; None để tự tìm trang cuối.
+        fetcher (optional): Đối tượng tải trang (xem fetcher.py). Mặc định tạo theo FETCHER_BACKEND.
+
+    Returns:
+        pd.DataFrame: Các hàng của mọi trang, theo thứ tự trang.
+    """
+    owns_fetcher = fetcher is None
+    if owns_fetcher:
+        fetcher = create_fetcher()
+    try:
+        pages = dict(iter_player_pages(base_url, fetcher, num_pages, max_workers))
+    finally:
+        if owns_fetcher:
+            fetcher.close()
+            print("Fetcher đã được đóng.")
 
     print("Quá trình quét dữ liệu từ web đã hoàn tất.")
-    if driver:
-        driver.quit()
-        print("WebDriver đã được đóng.")
-    if not players_data:
+    players_data = pd.concat([pages[page] for page in sorted(pages)], ignore_index=True)
+    if players_data.empty:
         print("CẢNH BÁO: Không thu thập được dữ liệu cầu thủ nào từ web.")
-    return pd.DataFrame(players_data)
+    return players_data
+
+def scrape_transfer_values(output_csv_path: str = SCRAPED_VALUES_CSV_PATH, fetcher=None) -> pd.DataFrame:
+    """
+    Quét toàn bộ giá trị cầu thủ (scrape_player_values) và lưu ra `output_csv_path`
+    để bước kết hợp (run_valuation) chạy riêng, ở tiến trình khác.
+    """
+    df_scraped = scrape_player_values(BASE_URL_SCRAPING, NUMBER_OF_PAGES_TO_SCRAPE, fetcher)
+    os.makedirs(os.path.dirname(output_csv_path) or ".", exist_ok=True)
+    df_scraped.to_csv(output_csv_path, index=False, encoding="utf-8")
+    print(f"Đã lưu {len(df_scraped)} mục giá trị cầu thủ vào {output_csv_path}.")
+    return df_scraped
+
+def read_scraped_values(scraped_csv_path: str = SCRAPED_VALUES_CSV_PATH) -> pd.DataFrame:
+    """Đọc lại tệp của scrape_transfer_values, giữ nguyên chuỗi (kể cả "N/A")."""
+    return pd.read_csv(scraped_csv_path, dtype=str, keep_default_na=False).reindex(columns=PLAYER_COLUMNS)
 
 # --- Bước 2: Hàm Đọc và Lọc Dữ liệu Thống kê Cầu thủ ---
+@traced()
 def read_and_filter_player_stats(stats_csv_path: str, min_playing_time: int, columns_to_keep: list) -> pd.DataFrame:
     """
     Đọc tệp CSV thống kê, lọc theo phút thi đấu và giữ lại các cột chỉ định.
     """
     print(f"\nĐang đọc dữ liệu thống kê từ tệp: {stats_csv_path}...")
     try:
-        df_stats = pd.read_csv(stats_csv_path)
+        df_stats = load_results(stats_csv_path)
         print("Đọc tệp CSV thống kê thành công.")
     except FileNotFoundError:
         print(f"LỖI: Không tìm thấy tệp '{stats_csv_path}'.")
@@ -98,10 +223,9 @@ def read_and_filter_player_stats(stats_csv_path: str, min_playing_time: int, col
             print(f"LỖI: Cột bắt buộc '{col}' không tìm thấy trong '{stats_csv_path}'.")
             return pd.DataFrame()
 
-    if df_stats['Min'].dtype == 'object': # Xử lý cột 'Min' nếu là dạng chuỗi (ví dụ: '1,234')
-        df_stats['Min'] = df_stats['Min'].astype(str).str.replace(',', '', regex=False)
-        df_stats['Min'] = pd.to_numeric(df_stats['Min'], errors='coerce')
-        df_stats.dropna(subset=['Min'], inplace=True)
+    # Xử lý cột 'Min' nếu là dạng chuỗi (ví dụ: '1,234')
+    df_stats['Min'] = clean_numeric(df_stats['Min'])
+    df_stats.dropna(subset=['Min'], inplace=True)
 
     filtered_players_df = df_stats[df_stats["Min"] > min_playing_time].copy()
     if filtered_players_df.empty:
@@ -115,17 +239,52 @@ def read_and_filter_player_stats(stats_csv_path: str, min_playing_time: int, col
     return final_df
 
 # --- Bước 3: Hàm Kết hợp Dữ liệu và Thêm Giá Trị ---
+@traced()
 def combine_data_and_add_values(
     df_filtered_stats: pd.DataFrame,
-    df_scraped_values: pd.DataFrame,
-    similarity_threshold: int
+    df_scraped_values,
+    similarity_threshold: int,
+    identity_map: IdentityMap = None
 ) -> pd.DataFrame:
     """
     Kết hợp DataFrame thống kê đã lọc với DataFrame giá trị từ web.
+
+    Args:
+        df_scraped_values: DataFrame giá trị từ web, hoặc luồng (số trang, DataFrame) của iter_player_pages:
+            khi đó mỗi trang được so khớp ngay khi tải xong (trong lúc chờ các trang khác), với kết quả
+            như khi so khớp với cả bảng ghép theo thứ tự trang.
+        identity_map (IdentityMap, optional): Bảng định danh được tra trước; chỉ cầu thủ chưa có trong bảng
+            (hoặc tên đã lưu không còn trên web, điểm đã lưu dưới ngưỡng) mới được so khớp mờ, và cặp mới tìm
+            được sẽ được lưu lại.
     """
     if df_filtered_stats.empty:
         print("LỖI: DataFrame thống kê cầu thủ đã lọc trống khi kết hợp.")
         return pd.DataFrame()
+
+    df_combined = df_filtered_stats.copy()
+    players = df_combined["Player"].astype(str).tolist()
+    stats_teams = df_combined['Squad'].tolist() if 'Squad' in df_combined.columns else None
+    known = identity_map.lookup(players, stats_teams) if identity_map is not None else None
+    # Cặp đã lưu được tin dùng (nếu tên còn trên web); các cầu thủ còn lại được so khớp theo từng trang
+    trusted = np.zeros(len(df_combined), dtype=bool)
+    if known is not None:
+        trusted = ((known["Source"] == "manual") | (known["Score"] >= similarity_threshold)).to_numpy()
+    to_match = np.flatnonzero(~trusted)
+    matcher = IncrementalMatcher([players[i] for i in to_match], similarity_threshold,
+                                 [stats_teams[i] for i in to_match] if stats_teams is not None else None)
+    pages = {}
+    is_stream = not isinstance(df_scraped_values, pd.DataFrame)
+    for page, frame in (df_scraped_values if is_stream else [(1, df_scraped_values)]):
+        pages[page] = frame
+        if len(to_match) and 'Player' in frame.columns:
+            page_names = frame['Player'].dropna()
+            page_teams = frame.loc[page_names.index, 'Team'].tolist() if 'Team' in frame.columns else None
+            matcher.add(page, page_names.astype(str).tolist(), page_teams)
+    ordered_pages = sorted(pages)
+    if is_stream:
+        df_scraped_values = (pd.concat([pages[page] for page in ordered_pages], ignore_index=True) if pages
+                             else pd.DataFrame(columns=PLAYER_COLUMNS))
+
     if df_scraped_values.empty:
         print("CẢNH BÁO: DataFrame giá trị từ web trống khi kết hợp. Sẽ trả về DataFrame thống kê chưa có giá trị.")
         df_filtered_stats['Transfer_Value'] = None
@@ -133,35 +292,59 @@ def combine_data_and_add_values(
         return df_filtered_stats
 
     print("\nBắt đầu quá trình kết hợp dữ liệu và thêm giá trị chuyển nhượng...")
-    df_combined = df_filtered_stats.copy()
     df_combined["Transfer_Value"] = None
 
     if 'Player' not in df_scraped_values.columns or 'Value_Scraped' not in df_scraped_values.columns:
         print("LỖI: DataFrame từ web thiếu cột 'Player' hoặc 'Value_Scraped'.")
         return df_combined # Trả về với cột giá trị rỗng
 
-    scraped_player_names = df_scraped_values['Player'].dropna().astype(str).tolist()
-    if not scraped_player_names:
+    scraped_names = df_scraped_values['Player'].dropna().astype(str)
+    if scraped_names.empty:
         print("CẢNH BÁO: Không có tên cầu thủ nào trong DataFrame từ web để so khớp.")
         return df_combined
+    scraped_player_names = scraped_names.tolist()
+    scraped_teams = df_scraped_values.loc[scraped_names.index, 'Team'].tolist() if 'Team' in df_scraped_values.columns else None
 
-    print(f"Thực hiện so khớp tên cho {len(df_combined)} cầu thủ đã lọc...")
-    matched_count = 0
-    for index, row in df_combined.iterrows():
-        player_name_to_match = str(row["Player"])
-        match_result = process.extractOne(
-            player_name_to_match,
-            scraped_player_names,
-            scorer=fuzz.token_sort_ratio
-        )
-        if match_result:
-            best_match_name, score, _ = match_result
-            if score >= similarity_threshold:
-                value_series = df_scraped_values.loc[df_scraped_values["Player"] == best_match_name, "Value_Scraped"]
-                if not value_series.empty:
-                    df_combined.at[index, "Transfer_Value"] = value_series.iloc[0]
-                    df_combined.at[index, "Match_Score"] = score
-                    matched_count += 1
+    # Giá trị của mỗi tên: lấy hàng đầu tiên có tên đó trong dữ liệu web (tra bằng Index.get_indexer)
+    value_by_name = df_scraped_values.drop_duplicates(subset='Player').set_index('Player')['Value_Scraped']
+
+    matched_names = np.full(len(df_combined), None, dtype=object)
+    match_scores = np.full(len(df_combined), np.nan)
+    match_index = np.full(len(df_combined), -1, dtype=np.int64)
+    retry = np.zeros(0, dtype=np.int64)
+    if known is not None:
+        usable = trusted & (value_by_name.index.get_indexer(known["Site_Player"]) >= 0)
+        matched_names[usable] = known["Site_Player"].to_numpy(dtype=object)[usable]
+        match_scores[usable] = known["Score"].to_numpy(dtype="float64")[usable]
+        print(f"Đã có {int(usable.sum())} cầu thủ trong bảng định danh '{identity_map.path}'.")
+        # Tên đã lưu không còn trên web: so khớp lại với toàn bộ danh sách
+        retry = np.flatnonzero(trusted & ~usable)
+        if len(retry):
+            match_index[retry], match_scores[retry] = match_names(
+                [players[i] for i in retry], scraped_player_names, similarity_threshold,
+                query_teams=[stats_teams[i] for i in retry] if stats_teams is not None else None,
+                choice_teams=scraped_teams)
+
+    print(f"Thực hiện so khớp tên cho {len(to_match) + len(retry)} cầu thủ đã lọc...")
+    if len(to_match):
+        page_sizes = [int(pages[page]['Player'].notna().sum()) for page in ordered_pages]
+        page_starts = dict(zip(ordered_pages, np.cumsum([0] + page_sizes[:-1]).tolist()))
+        match_index[to_match], match_scores[to_match] = matcher.result(page_starts)
+    fuzzy_rows = np.flatnonzero(match_index >= 0)
+    matched_names[fuzzy_rows] = [scraped_player_names[j] for j in match_index[fuzzy_rows]]
+    if identity_map is not None and len(fuzzy_rows):
+        identity_map.record(
+            [players[i] for i in fuzzy_rows], [stats_teams[i] for i in fuzzy_rows] if stats_teams is not None else None,
+            matched_names[fuzzy_rows].tolist(),
+            [scraped_teams[j] for j in match_index[fuzzy_rows]] if scraped_teams is not None else None,
+            match_scores[fuzzy_rows].tolist())
+
+    matched = pd.notna(matched_names)
+    transfer_values = np.full(len(df_combined), None, dtype=object)
+    transfer_values[matched] = value_by_name.to_numpy(dtype=object)[value_by_name.index.get_indexer(matched_names[matched])]
+    df_combined["Transfer_Value"] = transfer_values
+    df_combined["Match_Score"] = match_scores
+    matched_count = int(matched.sum())
             
     print(f"Hoàn tất so khớp. Đã tìm thấy và gán giá trị cho {matched_count} cầu thủ.")
     
@@ -173,75 +356,126 @@ def combine_data_and_add_values(
     
     return df_combined.reset_index(drop=True)
 
-# --- Bước 4: Hàm Chính (Main Function) ---
-def main():
+# --- Bước 4: Hàm Lưu Kết Quả và Hàm Chính ---
+def save_final_output(df_final_output: pd.DataFrame, df_scraped: pd.DataFrame, identity_map: IdentityMap = None,
+                      force: bool = False) -> bool:
     """
-    Hàm chính điều phối toàn bộ quy trình:
-    1. Thu thập dữ liệu giá trị cầu thủ từ web.
-    2. Đọc và lọc dữ liệu thống kê cầu thủ từ tệp CSV.
-    3. Kết hợp hai bộ dữ liệu.
-    4. Lưu kết quả cuối cùng ra tệp CSV.
-    """
-    print("--- BẮT ĐẦU QUY TRÌNH THU THẬP DỮ LIỆU CHUYỂN NHƯỢNG CẦU THỦ ---")
+    Lưu kết quả ra OUTPUT_FINAL_CSV_PATH, trừ khi results.csv, dữ liệu từ web, cấu hình và các cặp
+    chỉ định thủ công đều không đổi so với lần ghi trước (và không có `force`).
 
-    # 1. Thu thập dữ liệu từ web
-    df_scraped = scrape_player_values(BASE_URL_SCRAPING, NUMBER_OF_PAGES_TO_SCRAPE)
-    if df_scraped.empty:
-        print("Không thể thu thập dữ liệu từ web. Kết thúc quy trình.")
-        return
-    print(f"\nĐã thu thập {len(df_scraped)} mục giá trị cầu thủ từ web.")
-    # print("5 dòng đầu dữ liệu từ web:\n", df_scraped.head())
+    Returns:
+        bool: True nếu tệp được ghi lại.
+    """
+    manifest = Manifest()
+    stage_inputs = {
+        INPUT_STATS_CSV_PATH: fingerprint_file(INPUT_STATS_CSV_PATH),
+        typed_path(INPUT_STATS_CSV_PATH): fingerprint_file(typed_path(INPUT_STATS_CSV_PATH)),
+        "scraped_values": fingerprint_frame(df_scraped),
+        "config": fingerprint_config(
+            min_playing_time=MINIMUM_PLAYING_TIME_MINS,
+            threshold=FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT,
+            columns=COLUMNS_TO_KEEP_FROM_STATS_FILE,
+        ),
+        "identity_overrides": identity_map.fingerprint() if identity_map is not None else None,
+    }
+    if not force and manifest.is_up_to_date("P4", stage_inputs, [OUTPUT_FINAL_CSV_PATH]):
+        print(f"\nĐầu vào không đổi từ lần chạy trước, giữ nguyên tệp {OUTPUT_FINAL_CSV_PATH}.")
+        return False
+    try:
+        df_final_output.to_csv(OUTPUT_FINAL_CSV_PATH, index=False, encoding='utf-8-sig') # utf-8-sig để Excel mở tiếng Việt tốt hơn
+        print(f"\n--- DỮ LIỆU CUỐI CÙNG ĐÃ ĐƯỢC LƯU VÀO TỆP: {OUTPUT_FINAL_CSV_PATH} ---")
+        manifest.record("P4", stage_inputs, [OUTPUT_FINAL_CSV_PATH])
+        return True
+    except Exception as e:
+        print(f"LỖI: Không thể lưu kết quả vào tệp CSV. Lỗi: {e}")
+        return False
 
+def _report_final_output(df_final_output: pd.DataFrame) -> bool:
+    if df_final_output.empty:
+        print("\nKhông có dữ liệu nào sau khi kết hợp. Kết thúc quy trình.")
+        return False
+    print(f"\nTổng số cầu thủ trong kết quả cuối cùng: {len(df_final_output)}")
+    print("\n5 dòng đầu của dữ liệu kết hợp cuối cùng:")
+    print(df_final_output.head())
+    return True
 
-    # 2. Đọc và lọc dữ liệu thống kê
-    # Tạo tệp results.csv giả để thử nghiệm nếu chưa có
-    try:
-        with open(INPUT_STATS_CSV_PATH, 'r') as f:
-            pass # Tệp tồn tại
-    except FileNotFoundError:
-        print(f"\nCẢNH BÁO: Tệp '{INPUT_STATS_CSV_PATH}' không tìm thấy. Tạo tệp mẫu...")
-        sample_data_stats = {
-            'Player': ['Robert Lewandowski', 'Kylian Mbappe', 'Erling Haaland', 'Mohamed Salah', 'Lionel Messi Jr.', 'Kevin De Bruyne', 'Sadio Mane'],
-            'Nation': ['POL', 'FRA', 'NOR', 'EGY', 'ARG', 'BEL', 'SEN'],
-            'Pos': ['FW', 'FW', 'FW', 'FW', 'FW', 'MF', 'FW'],
-            'Squad': ['Barcelona', 'PSG', 'Man City', 'Liverpool', 'Inter Miami', 'Man City', 'Al-Nassr'],
-            'Age': [35, 25, 23, 31, 36, 32, 31],
-            'Min': [3000, 2800, 2500, 3200, 850, 2700, 700], # Một số < 900
-        }
-        pd.DataFrame(sample_data_stats).to_csv(INPUT_STATS_CSV_PATH, index=False)
-        print(f"Tệp mẫu '{INPUT_STATS_CSV_PATH}' đã được tạo. Vui lòng kiểm tra và cập nhật nếu cần.")
-
-    df_stats_filtered = read_and_filter_player_stats(
+def load_filtered_stats() -> pd.DataFrame:
+    """Đọc và lọc results.csv theo cấu hình; DataFrame rỗng nếu thiếu tệp (chạy P1 trước)."""
+    if not os.path.exists(INPUT_STATS_CSV_PATH):
+        print(f"\nLỖI: Không tìm thấy tệp '{INPUT_STATS_CSV_PATH}'. Hãy chạy P1.py (hoặc pipeline.py) trước.")
+        return pd.DataFrame()
+    return read_and_filter_player_stats(
         INPUT_STATS_CSV_PATH,
         MINIMUM_PLAYING_TIME_MINS,
         COLUMNS_TO_KEEP_FROM_STATS_FILE
     )
+
+@traced()
+def run_valuation(scraped_csv_path: str = SCRAPED_VALUES_CSV_PATH, force: bool = False) -> bool:
+    """
+    Kết hợp results.csv với giá trị cầu thủ đã quét sẵn (scrape_transfer_values) rồi lưu kết quả.
+    Dùng cho bước "valuation" của pipeline.py; main() thì quét và kết hợp cùng lúc.
+
+    Returns:
+        bool: True nếu tệp kết quả được ghi lại.
+    """
+    df_stats_filtered = load_filtered_stats()
+    if df_stats_filtered.empty:
+        raise RuntimeError("Không có dữ liệu thống kê nào sau khi lọc.")
+    df_scraped = read_scraped_values(scraped_csv_path)
+    if df_scraped.empty:
+        raise RuntimeError(f"Tệp '{scraped_csv_path}' không có dữ liệu giá trị cầu thủ.")
+    identity_map = IdentityMap(IDENTITY_MAP_PATH) if IDENTITY_MAP_PATH else None
+    df_final_output = combine_data_and_add_values(
+        df_stats_filtered, df_scraped, FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT, identity_map)
+    if not _report_final_output(df_final_output):
+        return False
+    return save_final_output(df_final_output, df_scraped, identity_map, force)
+
+def main():
+    """
+    Hàm chính điều phối toàn bộ quy trình:
+    1. Đọc và lọc dữ liệu thống kê cầu thủ từ tệp CSV.
+    2. Thu thập dữ liệu giá trị cầu thủ từ web, kết hợp từng trang ngay khi trang đó tải xong.
+    3. Lưu kết quả cuối cùng ra tệp CSV.
+    """
+    print("--- BẮT ĐẦU QUY TRÌNH THU THẬP DỮ LIỆU CHUYỂN NHƯỢNG CẦU THỦ ---")
+
+    # 1. Đọc và lọc dữ liệu thống kê
+    df_stats_filtered = load_filtered_stats()
     if df_stats_filtered.empty:
         print("Không có dữ liệu thống kê nào sau khi lọc. Kết thúc quy trình.")
         return
-    # print("\n5 dòng đầu dữ liệu thống kê đã lọc:\n", df_stats_filtered.head())
 
-    # 3. Kết hợp dữ liệu
-    df_final_output = combine_data_and_add_values(
-        df_stats_filtered,
-        df_scraped,
-        FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT
-    )
+    # 2. Thu thập dữ liệu từ web và kết hợp theo từng trang
+    identity_map = IdentityMap(IDENTITY_MAP_PATH) if IDENTITY_MAP_PATH else None
+    scraped_pages = {}
 
-    if df_final_output.empty:
-        print("\nKhông có dữ liệu nào sau khi kết hợp. Kết thúc quy trình.")
-        return
-    
-    print(f"\nTổng số cầu thủ trong kết quả cuối cùng: {len(df_final_output)}")
-    print("\n5 dòng đầu của dữ liệu kết hợp cuối cùng:")
-    print(df_final_output.head())
+    def stream_pages(fetcher):
+        for page, frame in iter_player_pages(BASE_URL_SCRAPING, fetcher, NUMBER_OF_PAGES_TO_SCRAPE):
+            scraped_pages[page] = frame
+            yield page, frame
 
-    # 4. Lưu kết quả
+    fetcher = create_fetcher()
     try:
-        df_final_output.to_csv(OUTPUT_FINAL_CSV_PATH, index=False, encoding='utf-8-sig') # utf-8-sig để Excel mở tiếng Việt tốt hơn
-        print(f"\n--- DỮ LIỆU CUỐI CÙNG ĐÃ ĐƯỢC LƯU VÀO TỆP: {OUTPUT_FINAL_CSV_PATH} ---")
-    except Exception as e:
-        print(f"LỖI: Không thể lưu kết quả vào tệp CSV. Lỗi: {e}")
+        df_final_output = combine_data_and_add_values(
+            df_stats_filtered,
+            stream_pages(fetcher),
+            FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT,
+            identity_map
+        )
+    finally:
+        fetcher.close()
+        print("Fetcher đã được đóng.")
+    df_scraped = pd.concat([scraped_pages[page] for page in sorted(scraped_pages)], ignore_index=True)
+    if df_scraped.empty:
+        print("Không thể thu thập dữ liệu từ web. Kết thúc quy trình.")
+        return
+    print(f"\nĐã thu thập {len(df_scraped)} mục giá trị cầu thủ từ {len(scraped_pages)} trang web.")
+
+    # 3. Lưu kết quả
+    if _report_final_output(df_final_output):
+        save_final_output(df_final_output, df_scraped, identity_map)
 
     print("\n--- KẾT THÚC QUY TRÌNH ---")
 
@@ -0,0 +1,76 @@
+"""
+So sánh thời gian chạy và RSS đỉnh của hai backend tải trang ("http" và "selenium")
+khi P1 lấy 8 bảng từ máy chủ giả lập cục bộ.
+
+Mỗi backend chạy trong một tiến trình con riêng để RSS đỉnh không ảnh hưởng lẫn nhau;
+RSS đỉnh gồm cả tiến trình Python và các tiến trình con (Chrome, chromedriver) đã kết thúc.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_backends --players 500 --latency 0.2
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import P1
+from fbref_fixtures import serve_directory, write_fbref_pages
+from fetcher import make_fetcher
+
+
+def run_one(backend: str, source: str, workers: int):
+    start = time.perf_counter()
+    fetcher = make_fetcher(source, backend=backend, pool_size=workers, min_interval=0, cache_mode="off")
+    try:
+        tables = P1.fetch_all_tables(P1.links, fetcher, max_workers=workers)
+    finally:
+        fetcher.close()
+    elapsed = time.perf_counter() - start
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({
+        "backend": backend,
+        "seconds": round(elapsed, 3),
+        "rows": sum(len(df) for df in tables.values()),
+        "peak_rss_mb": round((self_rss + child_rss) / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="Độ trễ mỗi request của máy chủ giả lập")
+    parser.add_argument("--workers", type=int, default=P1.MAX_WORKERS)
+    parser.add_argument("--backends", nargs="+", default=["http", "selenium"])
+    parser.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--source", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(args.run_one, args.source, args.workers)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server, base_url = serve_directory(write_fbref_pages(tmp, P1.links, args.players), args.latency)
+        try:
+            for backend in args.backends:
+                proc = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_backends", "--run-one", backend,
+                     "--source", base_url, "--workers", str(args.workers)],
+                    capture_output=True, text=True)
+                lines = proc.stdout.strip().splitlines()
+                if proc.returncode != 0 or not lines:
+                    print(f"{backend:>9}: LỖI - {proc.stderr.strip().splitlines()[-1:]}")
+                    continue
+                result = json.loads(lines[-1])
+                print(f"{backend:>9}: {result['seconds']:.2f}s, RSS đỉnh {result['peak_rss_mb']} MB, "
+                      f"{result['rows']} hàng")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Đo lợi ích của bộ đệm trang web: lần chạy đầu (tải từ máy chủ giả lập),
+lần chạy lại khi trang đã cũ (xác thực lại bằng If-Modified-Since -> 304)
+và lần chạy ở chế độ cache-only (không cần mạng).
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_cache --players 500 --latency 0.3
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import P1
+from fbref_fixtures import serve_directory, write_fbref_pages
+from fetcher import make_fetcher
+
+
+def timed_run(source: str, cache_dir: str, cache_mode: str, cache_ttl: float, workers: int):
+    fetcher = make_fetcher(source, min_interval=0, pool_size=workers, cache_mode=cache_mode,
+                           cache_dir=cache_dir, cache_ttl=cache_ttl)
+    start = time.perf_counter()
+    try:
+        tables = P1.fetch_all_tables(P1.links, fetcher, max_workers=workers)
+    finally:
+        fetcher.close()
+    return time.perf_counter() - start, tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=P1.MAX_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pages_dir = write_fbref_pages(os.path.join(tmp, "pages"), P1.links, args.players)
+        cache_dir = os.path.join(tmp, "cache")
+        server, base_url = serve_directory(pages_dir, args.latency)
+        try:
+            cold, _ = timed_run(base_url, cache_dir, "default", 3600, args.workers)
+            stale, _ = timed_run(base_url, cache_dir, "default", 0, args.workers)
+        finally:
+            server.shutdown()
+        warm, tables = timed_run(base_url, cache_dir, "cache-only", 3600, args.workers)
+    print(f"Lần đầu (tải mạng):         {cold:.2f}s")
+    print(f"Trang cũ (xác thực lại 304): {stale:.2f}s")
+    print(f"cache-only (không mạng):     {warm:.2f}s, {sum(len(df) for df in tables.values())} hàng")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Đo bước làm sạch bảng fbref: cách cũ (str.contains trên Rk + df.apply theo từng hàng,
+rồi clean_numeric của P3 với astype(str) trên mọi cột) so với cleaning.clean_fbref_table.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_cleaning --players 600 6000
+"""
+import argparse
+import time
+from io import StringIO
+
+import pandas as pd
+
+from cleaning import clean_fbref_table
+from fbref_fixtures import make_players, make_table_html
+
+
+def old_cleaning(df):
+    df = df[~df["Rk"].astype(str).str.contains("Rk", na=False)]
+    df = df[df.apply(lambda row: not any(row.astype(str) == row.name), axis=1)]
+    return df.apply(lambda col: pd.to_numeric(col.astype(str).str.replace('%', '', regex=False), errors='coerce'))
+
+
+def best_of(func, arg, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[600, 6000])
+    parser.add_argument("--table", default="stats_standard")
+    args = parser.parse_args()
+
+    for n_players in args.players:
+        html = make_table_html(args.table, make_players(n_players))
+        raw = pd.read_html(StringIO(html), header=1)[0]
+        t_old = best_of(old_cleaning, raw)
+        t_new = best_of(clean_fbref_table, raw)
+        print(f"{n_players:>7} hàng: cũ {t_old * 1000:8.1f} ms | mới {t_new * 1000:8.1f} ms | nhanh hơn {t_old / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Đo thời gian tải 8 bảng fbref của P1: tuần tự (1 luồng) so với song song.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_fetch --latency 1.5
+    python -m benchmarks.bench_fetch --source http://127.0.0.1:8000
+"""
+import argparse
+import tempfile
+import time
+
+import P1
+from fbref_fixtures import write_fbref_pages
+from fetcher import DirectoryFetcher, make_fetcher
+
+
+class LatencyFetcher:
+    """Bọc một fetcher và thêm độ trễ cố định mỗi trang, mô phỏng thời gian tải trang thật."""
+
+    def __init__(self, inner, latency: float):
+        self.inner = inner
+        self.latency = latency
+
+    def fetch(self, url, table_id=None, table_class=None):
+        time.sleep(self.latency)
+        return self.inner.fetch(url, table_id=table_id, table_class=table_class)
+
+    def close(self):
+        self.inner.close()
+
+
+def run(fetcher, workers: int):
+    start = time.perf_counter()
+    tables = P1.fetch_all_tables(P1.links, fetcher, max_workers=workers)
+    fetched = time.perf_counter() - start
+    all_df = P1.merge_tables(tables)
+    return fetched, time.perf_counter() - start, all_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source", default=None, help="Máy chủ giả lập hoặc thư mục HTML; mặc định tự sinh trang giả")
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=1.0, help="Độ trễ mô phỏng mỗi trang (chỉ với trang tự sinh)")
+    parser.add_argument("--workers", type=int, default=P1.MAX_WORKERS)
+    parser.add_argument("--min-interval", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.source:
+            fetcher = make_fetcher(args.source, min_interval=args.min_interval, cache_mode="off")
+        else:
+            fetcher = LatencyFetcher(DirectoryFetcher(write_fbref_pages(tmp, P1.links, args.players)), args.latency)
+        try:
+            results = {}
+            for label, workers in (("tuần tự", 1), ("song song", args.workers)):
+                fetched, total, all_df = run(fetcher, workers)
+                results[label] = all_df
+                print(f"{label:>10}: tải {fetched:.2f}s, tổng {total:.2f}s, all_df {all_df.shape}")
+        finally:
+            fetcher.close()
+    serial, parallel = results.values()
+    print("Kết quả giống nhau:", serial.equals(parallel))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Đo việc tạo bảng results2.csv: cách cũ (agg rồi duyệt iterrows, .get từng cột cho từng đội)
+so với group_stats.group_stats (mỗi thống kê tính một lần cho mọi đội, xếp kết quả bằng numpy).
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_group_stats --players 5000 50000 --squads 20 2000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from fbref_fixtures import make_results_frame
+from group_stats import group_stats
+
+
+def old_results2(df, numeric_cols):
+    all_league_stats = df[numeric_cols].agg(['median', 'mean', 'std']).T
+    columns = ['Squad']
+    for col_stat in numeric_cols:
+        columns.extend([f"Median của {col_stat}", f"Mean của {col_stat}", f"Std của {col_stat}"])
+    rows = [['all'] + [all_league_stats.loc[col, stat] for col in numeric_cols for stat in ('median', 'mean', 'std')]]
+    team_stats = df.groupby('Squad')[numeric_cols].agg(['median', 'mean', 'std'])
+    for team_name, stats in team_stats.iterrows():
+        values = []
+        for col_stat in numeric_cols:
+            values.extend([stats.get((col_stat, 'median'), np.nan), stats.get((col_stat, 'mean'), np.nan),
+                           stats.get((col_stat, 'std'), np.nan)])
+        rows.append([team_name] + values)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def best_of(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--squads", type=int, nargs="+", default=[20, 2000])
+    args = parser.parse_args()
+
+    for n_players in args.players:
+        for n_squads in args.squads:
+            df = make_results_frame(n_players, n_squads)
+            numeric_cols = df.select_dtypes(include='number').columns.tolist()
+            t_old, old = best_of(lambda: old_results2(df, numeric_cols))
+            t_new, new = best_of(lambda: group_stats(df, numeric_cols))
+            pd.testing.assert_frame_equal(old, new, check_dtype=False)
+            print(f"{n_players:>7} cầu thủ, {n_squads:>5} đội: cũ {t_old * 1000:8.1f} ms | "
+                  f"mới {t_new * 1000:8.1f} ms | nhanh hơn {t_old / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
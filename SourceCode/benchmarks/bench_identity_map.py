@@ -0,0 +1,55 @@
+"""
+Đo P4.combine_data_and_add_values với bảng định danh (identity_map.IdentityMap): lần chạy đầu
+(bảng trống, so khớp mờ mọi cầu thủ rồi lưu lại) so với lần chạy sau (chỉ tra bảng).
+Tính đúng đắn (cùng kết quả với so khớp mờ, cặp thủ công được giữ) nằm trong tests/test_identity_map.py.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_identity_map --names 5000 50000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from fbref_fixtures import make_transfer_datasets
+from identity_map import IdentityMap
+from P4 import FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT, combine_data_and_add_values
+
+
+def timed_combine(df_stats, df_scraped, identity_map):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = combine_data_and_add_values(df_stats, df_scraped, FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT,
+                                             identity_map)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--unmatched", type=float, default=0.05, help="Tỉ lệ cầu thủ không có trên trang giá trị")
+    parser.add_argument("--new-players", type=float, default=0.02,
+                        help="Tỉ lệ cầu thủ mới ở lần chạy thứ ba (phải so khớp mờ)")
+    args = parser.parse_args()
+
+    for n_names in args.names:
+        df_stats, df_scraped = make_transfer_datasets(n_names, args.unmatched)
+        with tempfile.TemporaryDirectory() as tmp:
+            identity_map = IdentityMap(os.path.join(tmp, "identity.sqlite"))
+            _, t_no_map = timed_combine(df_stats, df_scraped, None)
+            _, t_cold = timed_combine(df_stats, df_scraped, identity_map)
+            _, t_warm = timed_combine(df_stats, df_scraped, identity_map)
+            # Lần chạy thứ ba: một phần cầu thủ đổi tên (cầu thủ mới), chỉ họ cần so khớp mờ
+            changed = df_stats.copy()
+            n_new = int(len(changed) * args.new_players)
+            changed.loc[:n_new - 1, "Player"] = changed.loc[:n_new - 1, "Player"] + " Jr"
+            _, t_partial = timed_combine(changed, df_scraped, identity_map)
+        print(f"{n_names:>6} x {n_names:>6} tên: không có bảng {t_no_map:7.2f}s | lần đầu {t_cold:7.2f}s | "
+              f"lần sau {t_warm:6.3f}s | {n_new} cầu thủ mới {t_partial:6.3f}s | "
+              f"nhanh hơn ~{t_no_map / t_warm:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
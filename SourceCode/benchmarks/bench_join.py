@@ -0,0 +1,51 @@
+"""
+So sánh cách gộp 8 bảng của P1: 7 lần pd.merge liên tiếp (merge_tables) và gộp một lần
+trên chỉ mục (Player, Squad) sau khi bỏ các cột không cần (join_tables).
+Thời gian đo khi tắt tracemalloc; bộ nhớ là đỉnh cấp phát thêm trong một lần chạy riêng có tracemalloc.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_join --players 500 5000 50000
+"""
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+
+import P1
+from fbref_fixtures import make_fbref_frames
+
+
+def measure(func, *args):
+    """Chạy func(*args), trả về (kết quả, số giây, MB cấp phát thêm ở đỉnh)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        del result
+        # tracemalloc làm chậm mọi cấp phát nên chỉ bật trong lần chạy đo bộ nhớ
+        tracemalloc.start()
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[500, 5000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'cầu thủ':>8} | {'merge (s)':>9} {'MB':>7} {'cột':>4} | {'join (s)':>9} {'MB':>7} {'cột':>4} | giống nhau")
+    for n_players in args.players:
+        tables = make_fbref_frames(P1.links, n_players)
+        merged, t_merge, m_merge = measure(P1.merge_tables, tables)
+        joined, t_join, m_join = measure(P1.join_tables, tables, P1.columns_to_keep)
+        cols = [c for c in P1.columns_to_keep if c in merged.columns]
+        same = merged[cols].reset_index(drop=True).equals(joined[cols].reset_index(drop=True))
+        print(f"{n_players:>8} | {t_merge:>9.3f} {m_merge:>7.1f} {merged.shape[1]:>4} | "
+              f"{t_join:>9.3f} {m_join:>7.1f} {joined.shape[1]:>4} | {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Đo việc chọn số cụm K của P3: cách cũ (KMeans n_init=10 cho mọi k từ 1 đến 29 rồi huấn luyện
+lại K tối ưu) so với kselect.select_k ở các chế độ full / minibatch / warm, có và không dừng sớm.
+
+Dữ liệu giả lập lấy mẫu lại các hàng của results.csv (đã chuẩn hóa) kèm nhiễu nhỏ để giữ cấu trúc cụm
+thật. Ở quy mô đó cách cũ rất lâu nên mặc định được thay bằng "full" không dừng sớm
+(cùng 29 lần KMeans n_init=10, chỉ thiếu lần huấn luyện lại); dùng --old-synthetic để đo thật.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_kselect --results results.csv --players 100000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+
+from kselect import DEFAULT_K_RANGE, elbow_k, select_k
+from schema import load_results
+
+
+def scaled_matrix(df):
+    numeric = df.drop(columns=["Player", "Squad", "Nation", "Pos", "Age"], errors="ignore").select_dtypes(include="number")
+    return StandardScaler().fit_transform(SimpleImputer(strategy="mean").fit_transform(numeric))
+
+
+def resample_matrix(X, n_rows, noise=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    return X[rng.integers(0, len(X), n_rows)] + rng.normal(0.0, noise, (n_rows, X.shape[1]))
+
+
+def old_selection(X, k_range):
+    inertia = [KMeans(n_clusters=k, random_state=42, n_init=10).fit(X).inertia_ for k in k_range]
+    k = elbow_k(list(k_range), inertia)
+    KMeans(n_clusters=k, random_state=42, n_init=10).fit(X)
+    return k
+
+
+def run(name, X, k_range, measure_old):
+    print(f"--- {name}: {X.shape[0]} hàng x {X.shape[1]} cột ---")
+    t_old = None
+    if measure_old:
+        start = time.perf_counter()
+        k_old = old_selection(X, k_range)
+        t_old = time.perf_counter() - start
+        print(f"  cũ (29 k, huấn luyện lại):  K={k_old:>2}  {t_old:7.2f}s")
+    variants = [("full", "inertia", False), ("full", "inertia", True), ("minibatch", "inertia", True),
+                ("warm", "inertia", True), ("minibatch", "silhouette", False)]
+    for mode, score, early_stop in variants:
+        selection = select_k(X, k_range, mode=mode, score=score, early_stop=early_stop)
+        label = f"{mode}/{score}{' + dừng sớm' if early_stop else ''}"
+        if t_old is None:
+            t_old = selection.seconds  # "full" không dừng sớm làm mốc thay cho cách cũ
+        speedup = f" | nhanh hơn {t_old / selection.seconds:5.1f}x"
+        print(f"  {label:<28} K={selection.k:>2}  {selection.seconds:7.2f}s  ({len(selection.ks)} k){speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--results", default="results.csv")
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--max-k", type=int, default=DEFAULT_K_RANGE.stop - 1)
+    parser.add_argument("--old-synthetic", action="store_true",
+                        help="Đo cả cách cũ trên dữ liệu giả lập (290 lần KMeans trên 100k hàng, rất lâu)")
+    args = parser.parse_args()
+
+    k_range = range(1, args.max_k + 1)
+    X = scaled_matrix(load_results(args.results))
+    run(args.results, X, k_range, measure_old=True)
+    run("giả lập", resample_matrix(X, args.players), k_range, measure_old=args.old_synthetic)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Đo việc so khớp tên cầu thủ của P4: cách cũ (iterrows + process.extractOne trên toàn bộ danh sách,
+rồi lọc DataFrame để lấy giá trị) so với name_matching.match_names (chia khối theo đội/token,
+chấm điểm theo lô bằng process.cpdist/cdist, tra giá trị bằng dict). Tính đúng đắn (cùng kết quả với
+process.extractOne) được kiểm tra trong tests/test_name_matching.py.
+
+Cách cũ chỉ được đo trên một mẫu --old-sample truy vấn rồi nhân lên cho toàn bộ.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_matching --names 50000
+"""
+import argparse
+import time
+
+from fbref_fixtures import make_transfer_datasets
+from P4 import FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT, combine_data_and_add_values
+
+
+def old_combine(df_stats, df_scraped, threshold):
+    from rapidfuzz import fuzz, process
+    df = df_stats.copy()
+    df["Transfer_Value"] = None
+    names = df_scraped["Player"].dropna().astype(str).tolist()
+    for index, row in df.iterrows():
+        best_name, score, _ = process.extractOne(str(row["Player"]), names, scorer=fuzz.token_sort_ratio)
+        if score >= threshold:
+            values = df_scraped.loc[df_scraped["Player"] == best_name, "Value_Scraped"]
+            if not values.empty:
+                df.at[index, "Transfer_Value"] = values.iloc[0]
+                df.at[index, "Match_Score"] = score
+    return df.dropna(subset=["Transfer_Value"]).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, nargs="+", default=[500, 50000])
+    parser.add_argument("--unmatched", type=float, default=0.05, help="Tỉ lệ cầu thủ không có trên trang giá trị")
+    parser.add_argument("--old-sample", type=int, default=300)
+    args = parser.parse_args()
+    threshold = FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT
+
+    for n_names in args.names:
+        df_stats, df_scraped = make_transfer_datasets(n_names, args.unmatched)
+        sample = df_stats.head(min(args.old_sample, n_names))
+        start = time.perf_counter()
+        old_combine(sample, df_scraped, threshold)
+        t_old = (time.perf_counter() - start) * n_names / len(sample)
+
+        start = time.perf_counter()
+        new = combine_data_and_add_values(df_stats, df_scraped, threshold)
+        t_new = time.perf_counter() - start
+        print(f"{n_names:>6} x {n_names:>6} tên: cũ ~{t_old:9.1f}s (ước tính từ {len(sample)} truy vấn) | "
+              f"mới {t_new:7.2f}s | nhanh hơn ~{t_old / t_new:6.1f}x | khớp {len(new)}/{n_names}")
+
+
+if __name__ == "__main__":
+    main()
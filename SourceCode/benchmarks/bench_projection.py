@@ -0,0 +1,73 @@
+"""
+Đo bước chiếu và vẽ cụm của P3 trên nhiều cầu thủ: cách cũ (PCA(n_components=2) rồi biểu đồ phân tán từng điểm)
+so với projection (fit_projection chọn svd_solver theo kích thước, cluster_profiles, ảnh mật độ render_density),
+và kiểm tra hai cách PCA cho cùng phương sai giải thích.
+
+Dữ liệu giả lập lấy mẫu lại các hàng của results.csv (đã chuẩn hóa) kèm nhiễu nhỏ như bench_kselect;
+nhãn cụm lấy từ MiniBatchKMeans 8 cụm. Biểu đồ phân tán rất chậm ở quy mô lớn nên chỉ đo đến --scatter-max.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_projection --results results.csv --players 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import PCA
+
+from benchmarks.bench_kselect import resample_matrix, scaled_matrix
+from projection import cluster_profiles, fit_projection, pca_solver, render_density
+from schema import load_results
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def old_scatter(coords, labels, path):
+    plt.figure(figsize=(8, 5))
+    plt.scatter(coords[:, 0], coords[:, 1], c=labels, cmap='viridis', s=50)
+    plt.colorbar(label='Cluster')
+    plt.savefig(path, dpi=100)
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", default="results.csv")
+    parser.add_argument("--players", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--scatter-max", type=int, default=200000, help="Chỉ vẽ biểu đồ phân tán đến số điểm này")
+    args = parser.parse_args()
+
+    X0 = scaled_matrix(load_results(args.results))
+    for n_players in args.players:
+        X = resample_matrix(X0, n_players)
+        labels = MiniBatchKMeans(n_clusters=8, random_state=42, n_init=1).fit(X[:100000]).predict(X)
+        features = pd.DataFrame(X)
+        print(f"--- {n_players} cầu thủ x {X.shape[1]} cột ---")
+        with tempfile.TemporaryDirectory() as tmp:
+            old_pca, t_old_pca = timed(lambda: PCA(n_components=2).fit(X))
+            new_pca, t_new_pca = timed(lambda: fit_projection(X))
+            assert np.allclose(old_pca.explained_variance_ratio_, new_pca.explained_variance_ratio_, rtol=1e-6)
+            print(f"  PCA cũ ({old_pca._fit_svd_solver}): {t_old_pca:6.2f}s | "
+                  f"fit_projection ({pca_solver(*X.shape)}): {t_new_pca:6.2f}s")
+            coords, t_transform = timed(lambda: new_pca.transform(X))
+            profiles, t_profiles = timed(lambda: cluster_profiles(features, labels, coords))
+            _, t_density = timed(lambda: render_density(coords, labels, profiles, os.path.join(tmp, "density.png")))
+            print(f"  chiếu {t_transform:6.2f}s | hồ sơ cụm {t_profiles:6.2f}s | ảnh mật độ {t_density:6.2f}s")
+            if n_players <= args.scatter_max:
+                _, t_scatter = timed(lambda: old_scatter(coords, labels, os.path.join(tmp, "scatter.png")))
+                print(f"  biểu đồ phân tán cũ {t_scatter:6.2f}s | ảnh mật độ nhanh hơn {t_scatter / t_density:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
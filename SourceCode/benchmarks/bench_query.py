@@ -0,0 +1,90 @@
+"""
+Đo các truy vấn thường gặp trên bảng cầu thủ: cách cũ (lọc DataFrame bằng pandas rồi nlargest/quantile
+cho mỗi câu hỏi) so với player_query (chỉ mục và thứ tự sắp xếp dựng sẵn, lần hỏi đầu và lần hỏi lại
+trúng bộ đệm LRU của PlayerQueryService). Tính đúng đắn (cùng kết quả với pandas) được kiểm tra trong
+tests/test_player_query.py.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_query --players 500 5000 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from fbref_fixtures import make_results_frame
+from player_query import PlayerQueryService
+from schema import write_results
+
+REPEAT = 200
+
+
+def old_filter(df, squad=None, pos=None, nation=None):
+    mask = np.ones(len(df), dtype=bool)
+    if squad is not None:
+        mask &= (df["Squad"] == squad).to_numpy()
+    if pos is not None:
+        mask &= df["Pos"].str.split(",").apply(lambda parts: pos in parts).to_numpy()
+    if nation is not None:
+        mask &= df["Nation"].str.split().str[-1].eq(nation).to_numpy()
+    return df[mask]
+
+
+def make_queries(df):
+    """(tên, hàm cách cũ, hàm nhận dịch vụ) cho vài câu hỏi trên đội, vị trí, quốc tịch phổ biến nhất."""
+    squad = df["Squad"].mode()[0]
+    nation = df["Nation"].mode()[0].split()[-1]
+    player = df.loc[old_filter(df, squad=squad)["xG"].idxmax(), "Player"]
+    return [
+        ("top 10 xG, MF của một đội",
+         lambda: old_filter(df, squad=squad, pos="MF").nlargest(10, "xG", keep="first")["xG"].tolist(),
+         lambda service: service.top("xG", 10, pos="MF", squad=squad)["xG"].tolist()),
+        ("top 10 Tkl, DF",
+         lambda: old_filter(df, pos="DF").nlargest(10, "Tkl", keep="first")["Tkl"].tolist(),
+         lambda service: service.top("Tkl", 10, pos="DF")["Tkl"].tolist()),
+        ("phân vị 90% Gls, một quốc tịch",
+         lambda: round(old_filter(df, nation=nation)["Gls"].quantile(0.9), 9),
+         lambda service: round(service.quantile("Gls", 0.9, nation=nation), 9)),
+        ("phân vị xG của một cầu thủ trong đội",
+         lambda: round(100.0 * (lambda values: (values <= values[df.loc[values.index, "Player"] == player].iloc[0])
+                                .mean())(old_filter(df, squad=squad)["xG"].dropna()), 9),
+         lambda service: round(service.percentile_rank("xG", player, squad=squad), 9)),
+    ]
+
+
+def best_time(func, repeat=REPEAT):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[500, 5000, 50000])
+    args = parser.parse_args()
+
+    for n_players in args.players:
+        df = make_results_frame(n_players)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "results.csv")
+            write_results(df, csv_path)
+            service = PlayerQueryService(csv_path)
+            start = time.perf_counter()
+            service.index
+            print(f"{n_players} cầu thủ: nạp bảng và dựng chỉ mục {time.perf_counter() - start:.3f}s")
+            for name, old, new in make_queries(df):
+                t_old = best_time(old)
+                # Lần hỏi đầu: xóa bộ đệm trước mỗi lần đo; lần hỏi lại: trúng bộ đệm
+                t_cold = best_time(lambda: (service._cached.cache_clear(), new(service)))
+                t_warm = best_time(lambda: new(service))
+                print(f"  {name:<38} cũ {t_old * 1e6:9.0f} µs | chỉ mục {t_cold * 1e6:7.0f} µs "
+                      f"| bộ đệm {t_warm * 1e6:5.0f} µs | nhanh hơn {t_old / t_cold:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Đo việc tìm top/bottom k cho mọi thống kê: cách cũ (nlargest + nsmallest cho từng cột)
+so với ranking.rank_top_bottom (chọn trên cả ma trận số một lần), và kiểm tra hai cách cho cùng kết quả.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_ranking --players 10000 100000 --stats 73 300
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from fbref_fixtures import make_results_frame
+from ranking import rank_top_bottom
+
+
+def old_ranking(df, numeric_cols, k):
+    rows = {}
+    for col_stat in numeric_cols:
+        if df[col_stat].notna().any():
+            positions = pd.Series(np.arange(len(df)), index=df.index)
+            rows[(col_stat, "top")] = positions[df.nlargest(k, col_stat).index].tolist()
+            rows[(col_stat, "bottom")] = positions[df.nsmallest(k, col_stat).index].tolist()
+    return rows
+
+
+def widen(df, n_stats, seed=0):
+    """Thêm cột số ngẫu nhiên (giá trị nguyên nhỏ để có nhiều trường hợp bằng điểm) cho đủ `n_stats` cột."""
+    rng = np.random.default_rng(seed)
+    numeric_cols = df.select_dtypes(include='number').columns.tolist()
+    n_extra = max(0, n_stats - len(numeric_cols))
+    extra = pd.DataFrame(rng.integers(0, 50, (len(df), n_extra)).astype(float), index=df.index,
+                         columns=[f"Extra{i}" for i in range(n_extra)])
+    return pd.concat([df, extra], axis=1), (numeric_cols + list(extra.columns))[:n_stats]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--stats", type=int, nargs="+", default=[73, 300])
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    for n_players in args.players:
+        for n_stats in args.stats:
+            df, numeric_cols = widen(make_results_frame(n_players), n_stats)
+            start = time.perf_counter()
+            old = old_ranking(df, numeric_cols, args.k)
+            t_old = time.perf_counter() - start
+            start = time.perf_counter()
+            new = rank_top_bottom(df, numeric_cols, k=args.k)
+            t_new = time.perf_counter() - start
+            new_rows = {key: block["Row"].tolist() for key, block in new.groupby(["Stat", "Direction"], sort=False)}
+            assert new_rows == old, "Kết quả khác cách cũ"
+            print(f"{n_players:>7} cầu thủ, {n_stats:>4} thống kê: cũ {t_old * 1000:8.1f} ms | "
+                  f"mới {t_new * 1000:8.1f} ms | nhanh hơn {t_old / t_new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
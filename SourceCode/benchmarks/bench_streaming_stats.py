@@ -0,0 +1,101 @@
+"""
+Đo P2 trên bảng lớn: chế độ thường (P2.run_stats, nạp cả bảng) so với chế độ theo khối
+(P2.run_stats_chunked với --memory-mb), về thời gian và RSS đỉnh (mỗi chế độ chạy trong một tiến trình riêng),
+kèm sai số hạng lớn nhất của median toàn giải trong results2_approx.csv. Tính đúng đắn (top_3 giống hệt,
+mean/std khớp, không ghi đè results2.csv) được kiểm tra trong tests/test_streaming_stats.py.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_streaming_stats --players 100000 1000000 --squads 100 --memory-mb 64
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from fbref_fixtures import make_results_frame
+from P2 import RESULTS2_APPROX_OUTPUT
+from schema import load_results, write_results
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_RSS_UNIT_MB = 1 / 2**20 if sys.platform == "darwin" else 1 / 1024
+
+
+# In RSS đỉnh của tiến trình con: VmHWM (Linux, đặt lại khi exec) vì ru_maxrss kế thừa giá trị của tiến trình cha
+_PEAK_RSS_CODE = """
+try:
+    with open('/proc/self/status') as f:
+        peak_mb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM')) / 1024
+except OSError:
+    import resource
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * %r
+print('RSS', peak_mb)
+""" % _RSS_UNIT_MB
+
+
+def run_p2(work_dir: str, args: list) -> tuple:
+    """Chạy P2.py trong `work_dir`; trả về (số giây, RSS đỉnh MB của tiến trình con)."""
+    env = dict(os.environ, PYTHONPATH=SOURCE_DIR, MPLBACKEND="Agg")
+    code = ("import runpy, sys; sys.argv = ['P2.py'] + sys.argv[1:]; "
+            f"runpy.run_path({os.path.join(SOURCE_DIR, 'P2.py')!r}, run_name='__main__')\n" + _PEAK_RSS_CODE)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code] + args, cwd=work_dir, env=env, capture_output=True,
+                         text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, float(out.strip().splitlines()[-1].split()[1])
+
+
+def median_rank_error(results_path: str, approx: pd.DataFrame) -> float:
+    """
+    Sai số hạng lớn nhất (phần của số hàng) của median toàn giải trong chế độ theo khối: khoảng cách từ 0.5
+    đến đoạn hạng mà giá trị đó chiếm (nhiều cầu thủ bằng giá trị thì đoạn này rộng). So sánh có dung sai vì
+    ô thiếu được điền bằng trung bình, mà trung bình theo khối chỉ khớp pandas đến khoảng 1e-14.
+    """
+    df = load_results(results_path)
+    numeric = df.select_dtypes(include="number")
+    numeric = numeric.fillna(numeric.mean())
+    worst = 0.0
+    for col in numeric.columns:
+        values = np.sort(numeric[col].to_numpy(dtype="float64"))
+        value = approx.loc[0, f"Median của {col}"]
+        if np.isnan(value):
+            continue
+        tolerance = 1e-9 * max(1.0, abs(value))
+        low = np.searchsorted(values, value - tolerance, "left") / len(values)
+        high = np.searchsorted(values, value + tolerance, "right") / len(values)
+        worst = max(worst, low - 0.5, 0.5 - high)
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--squads", type=int, default=100, help="Số đội (dữ liệu từng trận: nhiều hàng mỗi đội)")
+    parser.add_argument("--memory-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    for n_players in args.players:
+        with tempfile.TemporaryDirectory() as tmp:
+            results_path = os.path.join(tmp, "results.csv")
+            write_results(make_results_frame(n_players, args.squads), results_path)
+            dirs = {}
+            for mode, p2_args in (("thường", ["--histograms", "off"]),
+                                  ("theo khối", ["--chunked", "--memory-mb", str(args.memory_mb)])):
+                work_dir = os.path.join(tmp, "chunked" if "--chunked" in p2_args else "full")
+                os.makedirs(work_dir)
+                for name in ("results.csv", "results.feather"):
+                    os.link(os.path.join(tmp, name), os.path.join(work_dir, name))
+                seconds, rss = run_p2(work_dir, p2_args)
+                dirs[mode] = work_dir
+                print(f"{n_players:>8} cầu thủ, {mode:<9}: {seconds:7.1f}s, RSS đỉnh {rss:7.0f} MB")
+
+            approx = pd.read_csv(os.path.join(dirs["theo khối"], RESULTS2_APPROX_OUTPUT))
+            print(f"{'':>8} sai số hạng median toàn giải lớn nhất {median_rank_error(results_path, approx):.2%}")
+
+
+if __name__ == "__main__":
+    main()
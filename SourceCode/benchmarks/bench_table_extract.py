@@ -0,0 +1,112 @@
+"""
+Đo việc tách một bảng fbref khỏi trang: cách cũ (BeautifulSoup "html.parser" trên cả trang,
+str(bảng) rồi pd.read_html phân tích lại lần hai) so với table_extract.extract_table
+(tìm bảng bằng một lần quét chuỗi, kể cả trong comment, rồi phân tích riêng đoạn đó thẳng thành cột),
+về thời gian và bộ nhớ cấp phát đỉnh (tracemalloc, đo trong lần chạy riêng). Tính đúng đắn (hai cách cho
+cùng bảng sau cleaning.clean_fbref_table) được kiểm tra trong tests/test_table_extract.py.
+
+Trang giả lập gồm bảng cầu thủ, hai bảng đội và một đoạn script như trang fbref; bảng cầu thủ được đo
+cả khi hiển thị và khi nằm trong comment (cách cũ không tìm thấy bảng đó). Có thể đo thêm trên các trang
+fbref đã lưu (thư mục tên tệp theo fetcher.url_to_filename, ví dụ từ bộ đệm của P1) bằng --pages.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_table_extract --players 500 5000
+    python -m benchmarks.bench_table_extract --pages saved_pages/
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from io import StringIO
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import P1
+from cleaning import clean_fbref_table
+from fbref_fixtures import make_players, make_table_html
+from fetcher import url_to_filename
+from table_extract import extract_table
+
+SCRIPT_FILLER_KB = 300  # Trang fbref thật nặng khoảng 0.5-3 MB, phần lớn là script và các bảng khác
+
+
+def old_parse_table(html, table_id):
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", {"id": table_id})
+    df = pd.read_html(StringIO(str(table)), header=1)[0]
+    return clean_fbref_table(df)
+
+
+def new_parse_table(html, table_id):
+    return clean_fbref_table(extract_table(html, table_id))
+
+
+def make_full_page(table_id: str, n_players: int, commented: bool) -> str:
+    players = make_players(n_players)
+    squads = [dict(players[0], Player=squad, Squad=squad) for squad in sorted({p["Squad"] for p in players})][:20]
+    squad_tables = "".join(make_table_html(table_id, squads).replace(f'id="{table_id}"', f'id="{table_id}_squads_{side}"')
+                           for side in ("for", "against"))
+    table = make_table_html(table_id, players)
+    if commented:
+        table = f"\n<!--\n{table}\n-->\n"
+    script = "<script>var data = '" + "x" * (SCRIPT_FILLER_KB * 1024) + "';</script>"
+    return (f"<html><head><title>{table_id}</title>{script}</head><body>{squad_tables}"
+            f"<div id='all_{table_id}'>{table}</div></body></html>")
+
+
+def measure(func, *args):
+    """Chạy func(*args): trả về (kết quả hoặc ngoại lệ, số giây, MB cấp phát đỉnh trong lần chạy riêng có tracemalloc)."""
+    try:
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        return e, None, None
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def report(label: str, html: str, table_id: str):
+    old, t_old, m_old = measure(old_parse_table, html, table_id)
+    new, t_new, m_new = measure(new_parse_table, html, table_id)
+    if isinstance(new, Exception):
+        print(f"{label:<40} mới lỗi: {new}")
+        return
+    if isinstance(old, Exception):
+        old_text = f"cũ lỗi ({type(old).__name__})"
+    else:
+        old_text = f"cũ {t_old:7.3f}s {m_old:7.1f} MB"
+    speedup = f" | nhanh hơn {t_old / t_new:5.1f}x, ít bộ nhớ hơn {m_old / m_new:5.1f}x" if t_old else ""
+    print(f"{label:<40} {old_text:<28} | mới {t_new:7.3f}s {m_new:7.1f} MB{speedup} ({len(new)} hàng)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--table", default="stats_standard")
+    parser.add_argument("--pages", default=None, help="Thư mục các trang fbref đã lưu (tên tệp theo url_to_filename)")
+    args = parser.parse_args()
+
+    html_size = lambda html: f"{len(html.encode()) / 2**20:.1f} MB"
+    for n_players in args.players:
+        visible = make_full_page(args.table, n_players, commented=False)
+        report(f"{n_players} cầu thủ, hiển thị ({html_size(visible)})", visible, args.table)
+        commented = make_full_page(args.table, n_players, commented=True)
+        report(f"{n_players} cầu thủ, trong comment ({html_size(commented)})", commented, args.table)
+
+    if args.pages:
+        for name, (url, table_id) in P1.links.items():
+            path = os.path.join(args.pages, url_to_filename(url))
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+            report(f"{os.path.basename(path)[:28]} ({html_size(html)})", html, table_id)
+
+
+if __name__ == "__main__":
+    main()
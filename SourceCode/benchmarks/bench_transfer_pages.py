@@ -0,0 +1,103 @@
+"""
+Đo việc quét các trang giá trị cầu thủ của P4 trên máy chủ giả lập cục bộ (trang footballtransfers giả):
+cách cũ (số trang cố định, tải tuần tự, BeautifulSoup "html.parser") so với P4.scrape_player_values
+(tự tìm trang cuối, tải song song trong giới hạn --interval giữa 2 request, lxml), và thời gian kết hợp
+theo luồng trang (P4.combine_data_and_add_values nhận iter_player_pages). Tính đúng của việc quét và kết hợp
+theo luồng được kiểm tra trong tests/test_transfer_pages.py.
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.bench_transfer_pages --players 550 --latency 0.3 --interval 0.1
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import P4
+from fbref_fixtures import make_players, serve_directory, write_transfer_pages
+from fetcher import make_fetcher
+
+
+def old_parse_player_rows(html_source: str) -> list:
+    players_data = []
+    player_table = BeautifulSoup(html_source, "html.parser").find("table", class_=P4.PLAYER_TABLE_CLASS)
+    for row_index, row in enumerate(player_table.find_all("tr") if player_table else []):
+        columns = row.find_all("td")
+        if row_index == 0 or len(columns) <= 4:
+            continue
+        player_name_tag = columns[2].find("a")
+        team_tag = columns[4].find("span", class_="td-team__teamname")
+        players_data.append({"Player": player_name_tag.text.strip() if player_name_tag else "N/A",
+                             "Team": team_tag.text.strip() if team_tag else "N/A",
+                             "Value_Scraped": columns[-1].text.strip()})
+    return players_data
+
+
+def old_scrape(base_url: str, num_pages: int, fetcher) -> pd.DataFrame:
+    players_data = []
+    for i in range(1, num_pages + 1):
+        html_source = fetcher.fetch(P4.page_url(base_url, i), table_class=P4.PLAYER_TABLE_CLASS)
+        players_data.extend(old_parse_player_rows(html_source))
+    return pd.DataFrame(players_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=550, help="Số cầu thủ (25 cầu thủ mỗi trang)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Độ trễ mỗi request của máy chủ giả lập")
+    parser.add_argument("--interval", type=float, default=0.1, help="Khoảng cách tối thiểu giữa 2 request")
+    parser.add_argument("--workers", type=int, default=P4.MAX_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_transfer_pages(tmp, P4.BASE_URL_SCRAPING, P4.PLAYER_TABLE_CLASS, args.players)
+        n_pages = -(-args.players // 25)
+        htmls = []
+        for name in sorted(os.listdir(tmp)):
+            with open(os.path.join(tmp, name), encoding="utf-8") as f:
+                htmls.append(f.read())
+        start = time.perf_counter()
+        for html in htmls:
+            old_parse_player_rows(html)
+        t_parse_old = time.perf_counter() - start
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for page, html in enumerate(htmls, start=1):
+                P4.parse_player_rows(html, page)
+        t_parse_new = time.perf_counter() - start
+        print(f"Phân tích {len(htmls)} trang: html.parser {t_parse_old:.3f}s | lxml {t_parse_new:.3f}s "
+              f"| nhanh hơn ~{t_parse_old / t_parse_new:.1f}x")
+
+        server, source = serve_directory(tmp, args.latency)
+        try:
+            fetcher = make_fetcher(source, pool_size=args.workers, min_interval=args.interval, cache_mode="off")
+            start = time.perf_counter()
+            old = old_scrape(P4.BASE_URL_SCRAPING, n_pages, fetcher)
+            t_old = time.perf_counter() - start
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                new = P4.scrape_player_values(P4.BASE_URL_SCRAPING, fetcher=fetcher, max_workers=args.workers)
+            t_new = time.perf_counter() - start
+            print(f"Quét {n_pages} trang ({len(new)} cầu thủ, trễ {args.latency}s, cách {args.interval}s): "
+                  f"tuần tự {t_old:.2f}s | song song {t_new:.2f}s | nhanh hơn ~{t_old / t_new:.1f}x")
+
+            stats = pd.DataFrame(make_players(args.players))[["Player", "Squad"]].assign(Min=1500)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                streamed = P4.combine_data_and_add_values(
+                    stats.copy(), P4.iter_player_pages(P4.BASE_URL_SCRAPING, fetcher, max_workers=args.workers),
+                    P4.FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT)
+                t_streamed = time.perf_counter() - start
+            print(f"Quét và kết hợp theo từng trang: {t_streamed:.2f}s, {len(streamed)} cầu thủ khớp")
+            fetcher.close()
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
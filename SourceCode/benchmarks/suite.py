@@ -0,0 +1,228 @@
+"""
+Bộ đo hiệu năng các đoạn tốn thời gian của P1-P4 trên dữ liệu giả lập ở nhiều quy mô
+(1x = BASE_PLAYERS cầu thủ, cỡ một mùa Premier League), ghi kết quả ra JSON để so sánh giữa các commit:
+- P1: làm sạch bảng fbref thô (cleaning.clean_fbref_table, bước làm sạch của P1.scraping) và gộp 8 bảng
+  (P1.join_tables + P1.build_results);
+- P2: thống kê theo đội (group_stats), top/bottom k (rank_top_bottom), histogram (P2.plot_histograms
+  với backend Agg và histograms.render_histograms);
+- P3: chọn K (kselect.select_k với cấu hình của P3);
+- P4: đọc và lọc results (P4.read_and_filter_player_stats) và so khớp tên (P4.combine_data_and_add_values).
+
+Mỗi phép đo lấy thời gian nhỏ nhất của --repeat lần chạy (phép đo lâu hơn LONG_RUN_S chỉ chạy một lần).
+
+Chạy từ thư mục SourceCode:
+    python -m benchmarks.suite --scales 1 10 100
+    python -m benchmarks.suite --cases combine kselect --scales 1 10 --compare .cache/benchmarks/<commit>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import warnings
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import P1
+import P2
+import P3
+import P4
+from cleaning import clean_fbref_table
+from cluster_model import feature_frame
+from fbref_fixtures import (make_fbref_frames, make_players, make_raw_table, make_results_frame,
+                            make_transfer_datasets)
+from group_stats import group_stats
+from histograms import render_histograms
+from kselect import select_k
+from ranking import rank_top_bottom
+from schema import write_results
+
+# --- Cấu hình bộ đo ---
+BASE_PLAYERS = 500  # Quy mô 1x
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_REPEAT = 3
+LONG_RUN_S = 5.0
+# Khi so sánh: chậm hơn quá tỉ lệ này (và hơn MIN_REGRESSION_S, bỏ qua dao động của phép đo vài ms) thì đánh dấu
+REGRESSION_RATIO = 1.2
+MIN_REGRESSION_S = 0.01
+DEFAULT_RESULTS_DIR = os.path.join(".cache", "benchmarks")
+HISTOGRAM_SQUADS = 20  # Số đội khi vẽ histogram theo đội (mỗi đội một biểu đồ, không tăng theo quy mô)
+HISTOGRAM_COLS = ["Gls", "Ast", "Dist", "Tkl", "TklW", "Att_Defensive act"]
+
+
+def _numeric_cols(df):
+    return df.select_dtypes(include="number").columns.tolist()
+
+
+def _prepare_clean(n_players, tmp):
+    raw = make_raw_table("stats_standard", make_players(n_players))
+    return lambda: clean_fbref_table(raw), len(raw)
+
+
+def _prepare_join(n_players, tmp):
+    tables = make_fbref_frames(P1.links, n_players)
+    return lambda: P1.build_results(P1.join_tables(tables, P1.columns_to_keep)), n_players
+
+
+def _prepare_group_stats(n_players, tmp):
+    df = make_results_frame(n_players)
+    numeric_cols = _numeric_cols(df)
+    return lambda: group_stats(df, numeric_cols, by="Squad", aggregates=P2.RESULTS2_AGGREGATES), n_players
+
+
+def _prepare_ranking(n_players, tmp):
+    df = make_results_frame(n_players)
+    numeric_cols = _numeric_cols(df)
+    return lambda: rank_top_bottom(df, numeric_cols, k=P2.TOP_K), n_players
+
+
+def _prepare_plot_histograms(n_players, tmp):
+    df = make_results_frame(n_players, HISTOGRAM_SQUADS)
+
+    def run():
+        # plt.show() không làm gì với backend Agg; đóng hình sau mỗi lần để không dồn bộ nhớ
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # "non-interactive" và "More than 20 figures"
+            P2.plot_histograms(df, HISTOGRAM_COLS, df.groupby("Squad"))
+        plt.close("all")
+    return run, n_players
+
+
+def _prepare_render_histograms(n_players, tmp):
+    df = make_results_frame(n_players, HISTOGRAM_SQUADS)
+    return lambda: render_histograms(df, HISTOGRAM_COLS, "Squad", out_dir=os.path.join(tmp, "histograms"),
+                                     max_workers=1), n_players
+
+
+def _prepare_kselect(n_players, tmp):
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+
+    X = StandardScaler().fit_transform(SimpleImputer(strategy="mean").fit_transform(
+        feature_frame(make_results_frame(n_players))))
+    return lambda: select_k(X, P3.K_RANGE, mode=P3.KSELECT_MODE, score=P3.KSELECT_SCORE,
+                            early_stop=P3.KSELECT_EARLY_STOP), n_players
+
+
+def _prepare_read_filter(n_players, tmp):
+    csv_path = os.path.join(tmp, "results.csv")
+    write_results(make_results_frame(n_players), csv_path)
+    return lambda: P4.read_and_filter_player_stats(csv_path, P4.MINIMUM_PLAYING_TIME_MINS,
+                                                   P4.COLUMNS_TO_KEEP_FROM_STATS_FILE), n_players
+
+
+def _prepare_combine(n_players, tmp):
+    df_stats, df_scraped = make_transfer_datasets(n_players)
+    return lambda: P4.combine_data_and_add_values(df_stats, df_scraped,
+                                                  P4.FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT), n_players
+
+
+# Tên phép đo -> hàm chuẩn bị dữ liệu (n_players, thư mục tạm) trả về (hàm cần đo, số hàng)
+CASES = {
+    "clean": _prepare_clean,
+    "join": _prepare_join,
+    "group_stats": _prepare_group_stats,
+    "ranking": _prepare_ranking,
+    "plot_histograms": _prepare_plot_histograms,
+    "render_histograms": _prepare_render_histograms,
+    "kselect": _prepare_kselect,
+    "read_filter": _prepare_read_filter,
+    "combine": _prepare_combine,
+}
+
+
+def time_case(func, repeat: int = DEFAULT_REPEAT) -> tuple:
+    """Thời gian nhỏ nhất (giây) của `repeat` lần gọi func() và số lần đã chạy; in của hàm được bỏ đi."""
+    best, runs = float("inf"), 0
+    while runs < repeat:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        best, runs = min(best, elapsed), runs + 1
+        if elapsed > LONG_RUN_S:
+            break
+    return best, runs
+
+
+def git_revision() -> tuple:
+    """(commit hiện tại, có thay đổi chưa commit hay không); (None, None) nếu không có git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run_suite(cases: list, scales: list, repeat: int = DEFAULT_REPEAT, base_players: int = BASE_PLAYERS) -> list:
+    """
+    Đo từng phép đo trong `cases` ở từng quy mô trong `scales`.
+
+    Returns:
+        list: Các dict {case, scale, players, rows, seconds, runs}.
+    """
+    results = []
+    for case in cases:
+        for scale in scales:
+            n_players = base_players * scale
+            with tempfile.TemporaryDirectory() as tmp:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    func, n_rows = CASES[case](n_players, tmp)
+                seconds, runs = time_case(func, repeat)
+            results.append({"case": case, "scale": scale, "players": n_players, "rows": n_rows,
+                            "seconds": round(seconds, 6), "runs": runs})
+            print(f"{case:<18} {scale:>4}x {n_players:>7} cầu thủ: {seconds:9.3f}s ({runs} lần)")
+    return results
+
+
+def compare(results: list, baseline: dict):
+    """In tỉ lệ thời gian so với một tệp kết quả trước đó (> 1: chậm hơn)."""
+    previous = {(row["case"], row["scale"]): row["seconds"] for row in baseline["results"]}
+    print(f"\nSo với {baseline.get('commit')} ({baseline.get('created_at')}):")
+    if not any((row["case"], row["scale"]) in previous for row in results):
+        print("Không có phép đo chung (cùng tên và quy mô).")
+    for row in results:
+        before = previous.get((row["case"], row["scale"]))
+        if before:
+            ratio = row["seconds"] / before
+            flag = "  <-- chậm hơn" if ratio > REGRESSION_RATIO and row["seconds"] - before > MIN_REGRESSION_S else ""
+            print(f"{row['case']:<18} {row['scale']:>4}x: {before:9.3f}s -> {row['seconds']:9.3f}s "
+                  f"({ratio:5.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES))
+    parser.add_argument("--base-players", type=int, default=BASE_PLAYERS, help="Số cầu thủ ở quy mô 1x")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--out", default=None, help=f"Tệp JSON kết quả (mặc định {DEFAULT_RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Tệp JSON của một lần chạy trước để so sánh")
+    args = parser.parse_args()
+
+    commit, dirty = git_revision()
+    results = run_suite(args.cases, args.scales, args.repeat, args.base_players)
+    report = {"commit": commit, "dirty": dirty, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+              "base_players": args.base_players, "results": results}
+    out_path = args.out or os.path.join(DEFAULT_RESULTS_DIR, f"{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Đã ghi kết quả vào {out_path}.")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
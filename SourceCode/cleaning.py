@@ -0,0 +1,78 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Các chuỗi được coi là ô trống khi chuyển sang số
+MISSING_STRINGS = {"", "N/a", "N/A", "n/a", "nan", "NaN", "None", "—", "-"}
+# Cột văn bản không bao giờ chuyển sang số
+TEXT_COLUMNS = {"Player", "Squad", "Nation", "Pos", "Age", "Matches", "Team"}
+# Cột dùng để nhận ra hàng tiêu đề lặp lại (cột "Matches" thì ô nào cũng là chữ "Matches" nên không dùng được)
+HEADER_MARKER_COLUMNS = ("Rk", "Player", "Squad")
+
+_DEDUP_SUFFIX_RE = re.compile(r"\.\d+$")
+_NUMERIC_NOISE_RE = re.compile(r"[,%\s]")
+
+
+def _base_name(col) -> str:
+    """Tên cột gốc trước khi pd.read_html thêm hậu tố ".1", ".2"... cho cột trùng tên."""
+    return _DEDUP_SUFFIX_RE.sub("", str(col))
+
+
+def _clean_text(col: pd.Series) -> np.ndarray:
+    """Bỏ dấu phẩy hàng nghìn, dấu % và khoảng trắng; ô trống thành NaN (mảng object)."""
+    text = col.astype("string").str.replace(_NUMERIC_NOISE_RE.pattern, "", regex=True)
+    text = text.mask(text.isin(MISSING_STRINGS))
+    return text.to_numpy(dtype=object, na_value=np.nan)
+
+
+def clean_numeric(col: pd.Series) -> pd.Series:
+    """
+    Chuyển một cột sang số (float64/int64): "1,234" -> 1234, "45.2%" -> 45.2,
+    chuỗi rỗng / "N/a" / giá trị không hợp lệ -> NaN. Cột đã là số được giữ nguyên.
+    """
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        return col
+    return pd.Series(pd.to_numeric(_clean_text(col), errors="coerce"), index=col.index, name=col.name)
+
+
+def drop_header_rows(df: pd.DataFrame, key: str = "Player") -> pd.DataFrame:
+    """
+    Bỏ các hàng tiêu đề lặp lại giữa bảng fbref (ô ở cột Rk/Player/Squad trùng với tên cột,
+    ví dụ Rk == "Rk") và các hàng phân cách (không có giá trị ở cột khóa `key`).
+    Mỗi cột được so sánh một lần trên cả cột thay vì duyệt từng hàng.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        values = df[col]
+        if _base_name(col) not in HEADER_MARKER_COLUMNS or pd.api.types.is_numeric_dtype(values):
+            continue
+        mask |= (values.astype(object) == _base_name(col)).to_numpy(dtype=bool)
+    if key in df.columns:
+        mask |= df[key].isna().to_numpy()
+    return df[~mask]
+
+
+def coerce_numeric_columns(df: pd.DataFrame, exclude=TEXT_COLUMNS) -> pd.DataFrame:
+    """
+    Chuyển cùng lúc mọi cột chứa số ở dạng chuỗi sang kiểu số. Một cột chỉ được chuyển
+    khi mọi ô không trống đều là số hợp lệ, nên các cột văn bản như Age ("24-100") giữ nguyên.
+    """
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if col in exclude or pd.api.types.is_numeric_dtype(values):
+            continue
+        text = _clean_text(values)
+        numbers = pd.to_numeric(text, errors="coerce")
+        if np.count_nonzero(~pd.isna(numbers)) == np.count_nonzero(~pd.isna(text)):
+            converted[col] = numbers
+    if not converted:
+        return df
+    return df.assign(**{col: pd.Series(values, index=df.index) for col, values in converted.items()})
+
+
+def clean_fbref_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Làm sạch một bảng fbref vừa đọc bằng pd.read_html: bỏ hàng tiêu đề/phân cách rồi gán kiểu số."""
+    return coerce_numeric_columns(drop_header_rows(df))
+
@@ -0,0 +1,195 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+
+from kselect import DEFAULT_K_RANGE, select_k
+from projection import fit_projection
+from schema import load_results
+from instrumentation import traced
+
+# --- Cấu hình mô hình phân cụm đã lưu ---
+DEFAULT_MODEL_DIR = os.path.join("models", "p3")
+# Huấn luyện lại khi inertia trung bình mỗi cầu thủ trên dữ liệu mới tăng quá 20% so với lúc huấn luyện
+DEFAULT_DRIFT_THRESHOLD = 0.2
+# Các cột định danh không dùng cho phân cụm
+ID_COLUMNS = ["Player", "Squad", "Nation", "Pos", "Age"]
+
+# Inertia trung bình mỗi hàng nhỏ hơn mức này được coi là 0 (sai số làm tròn khi mỗi điểm là một tâm cụm)
+ZERO_INERTIA = 1e-9
+
+_VERSION_RE = re.compile(r"v(\d+)\.joblib$")
+
+
+def selection_settings(k_range=DEFAULT_K_RANGE, **select_options) -> dict:
+    """Cấu hình chọn K (các k thử, chế độ, tiêu chí...) lưu kèm mô hình; đổi cấu hình thì huấn luyện lại."""
+    return {"k_range": [int(k) for k in k_range], **select_options}
+
+
+def feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Các cột số dùng cho phân cụm (bỏ cột định danh), như P3."""
+    return df.drop(columns=ID_COLUMNS, errors="ignore").select_dtypes(include="number")
+
+
+class ClusterPipeline:
+    """
+    SimpleImputer -> StandardScaler -> KMeans, cùng PCA 2D để vẽ, được huấn luyện một lần
+    và lưu lại; cầu thủ mới/cập nhật được gán cụm và chiếu vào không gian PCA có sẵn.
+    """
+
+    def __init__(self, feature_columns, imputer, scaler, kmeans, pca, baseline_inertia, version=None,
+                 trained_at=None, n_train=0, settings=None):
+        self.feature_columns = list(feature_columns)
+        self.imputer = imputer
+        self.scaler = scaler
+        self.kmeans = kmeans
+        self.pca = pca
+        self.baseline_inertia = baseline_inertia  # inertia trung bình mỗi hàng trên dữ liệu huấn luyện
+        self.version = version
+        self.trained_at = trained_at
+        self.n_train = n_train
+        self.settings = settings  # selection_settings lúc huấn luyện
+        self.selection = None  # Kết quả select_k của lần huấn luyện (không lưu ra tệp)
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, k_range=DEFAULT_K_RANGE, **select_options):
+        """Huấn luyện toàn bộ pipeline; số cụm được chọn bằng kselect.select_k."""
+        features = feature_frame(df)
+        imputer = SimpleImputer(strategy="mean")
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(imputer.fit_transform(features))
+        selection = select_k(X_scaled, k_range, **select_options)
+        pca = fit_projection(X_scaled)
+        pipeline = cls(features.columns, imputer, scaler, selection.model, pca,
+                       selection.model.inertia_ / len(X_scaled), trained_at=time.time(), n_train=len(X_scaled),
+                       settings=selection_settings(k_range, **select_options))
+        pipeline.selection = selection
+        return pipeline
+
+    @property
+    def n_clusters(self) -> int:
+        return self.kmeans.n_clusters
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """Ma trận đã điền giá trị thiếu và chuẩn hóa theo tham số lúc huấn luyện."""
+        missing = [col for col in self.feature_columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Thiếu cột so với lúc huấn luyện: {missing}")
+        return self.scaler.transform(self.imputer.transform(df[self.feature_columns]))
+
+    def predict(self, df: pd.DataFrame):
+        """
+        Gán cụm và tọa độ PCA 2D cho các hàng của `df` mà không huấn luyện lại.
+
+        Returns:
+            tuple: (nhãn cụm (np.ndarray), tọa độ PCA (np.ndarray n x 2)).
+        """
+        X_scaled = self.transform(df)
+        return self.kmeans.predict(X_scaled), self.pca.transform(X_scaled)
+
+    def drift(self, df: pd.DataFrame) -> float:
+        """
+        Mức tăng tương đối của inertia trung bình mỗi hàng trên `df` so với lúc huấn luyện. Khi inertia lúc
+        huấn luyện bằng 0 (ví dụ số cầu thủ bằng số cụm): 0 nếu dữ liệu mới cũng khớp hoàn toàn, ngược lại vô cùng.
+        """
+        X_scaled = self.transform(df)
+        if len(X_scaled) == 0:
+            return 0.0
+        inertia = float(np.sum(np.min(self.kmeans.transform(X_scaled), axis=1) ** 2)) / len(X_scaled)
+        if self.baseline_inertia <= ZERO_INERTIA:
+            return 0.0 if inertia <= ZERO_INERTIA else float("inf")
+        return inertia / self.baseline_inertia - 1.0
+
+
+def _versions(model_dir: str) -> list:
+    paths = glob.glob(os.path.join(model_dir, "v*.joblib"))
+    return sorted((int(_VERSION_RE.search(path).group(1)), path) for path in paths if _VERSION_RE.search(path))
+
+
+def save_pipeline(pipeline: ClusterPipeline, model_dir: str = DEFAULT_MODEL_DIR) -> str:
+    """Lưu pipeline thành phiên bản mới v<N>.joblib (kèm v<N>.json mô tả) trong `model_dir`."""
+    os.makedirs(model_dir, exist_ok=True)
+    versions = _versions(model_dir)
+    pipeline.version = (versions[-1][0] + 1) if versions else 1
+    path = os.path.join(model_dir, f"v{pipeline.version:04d}.joblib")
+    selection = pipeline.selection
+    pipeline.selection = None  # Không lưu các mô hình thử nghiệm của các k khác
+    joblib.dump(pipeline, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    pipeline.selection = selection
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump({"version": pipeline.version, "trained_at": pipeline.trained_at, "n_train": pipeline.n_train,
+                   "n_clusters": pipeline.n_clusters, "baseline_inertia": pipeline.baseline_inertia,
+                   "settings": pipeline.settings, "feature_columns": pipeline.feature_columns}, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_pipeline(model_dir: str = DEFAULT_MODEL_DIR, version: int = None):
+    """Đọc phiên bản `version` (mặc định mới nhất); None nếu chưa có mô hình nào."""
+    versions = dict(_versions(model_dir))
+    if not versions:
+        return None
+    return joblib.load(versions[version if version is not None else max(versions)])
+
+
+@traced()
+def fit_or_reuse(df: pd.DataFrame, model_dir: str = DEFAULT_MODEL_DIR,
+                 drift_threshold: float = DEFAULT_DRIFT_THRESHOLD, force: bool = False, **select_options):
+    """
+    Dùng lại mô hình đã lưu nếu dữ liệu chưa trôi quá ngưỡng và cấu hình chọn K (`select_options`: k_range,
+    mode, score, early_stop...) không đổi, ngược lại huấn luyện và lưu phiên bản mới.
+
+    Returns:
+        tuple: (ClusterPipeline, True nếu vừa huấn luyện lại).
+    """
+    pipeline = None if force else load_pipeline(model_dir)
+    if pipeline is not None:
+        features = feature_frame(df)
+        if list(features.columns) != pipeline.feature_columns:
+            print("Các cột số khác lúc huấn luyện, huấn luyện lại mô hình phân cụm.")
+        elif getattr(pipeline, "settings", None) != selection_settings(**select_options):
+            print("Cấu hình chọn số cụm khác lúc huấn luyện, huấn luyện lại mô hình phân cụm.")
+        else:
+            drift = pipeline.drift(df)
+            if drift <= drift_threshold:
+                print(f"Dùng lại mô hình phân cụm v{pipeline.version} (độ trôi inertia {drift:+.1%}).")
+                return pipeline, False
+            print(f"Độ trôi inertia {drift:+.1%} vượt ngưỡng {drift_threshold:.0%}, huấn luyện lại mô hình phân cụm.")
+    pipeline = ClusterPipeline.fit(df, **select_options)
+    path = save_pipeline(pipeline, model_dir)
+    print(f"Đã lưu mô hình phân cụm v{pipeline.version} ({pipeline.n_clusters} cụm) vào '{path}'.")
+    return pipeline, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gán cụm cho cầu thủ mới bằng mô hình P3 đã lưu")
+    parser.add_argument("input", help="Tệp results.csv (hoặc cùng định dạng) chứa các cầu thủ cần gán cụm")
+    parser.add_argument("--output", default="clusters.csv", help="Tệp kết quả: Player, Squad, Cluster, PC1, PC2")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR)
+    parser.add_argument("--version", type=int, default=None, help="Phiên bản mô hình (mặc định mới nhất)")
+    args = parser.parse_args()
+
+    pipeline = load_pipeline(args.model_dir, args.version)
+    if pipeline is None:
+        parser.error(f"Chưa có mô hình trong '{args.model_dir}', hãy chạy P3 trước.")
+    df = load_results(args.input)
+    start = time.perf_counter()
+    labels, coords = pipeline.predict(df)
+    elapsed = time.perf_counter() - start
+    out = df[[col for col in ("Player", "Squad") if col in df.columns]].assign(
+        Cluster=labels, PC1=coords[:, 0], PC2=coords[:, 1])
+    out.to_csv(args.output, index=False, encoding="utf-8-sig")
+    print(f"Đã gán cụm cho {len(df)} cầu thủ bằng mô hình v{pipeline.version} trong {elapsed * 1000:.1f} ms "
+          f"(độ trôi inertia {pipeline.drift(df):+.1%}), ghi vào '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from http_cache import CachedFetcher, ResponseCache, DEFAULT_CACHE_DIR, DEFAULT_TTL_S, DEFAULT_MAX_BYTES
+from instrumentation import span, traced
+from table_extract import find_table
+
+# --- Cấu hình mặc định cho việc tải trang ---
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MIN_INTERVAL_S = 3.0  # Khoảng cách tối thiểu giữa 2 request tới cùng một host
+DEFAULT_PAGE_TIMEOUT_S = 30
+DEFAULT_BACKEND = "http"  # "http": tải HTML tĩnh, chỉ dùng Chrome khi cần; "selenium": luôn dùng Chrome
+# Mã lỗi HTTP đáng thử lại bằng trình duyệt (chặn bot, quá tải) ngoài các mã 5xx; các lỗi 4xx khác
+# (404, 410...) là kết quả dứt khoát nên được báo ngay thay vì tốn một lần mở trang bằng Chrome
+FALLBACK_STATUS_CODES = {403, 429}
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_TABLE_TAG_RE = re.compile(r"<table\b[^>]*>", re.I)
+
+
+def url_to_filename(url: str) -> str:
+    """
+    Chuyển URL thành tên tệp HTML dùng cho thư mục trang đã lưu sẵn.
+    Ví dụ: https://fbref.com/en/comps/9/stats/Premier-League-Stats
+        -> en_comps_9_stats_Premier-League-Stats.html
+    """
+    path = urlsplit(url).path.strip("/")
+    return (path.replace("/", "_") or "index") + ".html"
+
+
+def rebase_url(url: str, base_url: str = None) -> str:
+    """Thay scheme+host của `url` bằng `base_url` (nếu có), giữ nguyên đường dẫn và query."""
+    if not base_url:
+        return url
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{base_url.rstrip('/')}{parts.path}{query}"
+
+
+def has_table(html: str, table_id: str = None, table_class: str = None) -> bool:
+    """
+    Kiểm tra trang có chứa bảng cần lấy mà không cần chạy trình duyệt. Bảng tìm theo id được tính
+    cả khi nằm trong comment HTML (P1 tách được bảng trong comment, xem table_extract.find_table);
+    bảng tìm theo class phải hiển thị, tức là không nằm trong comment.
+    """
+    if table_id and find_table(html, table_id) is not None:
+        return True
+    visible = _COMMENT_RE.sub("", html)
+    wanted_classes = set(table_class.split()) if table_class else set()
+    for tag in _TABLE_TAG_RE.findall(visible):
+        if table_id and re.search(rf'\bid=["\']{re.escape(table_id)}["\']', tag):
+            return True
+        if wanted_classes:
+            match = re.search(r'\bclass=["\']([^"\']*)["\']', tag)
+            if match and wanted_classes <= set(match.group(1).split()):
+                return True
+        if not table_id and not wanted_classes:
+            return True
+    return False
+
+
+class HostRateLimiter:
+    """
+    Giới hạn tốc độ theo từng host: hai request tới cùng một host cách nhau
+    ít nhất `min_interval` giây, các host khác nhau không chặn lẫn nhau.
+    """
+
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL_S):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+
+    def wait(self, url: str):
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.min_interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            with span("fetcher.rate_limit_sleep", host=host, delay_s=round(delay, 3)):
+                time.sleep(delay)
+
+
+class SeleniumFetcher:
+    """
+    Tải trang bằng Chrome. Mỗi luồng có một WebDriver riêng (WebDriver không an toàn
+    khi dùng chung giữa các luồng) và chờ đến khi bảng cần lấy xuất hiện thay vì sleep cố định.
+
+    Args:
+        base_url (str, optional): Nếu có, thay scheme+host của URL gốc bằng địa chỉ này
+            (ví dụ http://127.0.0.1:8000 cho máy chủ giả lập cục bộ).
+        timeout (float): Thời gian tối đa chờ bảng xuất hiện.
+        driver_factory (callable, optional): Hàm tạo WebDriver, mặc định `webdriver.Chrome()`.
+        rate_limiter (HostRateLimiter, optional): Giới hạn tốc độ áp dụng trước mỗi lần tải trang.
+    """
+
+    def __init__(self, base_url: str = None, timeout: float = DEFAULT_PAGE_TIMEOUT_S, driver_factory=None,
+                 rate_limiter: HostRateLimiter = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.driver_factory = driver_factory
+        self.rate_limiter = rate_limiter
+        self._local = threading.local()
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            if self.driver_factory is not None:
+                driver = self.driver_factory()
+            else:
+                from selenium import webdriver
+                driver = webdriver.Chrome()
+            self._local.driver = driver
+            with self._drivers_lock:
+                self._drivers.append(driver)
+        return driver
+
+    @traced("fetcher.selenium_fetch")
+    def fetch(self, url: str, table_id: str = None, table_class: str = None) -> str:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self._driver()
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(url)
+        driver.get(rebase_url(url, self.base_url))
+        if table_id:
+            locator = (By.ID, table_id)
+        elif table_class:
+            locator = (By.CSS_SELECTOR, "table." + ".".join(table_class.split()))
+        else:
+            locator = (By.TAG_NAME, "table")
+        try:
+            WebDriverWait(driver, self.timeout).until(EC.presence_of_element_located(locator))
+        except Exception as e:
+            print(f"    CẢNH BÁO: Hết thời gian chờ bảng {locator[1]} trên {url}: {e}")
+        return driver.page_source
+
+    def close(self):
+        with self._drivers_lock:
+            for driver in self._drivers:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+            self._drivers.clear()
+
+
+def browser_may_help(error: Exception) -> bool:
+    """Lỗi HTTP mà trình duyệt có thể vượt qua: lỗi kết nối/hết thời gian, FALLBACK_STATUS_CODES hoặc 5xx."""
+    import requests
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status in FALLBACK_STATUS_CODES or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class HttpFetcher:
+    """
+    Tải HTML tĩnh qua HTTP với một Session dùng chung (kết nối keep-alive được gộp,
+    nén gzip/deflate). Nếu trang không có bảng cần lấy (ví dụ bảng chỉ được tạo bằng JS), hoặc request
+    gặp lỗi mà trình duyệt có thể vượt qua (xem browser_may_help), thì chuyển sang `fallback`
+    (thường là SeleniumFetcher); các lỗi 4xx dứt khoát như 404 được báo ngay.
+
+    Args:
+        base_url (str, optional): Giống SeleniumFetcher.
+        fallback (optional): Fetcher dự phòng, None để không dùng.
+        pool_size (int): Số kết nối giữ sẵn cho mỗi host.
+        timeout (float): Thời gian chờ tối đa cho mỗi request.
+        rate_limiter (HostRateLimiter, optional): Giới hạn tốc độ áp dụng trước mỗi request.
+    """
+
+    def __init__(self, base_url: str = None, fallback=None, pool_size: int = DEFAULT_MAX_WORKERS,
+                 timeout: float = DEFAULT_PAGE_TIMEOUT_S, rate_limiter: HostRateLimiter = None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url
+        self.fallback = fallback
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"})
+
+    @traced("fetcher.http_get")
+    def get(self, url: str, headers: dict = None):
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(url)
+        response = self.session.get(rebase_url(url, self.base_url), headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def fetch_conditional(self, url: str, table_id: str = None, table_class: str = None,
+                          etag: str = None, last_modified: str = None):
+        """
+        Tải trang kèm If-None-Match / If-Modified-Since.
+
+        Returns:
+            tuple: (html, etag, last_modified); html là None nếu máy chủ trả 304 (không đổi).
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            response = self.get(url, headers=headers)
+        except Exception as e:
+            if self.fallback is None or not browser_may_help(e):
+                raise
+            print(f"    Lỗi HTTP khi tải {url}: {e}. Chuyển sang trình duyệt.")
+            return self.fallback.fetch(url, table_id=table_id, table_class=table_class), None, None
+        if response.status_code == 304:
+            return None, etag, last_modified
+        html = response.text
+        if self.fallback is not None and not has_table(html, table_id, table_class):
+            print(f"    Không thấy bảng {table_id or table_class} trong HTML tĩnh của {url}. Chuyển sang trình duyệt.")
+            return self.fallback.fetch(url, table_id=table_id, table_class=table_class), None, None
+        return html, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    def fetch(self, url: str, table_id: str = None, table_class: str = None) -> str:
+        return self.fetch_conditional(url, table_id=table_id, table_class=table_class)[0]
+
+    def close(self):
+        self.session.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class DirectoryFetcher:
+    """
+    Đọc trang từ một thư mục HTML đã lưu sẵn (tên tệp theo `url_to_filename`),
+    dùng để chạy và đo tốc độ mà không cần mạng.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, url: str, table_id: str = None, table_class: str = None) -> str:
+        path = os.path.join(self.directory, url_to_filename(url))
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def close(self):
+        pass
+
+
+def make_fetcher(source: str = None, backend: str = DEFAULT_BACKEND, driver_factory=None,
+                 pool_size: int = DEFAULT_MAX_WORKERS, min_interval: float = DEFAULT_MIN_INTERVAL_S,
+                 cache_mode: str = "default",
+                 cache_dir: str = DEFAULT_CACHE_DIR, cache_ttl: float = DEFAULT_TTL_S,
+                 cache_max_bytes: int = DEFAULT_MAX_BYTES):
+    """
+    Tạo fetcher phù hợp với nguồn dữ liệu:
+    - None: tải trực tiếp từ trang gốc.
+    - "http://..." / "https://...": máy chủ giả lập thay cho host gốc.
+    - đường dẫn thư mục: các trang HTML đã lưu.
+
+    `backend` chọn cách tải trang web: "http" (HTTP thuần, Chrome chỉ là dự phòng)
+    hoặc "selenium" (luôn dùng Chrome). Mọi request ra mạng dùng chung một HostRateLimiter
+    với `min_interval`, còn trang lấy từ bộ đệm thì không phải chờ. Trang tải từ web được lưu vào bộ đệm trên đĩa
+    theo `cache_mode` (xem http_cache.CachedFetcher; "off" để tắt).
+    """
+    if source is not None and not source.startswith(("http://", "https://")):
+        if os.path.isdir(source):
+            return DirectoryFetcher(source)
+        raise ValueError(f"Nguồn dữ liệu không hợp lệ: {source}")
+    rate_limiter = HostRateLimiter(min_interval)
+    browser = SeleniumFetcher(base_url=source, driver_factory=driver_factory, rate_limiter=rate_limiter)
+    if backend == "selenium":
+        fetcher = browser
+    elif backend == "http":
+        fetcher = HttpFetcher(base_url=source, fallback=browser, pool_size=pool_size, rate_limiter=rate_limiter)
+    else:
+        raise ValueError(f"Backend không hợp lệ: {backend} (chọn 'http' hoặc 'selenium')")
+    if cache_mode == "off":
+        return fetcher
+    if source is not None:
+        # Máy chủ giả lập dùng thư mục con riêng để không lẫn với bộ đệm của trang thật
+        cache_dir = os.path.join(cache_dir, urlsplit(source).netloc.replace(":", "_"))
+    return CachedFetcher(fetcher, ResponseCache(cache_dir, cache_ttl, cache_max_bytes), cache_mode)
+
+
+def fetch_concurrently(jobs: dict, worker, max_workers: int = DEFAULT_MAX_WORKERS) -> dict:
+    """
+    Chạy `worker(*args)` cho mỗi job trong một pool luồng có giới hạn.
+
+    Args:
+        jobs (dict): {tên: tuple tham số cho worker}.
+        worker (callable): Hàm nhận đúng các tham số trong tuple của job.
+        max_workers (int): Số luồng tối đa.
+
+    Returns:
+        dict: {tên: kết quả}, giữ nguyên thứ tự của `jobs`.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(worker, *args) for name, args in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
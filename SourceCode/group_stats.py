@@ -0,0 +1,89 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+
+# --- Cấu hình thống kê theo nhóm ---
+# Thống kê mặc định của results2.csv, theo đúng thứ tự cột xuất ra
+DEFAULT_AGGREGATES = ("median", "mean", "std")
+# Nhãn dùng trong tên cột "<Nhãn> của <cột>"
+AGGREGATE_LABELS = {"median": "Median", "mean": "Mean", "std": "Std", "min": "Min", "max": "Max"}
+# Hàng thống kê toàn giải luôn là hàng đầu tiên
+OVERALL_LABEL = "all"
+
+_QUANTILE_RE = re.compile(r"^q(\d{1,2})$")  # "q25" -> phân vị 0.25
+
+
+def aggregate_label(name: str) -> str:
+    """Nhãn của một thống kê: "median" -> "Median", "q25" -> "Q25"."""
+    if name in AGGREGATE_LABELS:
+        return AGGREGATE_LABELS[name]
+    if _QUANTILE_RE.match(name):
+        return name.upper()
+    raise ValueError(f"Thống kê không hỗ trợ: {name!r} (dùng {', '.join(AGGREGATE_LABELS)} hoặc q<phần trăm>)")
+
+
+def parse_quantile(name: str):
+    """Phân vị ứng với một thống kê: "median" -> 0.5, "q25" -> 0.25; None nếu không phải phân vị."""
+    if name == "median":
+        return 0.5
+    quantile = _QUANTILE_RE.match(name)
+    return int(quantile.group(1)) / 100 if quantile else None
+
+
+def is_quantile_aggregate(name: str) -> bool:
+    """Thống kê có phải phân vị (median hoặc q<nn>) không."""
+    return parse_quantile(name) is not None
+
+
+def _compute(obj, name: str):
+    """Gọi một thống kê trên DataFrame hoặc DataFrameGroupBy (mỗi lệnh xử lý mọi cột cùng lúc)."""
+    quantile = _QUANTILE_RE.match(name)
+    if quantile:
+        return obj.quantile(int(quantile.group(1)) / 100)
+    return getattr(obj, name)()
+
+
+@traced()
+def group_stats(df: pd.DataFrame, numeric_cols: list, by="Squad",
+                aggregates=DEFAULT_AGGREGATES, overall_label: str = OVERALL_LABEL) -> pd.DataFrame:
+    """
+    Tính các thống kê cho toàn bộ dữ liệu và cho từng nhóm, trả về bảng dạng rộng:
+    một hàng cho mỗi nhóm (hàng `overall_label` đứng đầu), các cột
+    "<Nhãn> của <cột>" xếp theo từng cột rồi từng thống kê.
+
+    Mỗi thống kê được tính một lần cho mọi nhóm và mọi cột bằng groupby của pandas,
+    sau đó các mảng kết quả được xếp xen kẽ bằng numpy, không có vòng lặp theo nhóm.
+
+    Args:
+        df (pd.DataFrame): Dữ liệu cầu thủ.
+        numeric_cols (list): Các cột số cần thống kê.
+        by (str | list): Cột (hoặc các cột) để nhóm, ví dụ "Squad" hoặc
+            ["Competition", "Season", "Squad"].
+        aggregates (tuple): Tên các thống kê: "median", "mean", "std", "min", "max", "q<nn>".
+        overall_label (str): Giá trị ghi vào cột nhóm của hàng toàn bộ dữ liệu.
+
+    Returns:
+        pd.DataFrame: Bảng thống kê, các cột nhóm đứng đầu.
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    labels = [aggregate_label(name) for name in aggregates]
+    stat_columns = [f"{label} của {col}" for col in numeric_cols for label in labels]
+
+    data = df[numeric_cols]
+    overall = np.stack([_compute(data, name).to_numpy(dtype="float64") for name in aggregates], axis=-1)
+
+    grouped = df.groupby(keys, sort=True)[numeric_cols]
+    per_group = [_compute(grouped, name) for name in aggregates]
+    group_index = per_group[0].index
+    values = np.stack([stats.to_numpy(dtype="float64") for stats in per_group], axis=-1)
+
+    # (nhóm, cột, thống kê) -> (nhóm, cột * thống kê)
+    table = np.vstack([overall.reshape(1, -1), values.reshape(len(group_index), -1)])
+    result = pd.DataFrame(table, columns=stat_columns)
+    key_frame = group_index.to_frame(index=False) if len(keys) > 1 else pd.DataFrame({keys[0]: group_index})
+    overall_keys = pd.DataFrame({key: [overall_label] for key in keys})
+    key_frame = pd.concat([overall_keys, key_frame.astype(object)], ignore_index=True)
+    return pd.concat([key_frame, result], axis=1)
@@ -0,0 +1,123 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from instrumentation import traced
+
+# --- Cấu hình vẽ histogram không cần màn hình ---
+DEFAULT_HISTOGRAM_DIR = "histograms"
+DEFAULT_LAYOUT = "grid"  # "grid": một ảnh lưới nhiều ô cho mỗi thống kê; "single": mỗi biểu đồ một ảnh
+LAYOUTS = ("grid", "single")
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+LEAGUE_COLOR = "skyblue"
+SQUAD_COLOR = "lightcoral"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", str(name))
+
+
+def shared_bin_edges(values: np.ndarray) -> np.ndarray:
+    """Các mốc bin tính một lần cho toàn giải (quy tắc "auto" như plt.hist), dùng chung cho mọi đội."""
+    if len(values) == 0:
+        return np.array([0.0, 1.0])
+    return np.histogram_bin_edges(values, bins="auto")
+
+
+def _draw(ax, values: np.ndarray, edges: np.ndarray, color: str, title: str, xlabel: str):
+    counts, _ = np.histogram(values, bins=edges)
+    # Vẽ cột từ số đếm đã tính (nhanh hơn ax.hist, vốn tính lại histogram và tạo patch qua nhiều bước)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=color, edgecolor="black")
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.tick_params(labelbottom=True)  # Lưới dùng chung trục x vẫn hiện số ở mọi ô
+    ax.set_ylabel("Số lượng cầu thủ")
+    ax.grid(axis="y", alpha=0.75)
+
+
+def render_stat(col_stat: str, league_values: np.ndarray, squad_values: dict, edges: np.ndarray,
+                out_dir: str, layout: str = DEFAULT_LAYOUT) -> tuple:
+    """
+    Vẽ histogram toàn giải và từng đội của một thống kê ra tệp PNG (backend Agg, không dùng pyplot).
+
+    Args:
+        col_stat (str): Tên cột thống kê.
+        league_values (np.ndarray): Giá trị của toàn giải (đã bỏ NaN).
+        squad_values (dict): {tên đội: giá trị của đội (đã bỏ NaN)}.
+        edges (np.ndarray): Mốc bin dùng chung.
+        out_dir (str): Thư mục ghi ảnh.
+        layout (str): "grid" (một ảnh lưới) hoặc "single" (một figure dùng lại cho từng ảnh).
+
+    Returns:
+        tuple: (col_stat, số ảnh đã ghi, thời gian vẽ tính bằng giây).
+    """
+    start = time.perf_counter()
+    panels = [(f"Phân phối của {col_stat} - Toàn giải", league_values, LEAGUE_COLOR, "all")]
+    panels += [(f"Phân phối của {col_stat} - Đội: {team}", values, SQUAD_COLOR, team)
+               for team, values in squad_values.items() if len(values)]
+    if layout == "grid":
+        n_cols = int(np.ceil(np.sqrt(len(panels))))
+        n_rows = int(np.ceil(len(panels) / n_cols))
+        fig = Figure(figsize=(5 * n_cols, 3.5 * n_rows))
+        axes = fig.subplots(n_rows, n_cols, sharex=True, squeeze=False).ravel()
+        # Khoảng cách cố định thay cho layout="constrained" (tốn hơn một giây cho lưới lớn)
+        fig.subplots_adjust(left=0.05, right=0.98, bottom=0.05, top=0.94, hspace=0.45, wspace=0.3)
+        for ax, (title, values, color, _) in zip(axes, panels):
+            _draw(ax, values, edges, color, title.replace(f"Phân phối của {col_stat} - ", ""), col_stat)
+        for ax in axes[len(panels):]:
+            ax.set_visible(False)
+        fig.suptitle(f"Phân phối của {col_stat}")
+        fig.savefig(os.path.join(out_dir, f"{_safe_name(col_stat)}.png"))
+        n_files = 1
+    else:
+        stat_dir = os.path.join(out_dir, _safe_name(col_stat))
+        os.makedirs(stat_dir, exist_ok=True)
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+        for title, values, color, name in panels:
+            ax.clear()
+            _draw(ax, values, edges, color, title, col_stat)
+            fig.savefig(os.path.join(stat_dir, f"{_safe_name(name)}.png"))
+        n_files = len(panels)
+    return col_stat, n_files, time.perf_counter() - start
+
+
+@traced()
+def render_histograms(df: pd.DataFrame, numeric_cols: list, group_col: str = "Squad",
+                      out_dir: str = DEFAULT_HISTOGRAM_DIR, layout: str = DEFAULT_LAYOUT,
+                      max_workers: int = DEFAULT_MAX_WORKERS) -> dict:
+    """
+    Ghi histogram của các cột `numeric_cols` ra thư mục `out_dir`, mỗi thống kê một tác vụ
+    trong pool tiến trình. Mốc bin được tính sẵn một lần cho mỗi thống kê.
+
+    Returns:
+        dict: {tên thống kê: thời gian vẽ (giây)}.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout phải là một trong {LAYOUTS}, nhận {layout!r}")
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    jobs = []
+    for col_stat in numeric_cols:
+        league_values = df[col_stat].dropna().to_numpy(dtype="float64")
+        squad_values = {}
+        if group_col is not None and group_col in df.columns:
+            valid = df[[group_col, col_stat]].dropna()
+            squad_values = {team: values.to_numpy(dtype="float64")
+                            for team, values in valid.groupby(group_col, sort=True)[col_stat]}
+        jobs.append((col_stat, league_values, squad_values, shared_bin_edges(league_values), out_dir, layout))
+
+    timings = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(render_stat, *job) for job in jobs]
+        for future in futures:
+            col_stat, n_files, seconds = future.result()
+            timings[col_stat] = seconds
+            print(f"    {col_stat}: {n_files} ảnh, vẽ trong {seconds:.2f}s")
+    print(f"Đã ghi histogram của {len(jobs)} thống kê vào '{out_dir}' trong {time.perf_counter() - start:.2f}s.")
+    return timings
@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+# --- Cấu hình mặc định cho bộ đệm trang web ---
+DEFAULT_CACHE_DIR = os.path.join(".cache", "http")
+DEFAULT_TTL_S = 6 * 3600  # Trang còn "mới" trong 6 giờ, sau đó phải xác thực lại
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+CACHE_MODES = ("default", "refresh", "cache-only", "off")
+
+
+class CacheMiss(Exception):
+    """Trang không có trong bộ đệm khi chạy ở chế độ cache-only."""
+
+
+class ResponseCache:
+    """
+    Bộ đệm trang web trên đĩa, lưu theo nội dung (content-addressed):
+    - `objects/<sha256>.html.gz`: nội dung trang đã nén, nhiều URL trùng nội dung dùng chung một tệp.
+    - `index.json`: URL -> {hash, etag, last_modified, fetched_at, last_access, size}.
+    Khi tổng dung lượng vượt `max_bytes`, các URL ít được dùng gần đây nhất bị loại trước (LRU).
+    Thời điểm truy cập của các lần đọc chỉ được cập nhật trong bộ nhớ và ghi ra index.json cùng lần ghi
+    tiếp theo (store, mark_revalidated) hoặc khi gọi flush/close.
+
+    Args:
+        directory (str): Thư mục chứa bộ đệm.
+        ttl (float): Số giây một trang được coi là còn mới.
+        max_bytes (int): Dung lượng tối đa của các tệp nội dung.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL_S,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._objects_dir = os.path.join(directory, "objects")
+        self._index_path = os.path.join(directory, "index.json")
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._index = self._load_index()
+        self._dirty = False  # Có thời điểm truy cập chưa ghi ra index.json
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+        self._dirty = False
+
+    def flush(self):
+        """Ghi các thời điểm truy cập còn trong bộ nhớ ra index.json."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def close(self):
+        self.flush()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects_dir, f"{digest}.html.gz")
+
+    def lookup(self, url: str):
+        """Trả về metadata của URL (bản sao) hoặc None."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None or not os.path.exists(self._object_path(entry["hash"])):
+                return None
+            return dict(entry)
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def read(self, url: str):
+        """Nội dung trang của URL, hoặc None nếu trang đã bị loại khỏi bộ đệm sau lookup (coi như trượt)."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:
+                return None
+            entry["last_access"] = time.time()
+            self._dirty = True
+            path = self._object_path(entry["hash"])
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, url: str, body: str, etag: str = None, last_modified: str = None):
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._index[url] = {
+                "hash": digest, "etag": etag, "last_modified": last_modified,
+                "fetched_at": now, "last_access": now, "size": os.path.getsize(path),
+            }
+            self._evict()
+            self._save_index()
+
+    def mark_revalidated(self, url: str):
+        """Máy chủ trả 304: nội dung không đổi, làm mới thời điểm tải."""
+        with self._lock:
+            entry = self._index.get(url)
+            if entry is None:  # Đã bị loại khỏi bộ đệm trong lúc xác thực lại
+                return
+            entry["fetched_at"] = entry["last_access"] = time.time()
+            self._save_index()
+
+    def _evict(self):
+        sizes = {entry["hash"]: entry["size"] for entry in self._index.values()}
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        for url, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            del self._index[url]
+            digest = entry["hash"]
+            if all(other["hash"] != digest for other in self._index.values()):
+                total -= sizes[digest]
+                try:
+                    os.remove(self._object_path(digest))
+                except FileNotFoundError:
+                    pass
+
+
+class CachedFetcher:
+    """
+    Bọc một fetcher bằng ResponseCache.
+
+    Chế độ (`mode`):
+    - "default": dùng bản trong bộ đệm nếu còn mới; nếu đã cũ thì xác thực lại bằng
+      ETag/Last-Modified (nếu fetcher bên trong hỗ trợ `fetch_conditional`), ngược lại tải lại.
+    - "refresh": luôn tải lại và ghi đè bộ đệm.
+    - "cache-only": chỉ đọc từ bộ đệm (không cần mạng), báo CacheMiss nếu thiếu trang.
+    """
+
+    def __init__(self, inner, cache: ResponseCache, mode: str = "default"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Chế độ bộ đệm không hợp lệ: {mode} (chọn một trong {CACHE_MODES})")
+        self.inner = inner
+        self.cache = cache
+        self.mode = mode
+
+    def fetch(self, url: str, table_id: str = None, table_class: str = None) -> str:
+        entry = self.cache.lookup(url) if self.mode != "refresh" else None
+        if entry is not None and (self.mode == "cache-only" or self.cache.is_fresh(entry)):
+            html = self.cache.read(url)
+            if html is not None:
+                return html
+            entry = None  # Bị loại giữa lookup và read: coi như trượt
+        if self.mode == "cache-only":
+            raise CacheMiss(f"Không có trong bộ đệm: {url}")
+
+        if hasattr(self.inner, "fetch_conditional"):
+            etag = entry["etag"] if entry else None
+            last_modified = entry["last_modified"] if entry else None
+            html, etag, last_modified = self.inner.fetch_conditional(
+                url, table_id=table_id, table_class=table_class, etag=etag, last_modified=last_modified)
+            if html is None:
+                self.cache.mark_revalidated(url)
+                html = self.cache.read(url)
+                if html is not None:
+                    return html
+                # Bị loại ngay sau khi xác thực lại: tải lại không điều kiện
+                html, etag, last_modified = self.inner.fetch_conditional(url, table_id=table_id,
+                                                                         table_class=table_class)
+        else:
+            html, etag, last_modified = self.inner.fetch(url, table_id=table_id, table_class=table_class), None, None
+        self.cache.store(url, html, etag=etag, last_modified=last_modified)
+        return html
+
+    def close(self):
+        self.cache.close()
+        self.inner.close()
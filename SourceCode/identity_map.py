@@ -0,0 +1,147 @@
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from incremental import fingerprint_config
+
+# --- Cấu hình bảng định danh cầu thủ ---
+DEFAULT_IDENTITY_DB_PATH = os.path.join(".cache", "identity.sqlite")
+SOURCES = ("fuzzy", "manual")  # "fuzzy": do so khớp mờ tìm ra; "manual": do người dùng chỉ định
+IDENTITY_COLUMNS = ["Player", "Squad", "Site_Player", "Site_Team", "Score", "Source", "Updated_At"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS identity (
+    player TEXT NOT NULL,
+    squad TEXT NOT NULL,
+    site_player TEXT NOT NULL,
+    site_team TEXT,
+    score REAL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (player, squad)
+)
+"""
+_SELECT = "SELECT player, squad, site_player, site_team, score, source, updated_at FROM identity"
+# Cặp "manual" không bao giờ bị kết quả so khớp mờ ghi đè
+_UPSERT_FUZZY = """
+INSERT INTO identity (player, squad, site_player, site_team, score, source, updated_at)
+VALUES (?, ?, ?, ?, ?, 'fuzzy', ?)
+ON CONFLICT (player, squad) DO UPDATE SET
+    site_player = excluded.site_player, site_team = excluded.site_team,
+    score = excluded.score, updated_at = excluded.updated_at
+WHERE identity.source != 'manual'
+"""
+
+
+def _squad_key(squad) -> str:
+    return "" if squad is None or pd.isna(squad) else str(squad)
+
+
+class IdentityMap:
+    """
+    Bảng định danh lưu trong SQLite: (Player, Squad) của fbref -> tên cầu thủ trên footballtransfers,
+    kèm điểm khớp và nguồn. P4 tra bảng này trước, chỉ so khớp mờ cho cầu thủ mới hoặc chưa khớp.
+    Mỗi thao tác mở một kết nối ngắn nên không cần đóng đối tượng.
+
+    Args:
+        path (str): Tệp SQLite.
+    """
+
+    def __init__(self, path: str = DEFAULT_IDENTITY_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def entries(self) -> pd.DataFrame:
+        """Toàn bộ bảng định danh."""
+        with self._connect() as conn:
+            rows = conn.execute(_SELECT).fetchall()
+        return pd.DataFrame(rows, columns=IDENTITY_COLUMNS)
+
+    def lookup(self, players: list, squads: list = None) -> pd.DataFrame:
+        """
+        Các cặp đã biết của (players[i], squads[i]), giữ thứ tự đầu vào.
+
+        Returns:
+            pd.DataFrame: Các cột IDENTITY_COLUMNS; hàng chưa có trong bảng có Site_Player là NaN.
+        """
+        squads = squads if squads is not None else [None] * len(players)
+        keys = pd.DataFrame({"Player": [str(player) for player in players],
+                             "Squad": [_squad_key(squad) for squad in squads]})
+        return keys.merge(self.entries(), on=["Player", "Squad"], how="left")
+
+    def record(self, players: list, squads: list, site_players: list, site_teams: list = None, scores: list = None):
+        """Lưu (hoặc cập nhật) các cặp do so khớp mờ tìm ra; cặp "manual" được giữ nguyên."""
+        n_rows = len(players)
+        squads = squads if squads is not None else [None] * n_rows
+        site_teams = site_teams if site_teams is not None else [None] * n_rows
+        scores = scores if scores is not None else [None] * n_rows
+        now = time.time()
+        rows = [(str(player), _squad_key(squad), str(site_player), None if site_team is None else str(site_team),
+                 None if score is None or pd.isna(score) else float(score), now)
+                for player, squad, site_player, site_team, score in zip(players, squads, site_players, site_teams, scores)]
+        with self._connect() as conn, conn:
+            conn.executemany(_UPSERT_FUZZY, rows)
+
+    def set_override(self, player: str, squad: str, site_player: str, site_team: str = None):
+        """Chỉ định thủ công tên trên footballtransfers của một cầu thủ (thay cho kết quả so khớp mờ)."""
+        with self._connect() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO identity VALUES (?, ?, ?, ?, NULL, 'manual', ?)",
+                         (str(player), _squad_key(squad), str(site_player), site_team, time.time()))
+
+    def remove(self, player: str, squad: str = None) -> bool:
+        """Xóa cặp của một cầu thủ (lần chạy sau sẽ so khớp mờ lại); False nếu không có."""
+        with self._connect() as conn, conn:
+            cursor = conn.execute("DELETE FROM identity WHERE player = ? AND squad = ?", (str(player), _squad_key(squad)))
+        return cursor.rowcount > 0
+
+    def fingerprint(self) -> str:
+        """
+        Dấu vân tay của các cặp "manual". Cặp "fuzzy" được suy ra từ dữ liệu nên không tính,
+        để bảng được ghi thêm sau mỗi lần chạy không làm bước P4 luôn bị coi là đã thay đổi.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT player, squad, site_player FROM identity WHERE source = 'manual' "
+                                "ORDER BY player, squad").fetchall()
+        return fingerprint_config(overrides=rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Xem và sửa bảng định danh cầu thủ fbref -> footballtransfers")
+    parser.add_argument("--db", default=DEFAULT_IDENTITY_DB_PATH, help="Tệp SQLite của bảng định danh")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="In bảng định danh")
+    list_parser.add_argument("--source", choices=SOURCES, default=None)
+    set_parser = commands.add_parser("set", help="Chỉ định thủ công tên trên footballtransfers")
+    set_parser.add_argument("player")
+    set_parser.add_argument("squad")
+    set_parser.add_argument("site_player")
+    set_parser.add_argument("--site-team", default=None)
+    remove_parser = commands.add_parser("remove", help="Xóa cặp của một cầu thủ")
+    remove_parser.add_argument("player")
+    remove_parser.add_argument("squad")
+    args = parser.parse_args()
+
+    identity_map = IdentityMap(args.db)
+    if args.command == "list":
+        entries = identity_map.entries()
+        if args.source is not None:
+            entries = entries[entries["Source"] == args.source]
+        print(entries.drop(columns="Updated_At").to_string(index=False) if len(entries) else "Bảng định danh trống.")
+    elif args.command == "set":
+        identity_map.set_override(args.player, args.squad, args.site_player, args.site_team)
+        print(f"Đã chỉ định '{args.player}' ({args.squad}) -> '{args.site_player}'.")
+    elif not identity_map.remove(args.player, args.squad):
+        print(f"Không có '{args.player}' ({args.squad}) trong bảng định danh.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from table_extract import find_table
+
+# --- Cấu hình mặc định cho việc chạy tăng dần ---
+DEFAULT_MANIFEST_PATH = os.path.join(".cache", "manifest.json")
+DEFAULT_SNAPSHOT_DIR = os.path.join(".cache", "tables")
+LOCK_TIMEOUT_S = 30.0  # Khóa tệp giữ lâu hơn mức này được coi là bị bỏ lại (tiến trình đã chết)
+
+
+def fingerprint_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint_text(text: str) -> str:
+    return fingerprint_bytes(text.encode("utf-8"))
+
+
+def fingerprint_file(path: str):
+    """Dấu vân tay của tệp, None nếu tệp không tồn tại."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """Dấu vân tay của DataFrame (tên cột + giá trị từng hàng)."""
+    digest = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint_config(**params) -> str:
+    """Dấu vân tay của các tham số cấu hình ảnh hưởng tới kết quả một bước."""
+    return fingerprint_text(json.dumps(params, sort_keys=True, default=str))
+
+
+def table_markup(html: str, table_id: str) -> str:
+    """
+    Cắt riêng mã HTML của bảng `table_id` trong trang (kể cả khi bảng nằm trong comment).
+    Trang fbref chứa quảng cáo, thời gian... thay đổi mỗi lần tải, nên chỉ phần bảng
+    mới dùng được để so sánh nội dung. Trả về cả trang nếu không tìm thấy bảng.
+    """
+    markup = find_table(html, table_id)
+    return markup if markup is not None else html
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = LOCK_TIMEOUT_S, poll: float = 0.05):
+    """
+    Khóa giữa các tiến trình bằng một tệp được tạo độc quyền (O_EXCL, dùng được cả trên Windows).
+    Chờ quá `timeout` giây thì coi khóa là bị bỏ lại và chiếm lấy.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            if time.monotonic() < deadline:
+                time.sleep(poll)
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            deadline = time.monotonic() + timeout
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class Manifest:
+    """
+    Tệp manifest (JSON) ghi lại dấu vân tay của các bảng đã tải và của đầu vào/đầu ra
+    của từng bước trong pipeline, giống cách `make` so sánh thời gian sửa tệp:
+    một bước chỉ cần chạy lại khi dấu vân tay đầu vào thay đổi hoặc đầu ra bị mất/sửa.
+    Mỗi lần ghi đọc lại tệp dưới khóa tệp và chỉ thay mục vừa đổi, nên nhiều tiến trình
+    (các bước chạy song song của pipeline.py) dùng chung một manifest mà không ghi đè mục của nhau.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        data.setdefault("tables", {})
+        data.setdefault("stages", {})
+        return data
+
+    def _update(self, section: str, key: str, value):
+        with self._lock, file_lock(self.path + ".lock"):
+            self._data = self._load()
+            self._data[section][key] = value
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def table_fingerprint(self, name: str):
+        with self._lock:
+            return self._data["tables"].get(name)
+
+    def set_table_fingerprint(self, name: str, fingerprint: str):
+        self._update("tables", name, fingerprint)
+
+    def is_up_to_date(self, stage: str, inputs: dict, outputs: list) -> bool:
+        """
+        Args:
+            stage (str): Tên bước, ví dụ "P2".
+            inputs (dict): {tên đầu vào: dấu vân tay}.
+            outputs (list): Đường dẫn các tệp đầu ra của bước.
+        """
+        with self._lock:
+            record = self._data["stages"].get(stage)
+        if record is None or record["inputs"] != inputs:
+            return False
+        return all(fingerprint_file(path) == record["outputs"].get(path) for path in outputs)
+
+    def record(self, stage: str, inputs: dict, outputs: list):
+        output_fps = {path: fingerprint_file(path) for path in outputs}
+        self._update("stages", stage, {"inputs": inputs, "outputs": output_fps})
+
+
+class SnapshotStore:
+    """Lưu/đọc bảng đã phân tích dưới dạng Parquet, mỗi bảng một tệp."""
+
+    def __init__(self, directory: str = DEFAULT_SNAPSHOT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]+", "_", name) + ".parquet")
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def save(self, name: str, df: pd.DataFrame):
+        tmp_path = self._path(name) + ".tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self._path(name))
+
+    def load(self, name: str) -> pd.DataFrame:
+        return pd.read_parquet(self._path(name))
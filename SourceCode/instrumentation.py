@@ -0,0 +1,258 @@
+import argparse
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # Không có trên Windows: bỏ trống các trường bộ nhớ
+except ImportError:
+    resource = None
+
+# --- Cấu hình đo đạc ---
+# Đặt biến môi trường này thành đường dẫn tệp JSON lines để bật đo đạc, kể cả trong các tiến trình con
+# (ví dụ: BTL_TRACE=.cache/trace.jsonl python P4.py). Khi tắt, @traced và span() chỉ tốn một phép so sánh.
+TRACE_ENV_VAR = "BTL_TRACE"
+_RSS_UNIT_MB = 1 / 2**20 if sys.platform == "darwin" else 1 / 1024  # ru_maxrss: byte trên macOS, KB trên Linux
+
+_recorder = None
+_local = threading.local()
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT_MB
+
+
+def count_rows(result):
+    """Số hàng của kết quả một hàm (DataFrame, Series, mảng numpy, list); None nếu không áp dụng."""
+    shape = getattr(result, "shape", None)
+    if shape:
+        return int(shape[0])
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+class Recorder:
+    """Ghi mỗi khoảng đo thành một dòng JSON (ghi nối thêm, nhiều tiến trình dùng chung được một tệp)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.process = os.path.basename(sys.argv[0]) or "python"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Span:
+    """Một khoảng đo đang mở; gọi set() để thêm thông tin (ví dụ rows=...)."""
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable(path: str):
+    """Bật đo đạc, ghi vào `path`; các tiến trình con khởi tạo sau đó cũng ghi vào cùng tệp."""
+    global _recorder
+    os.environ[TRACE_ENV_VAR] = path
+    _recorder = Recorder(path)
+
+
+def disable():
+    global _recorder
+    os.environ.pop(TRACE_ENV_VAR, None)
+    _recorder = None
+
+
+def is_enabled() -> bool:
+    return _recorder is not None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Đo một đoạn mã: thời gian thực, bộ nhớ đỉnh (RSS) của tiến trình và các thông tin trong `attrs`.
+    Các khoảng lồng nhau ghi lại khoảng cha (trường "parent").
+
+    Yields:
+        Span: Đối tượng để thêm thông tin (không làm gì khi đo đạc đang tắt).
+    """
+    recorder = _recorder
+    if recorder is None:
+        yield _NULL_SPAN
+        return
+    stack = _local.__dict__.setdefault("stack", [])
+    current = Span(name, dict(attrs))
+    parent = stack[-1].name if stack else None
+    stack.append(current)
+    rss_before = _peak_rss_mb()
+    start_wall, start = time.time(), time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        rss_after = _peak_rss_mb()
+        event = {"name": name, "ts": start_wall, "dur_s": round(duration, 6), "pid": os.getpid(),
+                 "tid": threading.get_ident(), "thread": threading.current_thread().name,
+                 "process": recorder.process, "parent": parent}
+        if rss_after is not None:
+            event["rss_peak_mb"] = round(rss_after, 1)
+            event["rss_peak_growth_mb"] = round(rss_after - rss_before, 1)
+        if error is not None:
+            event["error"] = error
+        event.update(current.attrs)
+        recorder.write(event)
+
+
+def traced(name: str = None, rows=count_rows):
+    """
+    Decorator đo mỗi lần gọi hàm (xem span) và ghi số hàng của kết quả (`rows(kết quả)`, None để bỏ qua).
+    Với hàm sinh (generator), khoảng đo kéo dài đến khi duyệt hết và ghi số phần tử đã sinh ("items").
+    Khi đo đạc tắt, hàm được gọi thẳng.
+
+    Args:
+        name (str, optional): Tên khoảng đo, mặc định "<module>.<tên hàm>".
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if _recorder is None:
+                    return (yield from func(*args, **kwargs))
+                with span(label) as current:
+                    items = 0
+                    for item in func(*args, **kwargs):
+                        items += 1
+                        yield item
+                    current.set(items=items)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with span(label) as current:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    n_rows = rows(result)
+                    if n_rows is not None:
+                        current.set(rows=n_rows)
+                return result
+        return wrapper
+    return decorator
+
+
+def read_events(path: str) -> list:
+    """Đọc các khoảng đo từ tệp JSON lines (bỏ qua dòng hỏng, ví dụ do tiến trình bị dừng giữa chừng)."""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def to_chrome_trace(events: list) -> dict:
+    """
+    Chuyển các khoảng đo sang định dạng Chrome trace (mở bằng chrome://tracing hoặc Perfetto):
+    mỗi khoảng là một sự kiện "X", mỗi tiến trình mang tên script của nó.
+    """
+    origin = min((event["ts"] for event in events), default=0.0)
+    trace_events, processes = [], {}
+    for event in events:
+        processes.setdefault(event["pid"], event.get("process", "python"))
+        args = {key: value for key, value in event.items()
+                if key not in ("name", "ts", "dur_s", "pid", "tid", "thread", "process")}
+        trace_events.append({"name": event["name"], "ph": "X", "ts": round((event["ts"] - origin) * 1e6),
+                             "dur": round(event["dur_s"] * 1e6), "pid": event["pid"], "tid": event["tid"],
+                             "args": args})
+    for pid, process in processes.items():
+        trace_events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{process} ({pid})"}})
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(jsonl_path: str, out_path: str) -> int:
+    """Ghi tệp Chrome trace từ tệp JSON lines; trả về số khoảng đo."""
+    events = read_events(jsonl_path)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(events), f, ensure_ascii=False)
+    return len(events)
+
+
+def summarize(events: list) -> list:
+    """
+    Tổng hợp theo tên khoảng đo.
+
+    Returns:
+        list: Các dict {name, calls, total_s, max_s, rows, rss_peak_mb}, thời gian tổng giảm dần.
+    """
+    totals = {}
+    for event in events:
+        row = totals.setdefault(event["name"], {"name": event["name"], "calls": 0, "total_s": 0.0, "max_s": 0.0,
+                                                "rows": 0, "rss_peak_mb": None})
+        row["calls"] += 1
+        row["total_s"] += event["dur_s"]
+        row["max_s"] = max(row["max_s"], event["dur_s"])
+        row["rows"] += event.get("rows") or event.get("items") or 0
+        if event.get("rss_peak_mb") is not None:
+            row["rss_peak_mb"] = max(row["rss_peak_mb"] or 0.0, event["rss_peak_mb"])
+    return sorted(totals.values(), key=lambda row: row["total_s"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Xem và chuyển đổi tệp đo đạc JSON lines")
+    commands = parser.add_subparsers(dest="command", required=True)
+    summary_parser = commands.add_parser("summary", help="Tổng thời gian theo từng khoảng đo")
+    summary_parser.add_argument("trace")
+    chrome_parser = commands.add_parser("chrome", help="Chuyển sang định dạng Chrome trace")
+    chrome_parser.add_argument("trace")
+    chrome_parser.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "chrome":
+        n_events = write_chrome_trace(args.trace, args.output)
+        print(f"Đã ghi {n_events} khoảng đo vào {args.output} (mở bằng chrome://tracing hoặc ui.perfetto.dev).")
+        return
+    print(f"{'Khoảng đo':<45} {'Lần':>5} {'Tổng (s)':>9} {'Lâu nhất (s)':>12} {'Hàng':>9} {'RSS đỉnh (MB)':>13}")
+    for row in summarize(read_events(args.trace)):
+        rss = f"{row['rss_peak_mb']:.1f}" if row["rss_peak_mb"] is not None else "-"
+        print(f"{row['name']:<45} {row['calls']:>5} {row['total_s']:>9.3f} {row['max_s']:>12.3f} "
+              f"{row['rows']:>9} {rss:>13}")
+
+
+if os.environ.get(TRACE_ENV_VAR):
+    enable(os.environ[TRACE_ENV_VAR])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_LEDGER_PATH = os.path.join(".cache", "jobs.json")
+
+
+class JobLedger:
+    """
+    Sổ ghi trạng thái công việc trên đĩa (JSON), được ghi lại sau mỗi thay đổi để
+    một lần chạy bị dừng giữa chừng có thể tiếp tục: công việc đã "done" sẽ không chạy lại.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._jobs = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._jobs = {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._jobs, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def is_done(self, job_id: str) -> bool:
+        with self._lock:
+            return self._jobs.get(job_id, {}).get("status") == "done"
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            return dict(self._jobs.get(job_id, {}))
+
+    def mark(self, job_id: str, status: str, **details):
+        with self._lock:
+            self._jobs[job_id] = {"status": status, "updated_at": time.time(), **details}
+            self._save()
+
+    def reset(self, job_ids=None):
+        """Xóa trạng thái (của các job chỉ định hoặc tất cả) để chạy lại từ đầu."""
+        with self._lock:
+            for job_id in list(self._jobs if job_ids is None else job_ids):
+                self._jobs.pop(job_id, None)
+            self._save()
+
+
+def run_jobs(jobs: dict, worker, ledger: JobLedger, max_workers: int = 4, on_result=None) -> dict:
+    """
+    Chạy song song các công việc chưa hoàn thành trong `ledger`.
+
+    Args:
+        jobs (dict): {job_id: tuple tham số cho worker}.
+        worker (callable): Hàm thực hiện một công việc.
+        ledger (JobLedger): Sổ ghi trạng thái; job thành công được đánh dấu "done",
+            job lỗi được đánh dấu "failed" kèm thông báo lỗi và sẽ chạy lại ở lần sau.
+        max_workers (int): Số luồng tối đa.
+        on_result (callable, optional): Gọi on_result(job_id, kết quả) trong luồng chính
+            ngay khi một job xong, trước khi job được đánh dấu "done".
+
+    Returns:
+        dict: {job_id: kết quả} của các job chạy thành công trong lần này.
+    """
+    pending = {job_id: args for job_id, args in jobs.items() if not ledger.is_done(job_id)}
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Bỏ qua {skipped} công việc đã hoàn thành ở lần chạy trước.")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(worker, *args): job_id for job_id, args in pending.items()}
+        for future in as_completed(futures):
+            job_id = futures[future]
+            try:
+                result = future.result()
+                if on_result is not None:
+                    on_result(job_id, result)
+            except Exception as e:
+                print(f"  Công việc {job_id} lỗi: {e}")
+                ledger.mark(job_id, "failed", error=str(e))
+                continue
+            ledger.mark(job_id, "done")
+            results[job_id] = result
+    return results
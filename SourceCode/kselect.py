@@ -0,0 +1,157 @@
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import calinski_harabasz_score, silhouette_score
+
+from instrumentation import traced
+
+# --- Cấu hình chọn số cụm K ---
+DEFAULT_K_RANGE = range(1, 30)
+DEFAULT_RANDOM_STATE = 42
+DEFAULT_N_INIT = 10
+# "full": KMeans n_init=10 cho từng k (như P3 ban đầu); "minibatch": MiniBatchKMeans;
+# "warm": KMeans khởi tạo từ tâm cụm của k-1 thêm điểm xa nhất (n_init=1, chạy tuần tự)
+MODES = ("full", "minibatch", "warm")
+# "inertia": k có mức giảm inertia lớn nhất (elbow); "silhouette"/"calinski_harabasz": k có điểm cao nhất
+SCORES = ("inertia", "silhouette", "calinski_harabasz")
+DEFAULT_SAMPLE_SIZE = 10000
+DEFAULT_N_JOBS = os.cpu_count() or 1
+# Dừng sớm (chỉ khi bật early_stop, mặc định tắt để K luôn giống lần quét đủ mọi k): khi PATIENCE mức giảm
+# inertia liên tiếp đều nhỏ hơn TOLERANCE lần mức giảm lớn nhất. Đây là ước lượng, có thể chọn K khác
+DEFAULT_PATIENCE = 3
+DEFAULT_TOLERANCE = 0.1
+
+
+class KSelection:
+    """Kết quả chọn K: số cụm, mô hình đã huấn luyện với K đó và số liệu của các k đã thử."""
+
+    def __init__(self, k, model, ks, inertia, scores, seconds):
+        self.k = k
+        self.model = model
+        self.ks = ks
+        self.inertia = inertia
+        self.scores = scores
+        self.seconds = seconds
+
+
+def fit_kmeans(X: np.ndarray, k: int, mode: str = "full", random_state: int = DEFAULT_RANDOM_STATE,
+               n_init: int = DEFAULT_N_INIT, init=None):
+    """Huấn luyện một mô hình k cụm theo `mode` (`init`: tâm cụm khởi tạo cho chế độ "warm")."""
+    if mode == "minibatch":
+        model = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=3, batch_size=4096)
+    elif mode == "warm" and init is not None:
+        model = KMeans(n_clusters=k, random_state=random_state, n_init=1, init=init)
+    else:
+        model = KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
+    return model.fit(X)
+
+
+def _warm_init(X: np.ndarray, model) -> np.ndarray:
+    """Tâm cụm khởi tạo cho k+1: giữ k tâm cũ, thêm điểm nằm xa tâm cụm của nó nhất."""
+    distances = np.min(model.transform(X), axis=1)
+    return np.vstack([model.cluster_centers_, X[np.argmax(distances)]])
+
+
+def elbow_k(ks: list, inertia: list) -> int:
+    """K ngay sau mức giảm inertia lớn nhất giữa hai k liên tiếp (tiêu chí của P3); chỉ thử một k thì chọn k đó."""
+    if not ks:
+        raise ValueError("Cần ít nhất một giá trị k")
+    if len(ks) == 1:
+        return ks[0]
+    drops = [inertia[i] - inertia[i + 1] for i in range(len(inertia) - 1)]
+    return ks[drops.index(max(drops)) + 1]
+
+
+def _elbow_settled(inertia: list, patience: int, tolerance: float) -> bool:
+    """
+    Tiêu chí elbow đã rõ ràng, dừng sớm được khi:
+    - inertia hiện tại nhỏ hơn mức giảm lớn nhất: mọi mức giảm sau đó không thể vượt quá
+      inertia còn lại (inertia >= 0 và giảm dần theo k), nên K elbow chắc chắn không đổi; hoặc
+    - `patience` mức giảm gần nhất đều nhỏ hơn `tolerance` lần mức giảm lớn nhất.
+    """
+    drops = [inertia[i] - inertia[i + 1] for i in range(len(inertia) - 1)]
+    if not drops:
+        return False
+    best_drop = max(drops)
+    if inertia[-1] < best_drop:
+        return True
+    best_index = drops.index(best_drop)
+    recent = drops[best_index + 1:][-patience:]
+    return len(recent) == patience and all(drop < tolerance * best_drop for drop in recent)
+
+
+def _score(X: np.ndarray, labels: np.ndarray, score: str, sample_size: int, random_state: int) -> float:
+    """Điểm silhouette/Calinski-Harabasz trên một mẫu con (NaN khi chỉ có một cụm)."""
+    if len(np.unique(labels)) < 2:
+        return np.nan
+    if len(X) > sample_size:
+        rows = np.random.default_rng(random_state).choice(len(X), sample_size, replace=False)
+        X, labels = X[rows], labels[rows]
+    if score == "silhouette":
+        return float(silhouette_score(X, labels))
+    return float(calinski_harabasz_score(X, labels))
+
+
+@traced()
+def select_k(X: np.ndarray, k_range=DEFAULT_K_RANGE, mode: str = "full", score: str = "inertia",
+             early_stop: bool = False, patience: int = DEFAULT_PATIENCE, tolerance: float = DEFAULT_TOLERANCE,
+             n_jobs: int = DEFAULT_N_JOBS, sample_size: int = DEFAULT_SAMPLE_SIZE,
+             random_state: int = DEFAULT_RANDOM_STATE, n_init: int = DEFAULT_N_INIT) -> KSelection:
+    """
+    Thử các k trong `k_range` và chọn số cụm, giữ lại mô hình của k được chọn để khỏi huấn luyện lại.
+
+    Các k được huấn luyện song song theo từng đợt `n_jobs` k (trừ chế độ "warm", vốn cần tâm cụm
+    của k trước). Với tiêu chí "inertia", `early_stop` dừng khi K elbow có vẻ đã rõ (xem _elbow_settled);
+    tiêu chí `patience` là ước lượng nên mặc định tắt.
+
+    Args:
+        X (np.ndarray): Ma trận đã chuẩn hóa.
+        k_range (range): Các k cần thử, tăng dần.
+        mode (str): "full", "minibatch" hoặc "warm".
+        score (str): "inertia", "silhouette" hoặc "calinski_harabasz".
+        early_stop (bool): Dừng sớm theo tiêu chí elbow (xem _elbow_settled), có thể cho K khác lần quét đủ.
+        patience (int), tolerance (float): Ngưỡng dừng sớm.
+        n_jobs (int): Số tiến trình huấn luyện song song.
+        sample_size (int): Số điểm tối đa dùng để tính silhouette/Calinski-Harabasz.
+
+    Returns:
+        KSelection: k được chọn, mô hình tương ứng, các k đã thử, inertia và điểm của chúng.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode phải là một trong {MODES}, nhận {mode!r}")
+    if score not in SCORES:
+        raise ValueError(f"score phải là một trong {SCORES}, nhận {score!r}")
+    ks = list(k_range)
+    if not ks:
+        raise ValueError("Cần ít nhất một giá trị k")
+    if score != "inertia" and max(ks) < 2:
+        raise ValueError(f"score={score!r} cần ít nhất một k >= 2 (một cụm không có điểm), nhận k_range={ks}")
+    start = time.perf_counter()
+    batch = 1 if mode == "warm" else max(1, n_jobs)
+    models, inertia, scores = [], [], []
+    with Parallel(n_jobs=min(batch, len(ks))) as parallel:
+        for i in range(0, len(ks), batch):
+            chunk = ks[i:i + batch]
+            if mode == "warm":
+                init = _warm_init(X, models[-1]) if models and models[-1].n_clusters + 1 == chunk[0] else None
+                fitted = [fit_kmeans(X, chunk[0], mode, random_state, n_init, init)]
+            else:
+                fitted = parallel(delayed(fit_kmeans)(X, k, mode, random_state, n_init) for k in chunk)
+            for model in fitted:
+                models.append(model)
+                inertia.append(float(model.inertia_))
+                if score != "inertia":
+                    scores.append(_score(X, model.labels_, score, sample_size, random_state))
+            if early_stop and score == "inertia" and _elbow_settled(inertia, patience, tolerance):
+                break
+
+    tried = ks[:len(models)]
+    if score == "inertia" or np.all(np.isnan(scores)):
+        # Mọi điểm đều NaN (mọi mô hình chỉ còn một cụm, ví dụ dữ liệu trùng nhau): dùng elbow
+        best_k = elbow_k(tried, inertia)
+    else:
+        best_k = tried[int(np.nanargmax(scores))]
+    return KSelection(best_k, models[tried.index(best_k)], tried, inertia, scores, time.perf_counter() - start)
@@ -0,0 +1,329 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    import resource  # Không có trên Windows: báo cáo bỏ trống cột bộ nhớ
+except ImportError:
+    resource = None
+
+import instrumentation
+from identity_map import DEFAULT_IDENTITY_DB_PATH, IdentityMap
+from incremental import Manifest, fingerprint_config, fingerprint_file
+
+# --- Cấu hình pipeline ---
+DEFAULT_WORKERS = 3  # Số bước chạy song song (mỗi bước một tiến trình riêng)
+PIPELINE_MANIFEST_PATH = os.path.join(".cache", "pipeline.json")
+REPORT_PATH = os.path.join(".cache", "pipeline_report.json")
+PLOT_MODES = ("save", "off")  # Trong pipeline không mở cửa sổ biểu đồ
+DEFAULT_OPTIONS = {
+    "force": False,
+    "plots": "save",
+    "fbref_source": None,  # Nguồn fbref: None (trang gốc), URL máy chủ giả lập hoặc thư mục HTML (xem fetcher.make_fetcher)
+    "transfers_source": None,  # Nguồn footballtransfers, như trên
+    "cache_mode": "default",  # Bộ đệm trang web của cả hai nguồn (xem http_cache.CachedFetcher)
+    "stats_memory_mb": None,  # Số MB: bước stats đọc results theo khối (P2.run_stats_chunked); None: nạp cả bảng
+}
+
+
+class Stage:
+    """
+    Một bước của pipeline.
+
+    Args:
+        name (str): Tên bước.
+        func: Hàm cấp module nhận dict tùy chọn (chạy trong tiến trình con nên phải pickle được).
+        deps (tuple): Các bước phải hoàn tất trước.
+        outputs (tuple): Tệp đầu ra; dấu vân tay của chúng là đầu vào của các bước phụ thuộc.
+        sources (tuple): Tệp mã nguồn của bước, sửa mã (kể cả hằng số cấu hình) thì bước chạy lại.
+        options (tuple): Các khóa tùy chọn ảnh hưởng tới đầu ra.
+        extra_inputs: Hàm trả về dict dấu vân tay đầu vào khác (không phải tệp), hoặc None.
+        cacheable (bool): False cho bước lấy dữ liệu từ web, luôn chạy vì không biết trang đã đổi hay chưa
+            (bộ đệm HTTP và manifest của từng script vẫn tránh việc tải và ghi lại không cần thiết).
+    """
+
+    def __init__(self, name, func, deps=(), outputs=(), sources=(), options=(), extra_inputs=None, cacheable=True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.outputs = tuple(outputs)
+        self.sources = tuple(sources)
+        self.options = tuple(options)
+        self.extra_inputs = extra_inputs
+        self.cacheable = cacheable
+
+
+class StageResult:
+    """Kết quả một bước: trạng thái, thời gian thực, thời gian CPU và bộ nhớ đỉnh của tiến trình chạy bước."""
+
+    STATUSES = ("ok", "cached", "failed", "skipped")
+
+    def __init__(self, name, status, wall_s=0.0, cpu_s=0.0, peak_rss_mb=None, error=None):
+        self.name = name
+        self.status = status
+        self.wall_s = wall_s
+        self.cpu_s = cpu_s
+        self.peak_rss_mb = peak_rss_mb
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {"stage": self.name, "status": self.status, "wall_s": round(self.wall_s, 3),
+                "cpu_s": round(self.cpu_s, 3), "peak_rss_mb": self.peak_rss_mb, "error": self.error}
+
+
+# --- Các bước (import script bên trong hàm để tiến trình chính không phải nạp selenium, sklearn...) ---
+def _scrape(options):
+    import P1
+    P1.scrape_tables(options["fbref_source"], cache_mode=options["cache_mode"])
+
+
+def _clean(options):
+    import P1
+    P1.build_results_file(force=options["force"])
+
+
+def _stats(options):
+    import P2
+    if options["stats_memory_mb"] is not None:
+        P2.run_stats_chunked(memory_mb=options["stats_memory_mb"], force=options["force"])
+    else:
+        P2.run_stats(histograms=options["plots"], force=options["force"])
+
+
+def _cluster(options):
+    import P3
+    P3.run_clustering(plots=options["plots"], force_retrain=options["force"] or P3.FORCE_RETRAIN)
+
+
+def _transfers(options):
+    import P4
+    fetcher = P4.create_fetcher(options["transfers_source"], cache_mode=options["cache_mode"])
+    try:
+        P4.scrape_transfer_values(fetcher=fetcher)
+    finally:
+        fetcher.close()
+
+
+def _valuation(options):
+    import P4
+    P4.run_valuation(force=options["force"])
+
+
+def _valuation_inputs():
+    # Chỉ các cặp chỉ định thủ công: cặp so khớp mờ được ghi thêm sau mỗi lần chạy (xem IdentityMap.fingerprint)
+    return {"identity_overrides": IdentityMap(DEFAULT_IDENTITY_DB_PATH).fingerprint()}
+
+
+RESULTS_FILES = ("results.feather", "results.csv")
+STAGES = [
+    Stage("scrape", _scrape, options=("fbref_source", "cache_mode"), cacheable=False),
+    Stage("clean", _clean, deps=("scrape",), outputs=RESULTS_FILES, cacheable=False),
+    Stage("stats", _stats, deps=("clean",), outputs=("top_3.txt", "top_3.json", "results2.csv", "results2_approx.csv"),
+          sources=("P2.py", "group_stats.py", "ranking.py", "histograms.py", "streaming_stats.py"),
+          options=("plots", "stats_memory_mb")),
+    Stage("cluster", _cluster, deps=("clean",), outputs=("clusters.csv", "cluster_profiles.csv"),
+          sources=("P3.py", "cluster_model.py", "kselect.py", "projection.py"), options=("plots",)),
+    Stage("transfers", _transfers, outputs=(os.path.join(".cache", "transfer_values.csv"),),
+          options=("transfers_source", "cache_mode"), cacheable=False),
+    Stage("valuation", _valuation, deps=("clean", "transfers"), outputs=("players_900mins_transfer_values.csv",),
+          sources=("P4.py", "name_matching.py", "identity_map.py"), extra_inputs=_valuation_inputs),
+]
+
+
+def select_stages(stages: list, targets: list = None, skip: list = ()) -> list:
+    """
+    Các bước cần chạy: `targets` cùng mọi bước chúng phụ thuộc (None: toàn bộ), trừ `skip`
+    (bước bị bỏ qua dùng đầu ra có sẵn trên đĩa). Giữ thứ tự của `stages`.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    unknown = [name for name in list(targets or []) + list(skip) if name not in by_name]
+    if unknown:
+        raise ValueError(f"Không có bước: {', '.join(unknown)} (chọn trong {', '.join(by_name)})")
+    wanted, pending = set(), list(targets or by_name)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in wanted and stage.name not in skip]
+
+
+def stage_inputs(stage: Stage, by_name: dict, options: dict) -> dict:
+    """Dấu vân tay đầu vào của một bước: đầu ra của các bước phụ thuộc, mã nguồn và tùy chọn của bước."""
+    inputs = {path: fingerprint_file(path) for dep in stage.deps for path in by_name[dep].outputs}
+    inputs.update({path: fingerprint_file(path) for path in stage.sources})
+    inputs["config"] = fingerprint_config(**{key: options[key] for key in stage.options})
+    if stage.extra_inputs is not None:
+        inputs.update(stage.extra_inputs())
+    return inputs
+
+
+def _peak_rss_mb():
+    """Bộ nhớ đỉnh (MB): lớn nhất giữa tiến trình hiện tại và các tiến trình con của nó (ru_maxrss tính bằng KB trên Linux)."""
+    if resource is None:
+        return None
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak_kb / 1024, 1)
+
+
+def _run_stage(stage: Stage, options: dict) -> StageResult:
+    """Chạy một bước trong tiến trình con và đo thời gian thực, CPU (kể cả tiến trình con của bước) và bộ nhớ đỉnh."""
+    times_start, start = os.times(), time.perf_counter()
+    error = None
+    try:
+        with instrumentation.span(f"pipeline.{stage.name}"):
+            stage.func(options)
+    except Exception as e:
+        traceback.print_exc()
+        error = f"{type(e).__name__}: {e}"
+    wall_s = time.perf_counter() - start
+    times_end = os.times()
+    cpu_s = sum(times_end[i] - times_start[i] for i in range(4))  # user, system của tiến trình và tiến trình con
+    return StageResult(stage.name, "failed" if error else "ok", wall_s, cpu_s, _peak_rss_mb(), error)
+
+
+def run_pipeline(stages: list, options: dict = None, max_workers: int = DEFAULT_WORKERS,
+                 manifest_path: str = PIPELINE_MANIFEST_PATH) -> list:
+    """
+    Chạy các bước theo đồ thị phụ thuộc: bước nào có đủ các bước phụ thuộc đã xong thì được chạy ngay,
+    song song tối đa `max_workers` bước, mỗi bước trong một tiến trình mới (đo bộ nhớ riêng từng bước).
+    Bước có đầu vào và đầu ra không đổi so với lần chạy trước được bỏ qua ("cached"); bước lỗi làm
+    mọi bước phụ thuộc vào nó bị bỏ qua ("skipped").
+
+    Args:
+        stages (list): Các Stage, theo thứ tự topo (xem select_stages).
+        options (dict): Tùy chọn, mặc định DEFAULT_OPTIONS.
+
+    Returns:
+        list: StageResult của từng bước, theo thứ tự của `stages`.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    by_name = {stage.name: stage for stage in STAGES}
+    by_name.update({stage.name: stage for stage in stages})
+    planned = {stage.name for stage in stages}
+    manifest = Manifest(manifest_path)
+    results, running, inputs = {}, {}, {}
+
+    def finish(result: StageResult):
+        results[result.name] = result
+        if result.status in ("ok", "cached"):
+            stage = by_name[result.name]
+            if stage.cacheable and result.status == "ok":
+                manifest.record(stage.name, inputs[stage.name], list(stage.outputs))
+            print(f"[pipeline] {result.name}: {result.status} ({result.wall_s:.1f}s)")
+            return
+        print(f"[pipeline] {result.name}: {result.status}" + (f" - {result.error}" if result.error else ""))
+        # Bỏ qua mọi bước phụ thuộc (trực tiếp hoặc gián tiếp) vào bước lỗi
+        for stage in stages:
+            if stage.name not in results and any(dep == result.name for dep in stage.deps):
+                finish(StageResult(stage.name, "skipped", error=f"bước '{result.name}' không hoàn tất"))
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, max_tasks_per_child=1) as pool:
+        while len(results) < len(stages):
+            for stage in stages:
+                if stage.name in results or stage.name in running.values():
+                    continue
+                # Bước không nằm trong kế hoạch (bị --skip) được coi là đã xong với đầu ra có sẵn
+                if not all(dep not in planned or results.get(dep, StageResult(dep, "")).status in ("ok", "cached")
+                           for dep in stage.deps):
+                    continue
+                if stage.cacheable:
+                    inputs[stage.name] = stage_inputs(stage, by_name, options)
+                    if not options["force"] and manifest.is_up_to_date(stage.name, inputs[stage.name],
+                                                                       list(stage.outputs)):
+                        finish(StageResult(stage.name, "cached"))
+                        continue
+                print(f"[pipeline] {stage.name}: bắt đầu")
+                running[pool.submit(_run_stage, stage, options)] = stage.name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    finish(future.result())
+                except Exception as e:  # Tiến trình con chết (hết bộ nhớ, bị kill...)
+                    finish(StageResult(name, "failed", error=f"{type(e).__name__}: {e}"))
+    return [results[stage.name] for stage in stages]
+
+
+def format_report(results: list, total_wall_s: float) -> str:
+    """Bảng thời gian và bộ nhớ của từng bước."""
+    lines = [f"{'Bước':<10} {'Trạng thái':<10} {'Thời gian (s)':>13} {'CPU (s)':>9} {'RSS đỉnh (MB)':>13}"]
+    for result in results:
+        rss = f"{result.peak_rss_mb:.1f}" if result.peak_rss_mb is not None else "-"
+        lines.append(f"{result.name:<10} {result.status:<10} {result.wall_s:>13.2f} {result.cpu_s:>9.2f} {rss:>13}")
+    busy_s = sum(result.wall_s for result in results)
+    lines.append(f"Tổng thời gian: {total_wall_s:.2f}s (tổng thời gian các bước {busy_s:.2f}s)")
+    return "\n".join(lines)
+
+
+def write_report(results: list, total_wall_s: float, path: str = REPORT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report = {"finished_at": time.time(), "total_wall_s": round(total_wall_s, 3),
+              "stages": [result.to_dict() for result in results]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(
+        description="Chạy toàn bộ quy trình P1-P4 theo đồ thị phụ thuộc: "
+                    "scrape -> clean -> (stats, cluster), transfers -> valuation")
+    parser.add_argument("targets", nargs="*", metavar="STAGE",
+                        help=f"Các bước cần chạy ({', '.join(names)}), kèm các bước chúng phụ thuộc; mặc định chạy tất cả")
+    parser.add_argument("--skip", nargs="+", default=[], choices=names,
+                        help="Bỏ qua các bước này, dùng đầu ra có sẵn (ví dụ --skip scrape transfers)")
+    parser.add_argument("--force", action="store_true", help="Chạy lại mọi bước dù đầu vào không đổi")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Số bước chạy song song")
+    parser.add_argument("--plots", choices=PLOT_MODES, default=DEFAULT_OPTIONS["plots"],
+                        help="save: ghi biểu đồ P2/P3 ra PNG; off: không vẽ")
+    parser.add_argument("--fbref-source", default=None, help="URL máy chủ giả lập hoặc thư mục HTML thay cho fbref")
+    parser.add_argument("--transfers-source", default=None,
+                        help="URL máy chủ giả lập hoặc thư mục HTML thay cho footballtransfers")
+    parser.add_argument("--cache", choices=("default", "refresh", "cache-only", "off"),
+                        default=DEFAULT_OPTIONS["cache_mode"], help="Chế độ bộ đệm trang web")
+    parser.add_argument("--stats-memory-mb", type=float, default=None,
+                        help="Bước stats đọc results theo khối trong giới hạn bộ nhớ này (MB), cho dữ liệu rất lớn")
+    parser.add_argument("--report", default=REPORT_PATH, help="Tệp JSON ghi báo cáo thời gian/bộ nhớ")
+    parser.add_argument("--trace", default=None,
+                        help="Ghi chi tiết thời gian từng hàm (JSON lines, xem instrumentation.py) vào tệp này")
+    parser.add_argument("--chrome-trace", default=None, help="Chuyển --trace sang định dạng Chrome trace vào tệp này")
+    args = parser.parse_args()
+    if args.chrome_trace and not args.trace:
+        parser.error("--chrome-trace cần --trace")
+
+    try:
+        stages = select_stages(STAGES, args.targets or None, args.skip)
+    except ValueError as e:
+        parser.error(str(e))
+    options = {"force": args.force, "plots": args.plots, "fbref_source": args.fbref_source,
+               "transfers_source": args.transfers_source, "cache_mode": args.cache,
+               "stats_memory_mb": args.stats_memory_mb}
+    print(f"Các bước sẽ chạy: {', '.join(stage.name for stage in stages)}")
+    if args.trace:
+        if os.path.exists(args.trace):
+            os.remove(args.trace)
+        instrumentation.enable(args.trace)  # Các tiến trình con của từng bước kế thừa biến môi trường
+    start = time.perf_counter()
+    results = run_pipeline(stages, options, args.workers)
+    total_wall_s = time.perf_counter() - start
+    print("\n" + format_report(results, total_wall_s))
+    write_report(results, total_wall_s, args.report)
+    print(f"Đã ghi báo cáo vào {args.report}.")
+    if args.chrome_trace:
+        n_events = instrumentation.write_chrome_trace(args.trace, args.chrome_trace)
+        print(f"Đã ghi {n_events} khoảng đo vào {args.chrome_trace}.")
+    if any(result.status in ("failed", "skipped") for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
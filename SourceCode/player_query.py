@@ -0,0 +1,329 @@
+import argparse
+import functools
+import os
+import shlex
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import NUMERIC_COLUMNS, RESULTS_CSV_PATH, load_results, typed_path
+
+# --- Cấu hình truy vấn ---
+QUERY_CACHE_SIZE = 1024  # Số kết quả truy vấn giữ trong bộ đệm LRU
+DEFAULT_TOP_K = 10
+# Cột được lập chỉ mục; Pos có thể có nhiều vị trí ("DF,MF") nên lập chỉ mục theo từng vị trí
+INDEXED_COLUMNS = ("Squad", "Pos", "Nation")
+MULTI_VALUE_COLUMNS = {"Pos": ","}
+DISPLAY_COLUMNS = ["Player", "Squad", "Pos", "Nation", "Min"]
+FILTER_NAMES = ("squad", "pos", "nation", "min_minutes")
+
+
+def _build_value_index(values: np.ndarray, separator: str = None) -> dict:
+    """Giá trị -> mảng vị trí hàng (tăng dần). Nation được lập thêm theo mã nước ("eng ENG" -> "ENG")."""
+    positions = {}
+    for row, value in enumerate(values):
+        if not isinstance(value, str):
+            continue
+        keys = {part.strip() for part in value.split(separator)} if separator else {value}
+        if not separator and " " in value:
+            keys.add(value.split()[-1])
+        for key in keys:
+            positions.setdefault(key, []).append(row)
+    return {key: np.asarray(rows, dtype=np.int32) for key, rows in positions.items()}
+
+
+class PlayerIndex:
+    """
+    Bảng cầu thủ đã có kiểu kèm chỉ mục dựng sẵn một lần:
+    - Squad, Pos, Nation: giá trị -> vị trí các hàng;
+    - mỗi cột số: thứ tự hàng đã sắp xếp tăng và giảm (NaN ở cuối, bằng điểm giữ thứ tự hàng)
+      và các giá trị đã sắp xếp, để lấy top-k và phân vị mà không phải sắp xếp lại.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df.reset_index(drop=True)
+        self.n_rows = len(self.df)
+        self.indexes = {col: _build_value_index(self.df[col].to_numpy(dtype=object), MULTI_VALUE_COLUMNS.get(col))
+                        for col in INDEXED_COLUMNS if col in self.df.columns}
+        self.stats = [col for col in self.df.columns if col in NUMERIC_COLUMNS]
+        self.values, self.ascending, self.descending, self.sorted_values, self.n_valid = {}, {}, {}, {}, {}
+        for col in self.stats:
+            values = self.df[col].to_numpy(dtype="float64", na_value=np.nan)
+            ascending = np.argsort(values, kind="stable").astype(np.int32)
+            self.values[col] = values
+            self.ascending[col] = ascending
+            self.descending[col] = np.argsort(-values, kind="stable").astype(np.int32)
+            self.n_valid[col] = int(np.count_nonzero(~np.isnan(values)))
+            self.sorted_values[col] = values[ascending[:self.n_valid[col]]]
+        # Cột hiển thị dạng mảng numpy: dựng bảng kết quả nhỏ nhanh hơn nhiều so với df.iloc
+        self.display = {col: self.df[col].to_numpy(dtype=object) if col not in self.values else self.df[col].to_numpy()
+                        for col in DISPLAY_COLUMNS if col in self.df.columns}
+        self._players = self.display.get("Player")
+
+    def _check_stat(self, stat: str):
+        if stat not in self.values:
+            raise KeyError(f"Không có cột số '{stat}'")
+
+    def rows(self, squad: str = None, pos: str = None, nation: str = None, min_minutes: float = None) -> np.ndarray:
+        """
+        Vị trí các hàng thỏa mọi điều kiện (None: không lọc). `pos` khớp từng vị trí ("MF" gồm cả "DF,MF"),
+        `nation` nhận cả "eng ENG" lẫn "ENG", `min_minutes` dùng thứ tự đã sắp xếp của cột Min.
+
+        Returns:
+            np.ndarray: Vị trí hàng tăng dần.
+        """
+        selected = None
+        for col, value in (("Squad", squad), ("Pos", pos), ("Nation", nation)):
+            if value is None:
+                continue
+            if col not in self.indexes:
+                raise KeyError(f"Bảng không có cột '{col}'")
+            found = self.indexes[col].get(value, np.zeros(0, dtype=np.int32))
+            selected = found if selected is None else np.intersect1d(selected, found, assume_unique=True)
+        if min_minutes is not None:
+            self._check_stat("Min")
+            start = np.searchsorted(self.sorted_values["Min"], min_minutes, side="left")
+            found = np.sort(self.ascending["Min"][start:self.n_valid["Min"]])
+            selected = found if selected is None else np.intersect1d(selected, found, assume_unique=True)
+        return np.arange(self.n_rows, dtype=np.int32) if selected is None else selected
+
+    def _mask(self, **filters):
+        """Mặt nạ boolean của các hàng thỏa `filters`, None nếu không lọc gì."""
+        if all(value is None for value in filters.values()):
+            return None
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(**filters)] = True
+        return mask
+
+    def top_rows(self, stat: str, k: int = DEFAULT_TOP_K, ascending: bool = False, **filters) -> np.ndarray:
+        """Vị trí k hàng có `stat` cao nhất (hoặc thấp nhất), bỏ qua NaN, duyệt thứ tự đã sắp xếp sẵn."""
+        self._check_stat(stat)
+        order = (self.ascending if ascending else self.descending)[stat][:self.n_valid[stat]]
+        mask = self._mask(**filters)
+        if mask is not None:
+            order = order[mask[order]]
+        return order[:k]
+
+    def top(self, stat: str, k: int = DEFAULT_TOP_K, ascending: bool = False, **filters) -> pd.DataFrame:
+        """k cầu thủ có `stat` cao nhất (hoặc thấp nhất) trong các hàng thỏa `filters`, kèm thứ hạng."""
+        rows = self.top_rows(stat, k, ascending, **filters)
+        columns = {"Rank": np.arange(1, len(rows) + 1)}
+        columns.update((col, values[rows]) for col, values in self.display.items() if col != stat)
+        columns[stat] = self.df[stat].to_numpy()[rows]
+        return pd.DataFrame(columns)
+
+    def _sorted_subset(self, stat: str, **filters) -> np.ndarray:
+        self._check_stat(stat)
+        mask = self._mask(**filters)
+        if mask is None:
+            return self.sorted_values[stat]
+        order = self.ascending[stat][:self.n_valid[stat]]
+        return self.values[stat][order[mask[order]]]
+
+    def percentile_rank(self, stat: str, player: str, **filters) -> float:
+        """
+        Phân vị của `player` theo `stat`: phần trăm cầu thủ (trong các hàng thỏa `filters`, có giá trị)
+        có `stat` không cao hơn cầu thủ này.
+
+        Raises:
+            KeyError: Không có cầu thủ hoặc cột số.
+            ValueError: Nhiều cầu thủ trùng tên (lọc thêm theo squad) hoặc cầu thủ không có giá trị `stat`.
+        """
+        self._check_stat(stat)
+        matches = self.rows(**filters)
+        matches = matches[self._players[matches] == player]
+        if len(matches) == 0:
+            raise KeyError(f"Không có cầu thủ '{player}'")
+        if len(matches) > 1:
+            raise ValueError(f"Có {len(matches)} cầu thủ tên '{player}', hãy lọc thêm theo squad")
+        value = self.values[stat][matches[0]]
+        if np.isnan(value):
+            raise ValueError(f"'{player}' không có giá trị '{stat}'")
+        subset = self._sorted_subset(stat, **filters)
+        return 100.0 * np.searchsorted(subset, value, side="right") / len(subset)
+
+    def quantile(self, stat: str, q: float, **filters) -> float:
+        """
+        Giá trị ở phân vị `q` (0-1, nội suy tuyến tính như np.quantile) của `stat`; NaN nếu không có hàng nào.
+
+        Raises:
+            ValueError: `q` nằm ngoài [0, 1].
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"Phân vị phải nằm trong [0, 1], nhận {q}")
+        subset = self._sorted_subset(stat, **filters)
+        if len(subset) == 0:
+            return float("nan")
+        position = q * (len(subset) - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, len(subset) - 1)
+        return float(subset[lower] + (subset[upper] - subset[lower]) * (position - lower))
+
+    def select(self, **filters) -> pd.DataFrame:
+        """Các cầu thủ thỏa `filters` (các cột hiển thị)."""
+        rows = self.rows(**filters)
+        return pd.DataFrame({col: values[rows] for col, values in self.display.items()})
+
+
+class PlayerQueryService:
+    """
+    Dịch vụ truy vấn trên results.csv: nạp bảng (ưu tiên results.feather) và dựng chỉ mục một lần,
+    ghi nhớ kết quả trong bộ đệm LRU. Mỗi truy vấn kiểm tra thời điểm sửa và kích thước của tệp
+    (một lệnh stat); khi results.csv hoặc results.feather đổi, bảng được nạp lại và bộ đệm bị xóa.
+    """
+
+    def __init__(self, csv_path: str = RESULTS_CSV_PATH, cache_size: int = QUERY_CACHE_SIZE):
+        self.csv_path = csv_path
+        self.cache_size = cache_size
+        self._index = None
+        self._signature = None
+        self._cached = None
+        self.loads = 0
+
+    def _source_signature(self) -> tuple:
+        signature = []
+        for path in (self.csv_path, typed_path(self.csv_path)):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    @property
+    def index(self) -> PlayerIndex:
+        """Chỉ mục hiện tại, nạp lại nếu tệp dữ liệu đã đổi."""
+        signature = self._source_signature()
+        if self._index is None or signature != self._signature:
+            self._index = PlayerIndex(load_results(self.csv_path))
+            self._signature = signature
+            self._cached = functools.lru_cache(maxsize=self.cache_size)(self._run)
+            self.loads += 1
+        return self._index
+
+    def _run(self, kind: str, args: tuple, filters: tuple):
+        filters = dict(zip(FILTER_NAMES, filters))
+        if kind == "top":
+            return self._index.top(*args, **filters)
+        if kind == "percentile":
+            return self._index.percentile_rank(*args, **filters)
+        if kind == "quantile":
+            return self._index.quantile(*args, **filters)
+        return self._index.select(**filters)
+
+    def _query(self, kind: str, args: tuple, squad=None, pos=None, nation=None, min_minutes=None):
+        self.index  # Kiểm tra tệp trước khi tra bộ đệm
+        result = self._cached(kind, args, (squad, pos, nation, min_minutes))
+        # Bộ đệm giữ DataFrame gốc: trả bản sao để người gọi sửa không làm hỏng kết quả đã nhớ
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+    def top(self, stat: str, k: int = DEFAULT_TOP_K, ascending: bool = False, **filters) -> pd.DataFrame:
+        return self._query("top", (stat, k, ascending), **filters)
+
+    def percentile_rank(self, stat: str, player: str, **filters) -> float:
+        return self._query("percentile", (stat, player), **filters)
+
+    def quantile(self, stat: str, q: float, **filters) -> float:
+        return self._query("quantile", (stat, q), **filters)
+
+    def select(self, **filters) -> pd.DataFrame:
+        return self._query("filter", (), **filters)
+
+    def cache_info(self):
+        return self._cached.cache_info() if self._cached is not None else None
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Truy vấn bảng cầu thủ (results.csv): lọc, top-k, phân vị")
+    parser.add_argument("--results", default=RESULTS_CSV_PATH, help="Tệp results.csv (dùng results.feather nếu có)")
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--squad", default=None)
+    filters.add_argument("--pos", default=None, help="Vị trí, ví dụ MF (khớp cả DF,MF)")
+    filters.add_argument("--nation", default=None, help="Quốc tịch, ví dụ ENG hoặc 'eng ENG'")
+    filters.add_argument("--min-minutes", type=float, default=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+    top_parser = commands.add_parser("top", parents=[filters], help="k cầu thủ có chỉ số cao nhất")
+    top_parser.add_argument("stat")
+    top_parser.add_argument("-k", type=int, default=DEFAULT_TOP_K)
+    top_parser.add_argument("--ascending", action="store_true", help="Lấy thấp nhất thay vì cao nhất")
+    percentile_parser = commands.add_parser("percentile", parents=[filters], help="Phân vị của một cầu thủ")
+    percentile_parser.add_argument("stat")
+    percentile_parser.add_argument("player")
+    quantile_parser = commands.add_parser("quantile", parents=[filters], help="Giá trị ở một phân vị (0-1)")
+    quantile_parser.add_argument("stat")
+    quantile_parser.add_argument("q", type=float)
+    commands.add_parser("filter", parents=[filters], help="Các cầu thủ thỏa điều kiện lọc")
+    commands.add_parser("shell", help="Nạp bảng một lần rồi đọc truy vấn từng dòng (cùng cú pháp, 'exit' để thoát)")
+    return parser
+
+
+def query(service: PlayerQueryService, args: argparse.Namespace):
+    """Thực hiện một truy vấn đã phân tích từ dòng lệnh; trả về kết quả (DataFrame hoặc số)."""
+    filters = {name: getattr(args, name) for name in FILTER_NAMES}
+    if args.command == "top":
+        return service.top(args.stat, args.k, args.ascending, **filters)
+    if args.command == "percentile":
+        return service.percentile_rank(args.stat, args.player, **filters)
+    if args.command == "quantile":
+        return service.quantile(args.stat, args.q, **filters)
+    return service.select(**filters)
+
+
+def format_answer(args: argparse.Namespace, result) -> str:
+    if args.command == "percentile":
+        return f"{args.player}: phân vị {result:.1f} theo {args.stat}"
+    if args.command == "quantile":
+        return f"{args.stat} ở phân vị {args.q:g}: {result:g}"
+    text = result.to_string(index=False) if len(result) else "Không có cầu thủ nào."
+    return f"{text}\n({len(result)} cầu thủ)" if args.command == "filter" else text
+
+
+def shell(service: PlayerQueryService, parser: argparse.ArgumentParser):
+    """Vòng lặp truy vấn: mỗi dòng là một lệnh (top/percentile/quantile/filter), in kết quả và thời gian trả lời."""
+    start = time.perf_counter()
+    index = service.index
+    print(f"Đã nạp {index.n_rows} cầu thủ, {len(index.stats)} chỉ số trong {time.perf_counter() - start:.3f}s.")
+    while True:
+        try:
+            line = input("> ").strip()
+        except EOFError:
+            break
+        if line in ("exit", "quit"):
+            break
+        if not line:
+            continue
+        try:
+            args = parser.parse_args(["--results", service.csv_path] + shlex.split(line))
+        except SystemExit:  # argparse đã in lỗi cú pháp
+            continue
+        if args.command == "shell":
+            continue
+        start = time.perf_counter()
+        try:
+            result = query(service, args)
+        except (KeyError, ValueError) as e:
+            print(f"Lỗi: {e.args[0] if e.args else e}")
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{format_answer(args, result)}\n(truy vấn {elapsed * 1e6:.0f} µs)")
+
+
+def main():
+    parser = _build_parser()
+    args = parser.parse_args()
+    service = PlayerQueryService(args.results)
+    if not os.path.exists(args.results) and not os.path.exists(typed_path(args.results)):
+        print(f"Lỗi: Không tìm thấy '{args.results}'. Hãy chạy P1.py trước.")
+        return
+    if args.command == "shell":
+        shell(service, parser)
+        return
+    try:
+        print(format_answer(args, query(service, args)))
+    except (KeyError, ValueError) as e:
+        print(f"Lỗi: {e.args[0] if e.args else e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+from sklearn.decomposition import PCA
+
+from instrumentation import traced
+
+# --- Cấu hình chiếu PCA 2D và ảnh mật độ của các cụm ---
+# Bảng nhỏ: SVD đầy đủ như trước. Bảng "cao và hẹp" (số hàng >= TALL_RATIO lần số cột, không quá
+# COVARIANCE_MAX_FEATURES cột): trị riêng của ma trận hiệp phương sai (một lần nhân X^T X, kết quả chính xác,
+# nhanh hơn cả SVD ngẫu nhiên lẫn IncrementalPCA trên 1 triệu hàng x 73 cột). Bảng rộng: SVD ngẫu nhiên.
+FULL_SVD_MAX_ROWS = 10000
+TALL_RATIO = 10
+COVARIANCE_MAX_FEATURES = 1000
+PCA_RANDOM_STATE = 0
+# Cách vẽ không gian PCA: "scatter" vẽ từng điểm (như trước), "density" vẽ ảnh mật độ theo ô lục giác,
+# "auto" chọn "density" khi số cầu thủ vượt SCATTER_MAX_POINTS (biểu đồ phân tán 1 triệu điểm mất khoảng 40s)
+CLUSTER_VIEWS = ("auto", "scatter", "density")
+SCATTER_MAX_POINTS = 20000
+DENSITY_GRIDSIZE = 80  # Số ô lục giác theo trục x
+DENSITY_CMAP = "viridis"
+CLUSTER_CMAP = "tab20"
+
+
+def pca_solver(n_rows: int, n_features: int) -> str:
+    """Chọn svd_solver của PCA theo kích thước ma trận (xem phần cấu hình)."""
+    if n_rows <= FULL_SVD_MAX_ROWS:
+        return "full"
+    if n_features <= COVARIANCE_MAX_FEATURES and n_rows >= TALL_RATIO * n_features:
+        return "covariance_eigh"
+    return "randomized"
+
+
+@traced()
+def fit_projection(X: np.ndarray, n_components: int = 2) -> PCA:
+    """
+    Huấn luyện PCA `n_components` chiều trên ma trận đã chuẩn hóa `X`, với svd_solver phù hợp kích thước.
+
+    Returns:
+        PCA: Mô hình đã huấn luyện.
+    """
+    solver = pca_solver(*X.shape)
+    random_state = PCA_RANDOM_STATE if solver == "randomized" else None
+    return PCA(n_components=n_components, svd_solver=solver, random_state=random_state).fit(X)
+
+
+def cluster_view(n_points: int, view: str = "auto") -> str:
+    """Cách vẽ thực tế ("scatter" hoặc "density") cho `n_points` điểm."""
+    if view not in CLUSTER_VIEWS:
+        raise ValueError(f"view phải là một trong {CLUSTER_VIEWS}, nhận {view!r}")
+    if view == "auto":
+        return "density" if n_points > SCATTER_MAX_POINTS else "scatter"
+    return view
+
+
+def cluster_profiles(features: pd.DataFrame, labels: np.ndarray, coords: np.ndarray) -> pd.DataFrame:
+    """
+    Hồ sơ của từng cụm: số cầu thủ, tỉ lệ, tâm cụm trong không gian PCA và trung bình mỗi cột số
+    (giá trị gốc, bỏ qua ô thiếu).
+
+    Args:
+        features (pd.DataFrame): Các cột số dùng để phân cụm (chưa chuẩn hóa).
+        labels (np.ndarray): Nhãn cụm của từng hàng.
+        coords (np.ndarray): Tọa độ PCA 2D của từng hàng.
+
+    Returns:
+        pd.DataFrame: Mỗi cụm một hàng, sắp theo nhãn cụm.
+    """
+    labels = np.asarray(labels)
+    counts = pd.Series(labels).value_counts().sort_index()
+    centroids = pd.DataFrame(coords[:, :2], columns=["PC1", "PC2"]).groupby(labels).mean()
+    means = features.reset_index(drop=True).groupby(labels).mean()
+    profiles = pd.concat([counts.rename("Players"), (counts / len(labels)).rename("Share"), centroids, means],
+                         axis=1)
+    return profiles.rename_axis("Cluster").reset_index()
+
+
+@traced()
+def render_density(coords: np.ndarray, labels: np.ndarray, profiles: pd.DataFrame, path: str,
+                   gridsize: int = DENSITY_GRIDSIZE) -> str:
+    """
+    Vẽ không gian PCA 2D thành ảnh mật độ theo ô lục giác (backend Agg, không dùng pyplot): bên trái số cầu
+    thủ mỗi ô (thang log), bên phải cụm chiếm đa số trong ô; cả hai đánh dấu tâm các cụm.
+
+    Args:
+        coords (np.ndarray): Tọa độ PCA 2D của từng cầu thủ.
+        labels (np.ndarray): Nhãn cụm của từng cầu thủ.
+        profiles (pd.DataFrame): Kết quả cluster_profiles (dùng các cột Cluster, PC1, PC2).
+        path (str): Tệp PNG cần ghi.
+        gridsize (int): Số ô lục giác theo trục x.
+
+    Returns:
+        str: Đường dẫn ảnh đã ghi.
+    """
+    labels = np.asarray(labels)
+    n_clusters = int(labels.max()) + 1 if len(labels) else 1
+    palette = colormaps[CLUSTER_CMAP]
+    cluster_cmap = ListedColormap([palette(i % palette.N) for i in range(n_clusters)])
+    fig = Figure(figsize=(14, 5.5))
+    density_ax, cluster_ax = fig.subplots(1, 2, sharex=True, sharey=True)
+    density = density_ax.hexbin(coords[:, 0], coords[:, 1], gridsize=gridsize, bins="log", mincnt=1,
+                                cmap=DENSITY_CMAP)
+    fig.colorbar(density, ax=density_ax, label="Số cầu thủ")
+    density_ax.set_title(f"Mật độ cầu thủ trong không gian PCA ({len(coords)} cầu thủ)")
+    majority = cluster_ax.hexbin(coords[:, 0], coords[:, 1], C=labels, gridsize=gridsize,
+                                 reduce_C_function=lambda values: np.bincount(values).argmax(),
+                                 cmap=cluster_cmap, vmin=-0.5, vmax=n_clusters - 0.5)
+    fig.colorbar(majority, ax=cluster_ax, label="Cluster", ticks=range(n_clusters))
+    cluster_ax.set_title(f"Cụm chiếm đa số trong mỗi ô ({n_clusters} cụm)")
+    for ax in (density_ax, cluster_ax):
+        ax.scatter(profiles["PC1"], profiles["PC2"], marker="X", s=80, c="white", edgecolors="black")
+        for cluster, x, y in zip(profiles["Cluster"], profiles["PC1"], profiles["PC2"]):
+            ax.annotate(str(cluster), (x, y), xytext=(5, 5), textcoords="offset points", fontweight="bold")
+        ax.set_xlabel("PC 1")
+        ax.set_ylabel("PC 2")
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fig.savefig(path, dpi=100)
+    return path
@@ -0,0 +1,143 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import traced
+
+# --- Cấu hình xếp hạng ---
+DEFAULT_K = 3
+DIRECTIONS = ("top", "bottom")
+RANKING_COLUMNS = ["Stat", "Direction", "Group", "Rank", "Row", "Value"]
+
+
+def _tie_keys(df: pd.DataFrame, tie_breaker) -> np.ndarray:
+    """Khóa phụ khi hai cầu thủ bằng điểm: thứ tự theo cột `tie_breaker` (nếu có), sau đó theo thứ tự hàng."""
+    if tie_breaker is None:
+        return np.zeros(len(df), dtype=np.int64)
+    return pd.Series(df[tie_breaker].to_numpy()).rank(method="dense").fillna(0).to_numpy(dtype=np.int64)
+
+
+def select_global(keys: np.ndarray, k: int, tie_keys: np.ndarray):
+    """
+    Chọn k hàng có khóa nhỏ nhất cho mọi cột cùng lúc (`keys` có dạng (cột, hàng), NaN bị bỏ qua).
+    np.partition tìm ngưỡng thứ k của từng cột trong một lần duyệt; chỉ các hàng
+    từ ngưỡng trở xuống (thường đúng k hàng, nhiều hơn khi bằng điểm) mới được sắp xếp.
+    """
+    n_cols, n_rows = keys.shape
+    kth = min(k, n_rows) - 1
+    threshold = np.partition(keys, kth, axis=1)[:, kth]
+    threshold[np.isnan(threshold)] = np.inf  # Cột có ít hơn k giá trị: lấy mọi giá trị có
+    cols, rows = np.nonzero(keys <= threshold[:, None])
+    values = keys[cols, rows]
+    order = np.lexsort((rows, tie_keys[rows], values, cols))
+    return rows[order], cols[order], np.zeros(len(rows), dtype=np.int64)
+
+
+def select_grouped(keys: np.ndarray, k: int, tie_keys: np.ndarray, group_codes: np.ndarray):
+    """Sắp xếp mọi ô theo (cột, nhóm, khóa) bằng một lần lexsort trên cả ma trận; lấy k đầu mỗi khối sau đó."""
+    n_cols, n_rows = keys.shape
+    rows = np.tile(np.arange(n_rows), n_cols)
+    cols = np.repeat(np.arange(n_cols), n_rows)
+    values = keys.ravel()
+    keep = ~np.isnan(values) & (group_codes[rows] >= 0)
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+    groups = group_codes[rows]
+    order = np.lexsort((rows, tie_keys[rows], values, groups, cols))
+    return rows[order], cols[order], groups[order]
+
+
+def rank_within(cols: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Thứ hạng (1, 2, ...) của từng phần tử trong khối (cột, nhóm) liên tiếp đã sắp xếp."""
+    if len(cols) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.r_[True, (cols[1:] != cols[:-1]) | (groups[1:] != groups[:-1])]
+    block_start = np.maximum.accumulate(np.where(starts, np.arange(len(cols)), 0))
+    return np.arange(len(cols)) - block_start + 1
+
+
+@traced()
+def rank_top_bottom(df: pd.DataFrame, numeric_cols: list, k: int = DEFAULT_K, by: str = None,
+                    tie_breaker: str = None) -> pd.DataFrame:
+    """
+    Tìm k giá trị cao nhất và thấp nhất của mọi cột thống kê trên ma trận số một lần,
+    thay vì gọi nlargest/nsmallest cho từng cột.
+
+    Args:
+        df (pd.DataFrame): Dữ liệu cầu thủ.
+        numeric_cols (list): Các cột thống kê.
+        k (int): Số cầu thủ mỗi chiều.
+        by (str, optional): Xếp hạng riêng trong từng nhóm (ví dụ "Squad"); None là toàn giải.
+        tie_breaker (str, optional): Cột dùng để phân định khi bằng điểm (ví dụ "Player");
+            cuối cùng luôn theo thứ tự hàng, giống keep="first" của nlargest.
+            Ô NaN không bao giờ được xếp hạng (nlargest thì chèn hàng NaN khi cột có ít hơn k giá trị).
+
+    Returns:
+        pd.DataFrame: Bảng dài với các cột Stat, Direction ("top"/"bottom"), Group,
+            Rank, Row (vị trí hàng trong `df`) và Value.
+    """
+    matrix = df[numeric_cols].to_numpy(dtype="float64", na_value=np.nan)
+    # Dạng (cột, hàng) liền bộ nhớ để chọn theo từng cột nhanh hơn
+    matrix_t = np.ascontiguousarray(matrix.T)
+    tie_keys = _tie_keys(df, tie_breaker)
+    if by is not None:
+        group_codes, group_names = pd.factorize(df[by], sort=True)
+    frames = []
+    for direction in DIRECTIONS:
+        # "top" = khóa nhỏ nhất của -giá trị, "bottom" = khóa nhỏ nhất của giá trị
+        keys = -matrix_t if direction == "top" else matrix_t
+        if len(df) == 0:
+            rows = cols = groups = np.zeros(0, dtype=np.int64)
+        elif by is None:
+            rows, cols, groups = select_global(keys, k, tie_keys)
+        else:
+            rows, cols, groups = select_grouped(keys, k, tie_keys, group_codes)
+        ranks = rank_within(cols, groups)
+        keep = ranks <= k
+        rows, cols, groups, ranks = rows[keep], cols[keep], groups[keep], ranks[keep]
+        frames.append(pd.DataFrame({
+            "Stat": np.asarray(numeric_cols, dtype=object)[cols],
+            "Direction": direction,
+            "Group": np.asarray(group_names, dtype=object)[groups] if by is not None else "all",
+            "Rank": ranks,
+            "Row": rows,
+            "Value": matrix[rows, cols],
+        }, columns=RANKING_COLUMNS))
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_rankings_text(rankings: pd.DataFrame, df: pd.DataFrame, numeric_cols: list,
+                        path: str = "top_3.txt", k: int = DEFAULT_K):
+    """Ghi bảng xếp hạng (toàn giải) theo định dạng văn bản của top_3.txt."""
+    display_cols = [col for col in ("Player", "Squad") if col in df.columns]
+    rows_by_key = {key: block["Row"].to_numpy() for key, block in rankings.groupby(["Stat", "Direction"], sort=False)}
+    with open(path, "w", encoding="utf-8") as f:
+        for col_stat in numeric_cols:
+            f.write(f"----------- Thống kê: {col_stat} -----------\n")
+            if (col_stat, "top") in rows_by_key:
+                top = df.iloc[rows_by_key[(col_stat, "top")]][display_cols + [col_stat]]
+                bottom = df.iloc[rows_by_key[(col_stat, "bottom")]][display_cols + [col_stat]]
+                f.write(f"Top {k} CAO NHẤT theo {col_stat}:\n")
+                f.write(top.to_string(index=False) + "\n")
+                f.write(f"Top {k} THẤP NHẤT theo {col_stat}:\n")
+                f.write(bottom.to_string(index=False) + "\n\n")
+            else:
+                f.write(f"Cột {col_stat} không có dữ liệu hợp lệ để tìm top/bottom {k}.\n\n")
+
+
+def write_rankings(rankings: pd.DataFrame, df: pd.DataFrame, path: str):
+    """
+    Ghi bảng xếp hạng ở dạng có cấu trúc, kèm tên cầu thủ/đội: .json (danh sách bản ghi) hoặc .csv.
+    """
+    out = rankings.copy()
+    for col in ("Player", "Squad"):
+        if col in df.columns:
+            out.insert(out.columns.get_loc("Row"), col, df[col].to_numpy(dtype=object)[out["Row"].to_numpy()])
+    out = out.drop(columns="Row")
+    if os.path.splitext(path)[1].lower() == ".json":
+        records = out.astype(object).where(out.notna(), None).to_dict(orient="records")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False, indent=1, default=lambda value: value.item())
+    else:
+        out.to_csv(path, index=False, encoding="utf-8-sig")
@@ -0,0 +1,201 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cleaning import clean_numeric
+
+# --- Lược đồ của bảng cầu thủ (results.csv / results.feather) ---
+# "string": cột văn bản; "Int64": số đếm (có thể thiếu); "float64": tỉ lệ, chỉ số kỳ vọng, chỉ số /90 phút
+RESULTS_SCHEMA = {
+    # Thông tin cơ bản
+    "Player": "string", "Squad": "string", "Nation": "string", "Pos": "string", "Age": "string",
+    # Thời gian thi đấu
+    "MP": "Int64", "Starts": "Int64", "Min": "Int64",
+    # Hiệu suất thi đấu
+    "Gls": "Int64", "Ast": "Int64", "CrdY": "Int64", "CrdR": "Int64",
+    # Chỉ số kỳ vọng
+    "xG": "float64", "xAG": "float64",
+    # Tiến triển bóng
+    "PrgC": "Int64", "PrgP": "Int64", "PrgR": "Int64",
+    # Thống kê theo 90 phút
+    "Gls.1": "float64", "Ast.1": "float64", "xG.1": "float64", "xAG.1": "float64",
+    # Thủ môn - Performance
+    "GA90": "float64", "Save%": "float64", "CS%": "float64",
+    # Thủ môn - Penalty
+    "PKsv": "Int64",
+    # Dứt điểm - Standard
+    "SoT%": "float64", "SoT/90": "float64", "G/Sh": "float64", "Dist": "float64",
+    # Chuyền bóng - Tổng
+    "Cmp": "Int64", "Cmp%": "float64", "TotDist": "Int64",
+    # Chuyền bóng - Ngắn / Trung bình / Dài
+    "Cmp%.1": "float64", "Cmp%.2": "float64", "Cmp%.3": "float64",
+    # Chuyền bóng - Kỳ vọng & sáng tạo
+    "KP": "Int64", "1/3": "Int64", "PPA": "Int64", "CrsPA": "Int64", "PrgP_Passing": "Int64",
+    # Kiến tạo và tạo cơ hội ghi bàn
+    "SCA": "Int64", "SCA90": "float64", "GCA": "Int64", "GCA90": "float64",
+    # Phòng ngự - Tắc bóng & tranh chấp
+    "Tkl": "Int64", "TklW": "Int64", "Att_Defensive act": "Int64", "Lost": "Int64",
+    # Phòng ngự - Chặn bóng
+    "Blocks": "Int64", "Sh_Defensive act": "Int64", "Pass": "Int64", "Int": "Int64",
+    # Kiểm soát bóng - Chạm bóng
+    "Touches": "Int64", "Def Pen": "Int64", "Def 3rd_Possession": "Int64",
+    "Mid 3rd_Possession": "Int64", "Att 3rd_Possession": "Int64", "Att Pen": "Int64",
+    # Kiểm soát bóng - Đi bóng
+    "Att_Possession": "Int64", "Succ%": "float64", "Tkld%": "float64",
+    # Kiểm soát bóng - Carry
+    "Carries": "Int64", "PrgDist_Possession": "Int64", "PrgC_Possession": "Int64",
+    "1/3_Possession": "Int64", "CPA": "Int64", "Mis": "Int64", "Dis": "Int64",
+    # Nhận bóng
+    "Rec": "Int64", "PrgR_Possession": "Int64",
+    # Thống kê khác - Hiệu suất
+    "Fls": "Int64", "Fld_Misc": "Int64", "Off": "Int64", "Crs": "Int64", "Recov": "Int64",
+    # Không chiến
+    "Won": "Int64", "Lost_Misc": "Int64", "Won%": "float64",
+}
+
+# Các cột cần giữ lại trong DataFrame, theo đúng thứ tự xuất ra
+columns_to_keep = list(RESULTS_SCHEMA)
+TEXT_COLUMNS = [col for col, dtype in RESULTS_SCHEMA.items() if dtype == "string"]
+NUMERIC_COLUMNS = [col for col, dtype in RESULTS_SCHEMA.items() if dtype != "string"]
+
+RESULTS_CSV_PATH = "results.csv"
+# Dữ liệu nhiều giải/mùa: <PARTITIONS_DIR>/competition=<giải>/season=<mùa>/results.feather (+ .csv)
+PARTITIONS_DIR = os.path.join("data", "partitions")
+
+
+def typed_path(csv_path: str = RESULTS_CSV_PATH) -> str:
+    """Tệp Feather có kiểu dữ liệu đi kèm một tệp CSV: results.csv -> results.feather."""
+    return os.path.splitext(csv_path)[0] + ".feather"
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Ép các cột có trong lược đồ về đúng kiểu (cột số phải đã là số, NaN được phép)."""
+    dtypes = {col: RESULTS_SCHEMA[col] for col in df.columns if col in RESULTS_SCHEMA}
+    for col, dtype in dtypes.items():
+        if dtype == "Int64":
+            values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            if not np.array_equal(values[~np.isnan(values)], np.round(values[~np.isnan(values)])):
+                dtypes[col] = "float64"  # Dữ liệu thực tế có phần thập phân: giữ float thay vì làm tròn
+    return df.astype(dtypes)
+
+
+def write_results(df: pd.DataFrame, csv_path: str = RESULTS_CSV_PATH) -> list:
+    """
+    Ghi bảng cầu thủ ra tệp Feather có kiểu (không nén để đọc bằng memory-map)
+    và ra CSV (chỉ để xuất, giá trị thiếu ghi là "N/a").
+
+    Returns:
+        list: Đường dẫn các tệp đã ghi.
+    """
+    typed = apply_schema(df).reset_index(drop=True)
+    typed.to_feather(typed_path(csv_path), compression="uncompressed")
+    typed.to_csv(csv_path, index=False, encoding="utf-8-sig", na_rep="N/a")
+    return [typed_path(csv_path), csv_path]
+
+
+def _to_analysis_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Int64 không có giá trị thiếu -> int64, có giá trị thiếu -> float64 (NaN),
+    giống kiểu mà pd.read_csv trả về để các bước sau dùng NaN như trước.
+    """
+    converted = {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.Int64Dtype):
+            has_na = df[col].isna().any()
+            converted[col] = df[col].to_numpy(dtype="float64" if has_na else "int64",
+                                              na_value=np.nan if has_na else 0)
+    return df.assign(**converted) if converted else df
+
+
+def load_results(csv_path: str = RESULTS_CSV_PATH, columns: list = None) -> pd.DataFrame:
+    """
+    Đọc bảng cầu thủ đã có kiểu: ưu tiên tệp Feather (memory-map, không cần làm sạch chuỗi);
+    nếu chưa có thì đọc CSV và chuyển các cột số theo lược đồ.
+
+    Raises:
+        FileNotFoundError: Không có cả tệp Feather lẫn CSV.
+    """
+    feather_path = typed_path(csv_path)
+    if os.path.exists(feather_path):
+        import pyarrow.feather as feather
+        df = feather.read_table(feather_path, columns=columns, memory_map=True).to_pandas()
+        return _to_analysis_dtypes(df)
+    df = pd.read_csv(csv_path, na_values="N/a", usecols=columns)
+    numeric = [col for col in df.columns if col in NUMERIC_COLUMNS]
+    df = df.assign(**{col: clean_numeric(df[col]) for col in numeric})
+    return _to_analysis_dtypes(apply_schema(df))
+
+
+def iter_results(csv_path: str = RESULTS_CSV_PATH, chunk_rows: int = 100_000, columns: list = None):
+    """
+    Đọc bảng cầu thủ theo từng khối tối đa `chunk_rows` hàng (cùng kiểu dữ liệu như load_results trên
+    từng khối), để xử lý dữ liệu không vừa bộ nhớ. Ưu tiên tệp Feather (đọc lần lượt từng record batch;
+    không dùng memory-map để các trang đã đọc không nằm lại trong bộ nhớ của tiến trình), nếu không thì
+    đọc CSV theo khối.
+
+    Raises:
+        FileNotFoundError: Không có cả tệp Feather lẫn CSV.
+    """
+    feather_path = typed_path(csv_path)
+    if os.path.exists(feather_path):
+        import pyarrow as pa
+        with pa.OSFile(feather_path) as source:
+            options = None
+            if columns is not None:  # Chỉ đọc các cột cần từ tệp
+                names = pa.ipc.open_file(source).schema.names
+                missing = [col for col in columns if col not in names]
+                if missing:
+                    raise KeyError(f"Không có cột {missing} trong '{feather_path}'")
+                options = pa.ipc.IpcReadOptions(included_fields=[names.index(col) for col in columns])
+            reader = pa.ipc.open_file(source, options=options)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    yield _to_analysis_dtypes(batch.slice(start, chunk_rows).to_pandas())
+        return
+    for chunk in pd.read_csv(csv_path, na_values="N/a", usecols=columns, chunksize=chunk_rows):
+        numeric = [col for col in chunk.columns if col in NUMERIC_COLUMNS]
+        chunk = chunk.assign(**{col: clean_numeric(chunk[col]) for col in numeric})
+        yield _to_analysis_dtypes(apply_schema(chunk))
+
+
+def partition_id(competition: str, season: str) -> str:
+    return f"{competition}/{season}"
+
+
+def partition_csv_path(competition: str, season: str, root: str = PARTITIONS_DIR) -> str:
+    return os.path.join(root, f"competition={competition}", f"season={season}", RESULTS_CSV_PATH)
+
+
+def list_partitions(root: str = PARTITIONS_DIR) -> list:
+    """Danh sách (giải, mùa) đã có dữ liệu trong `root`."""
+    found = []
+    if not os.path.isdir(root):
+        return found
+    for comp_dir in sorted(os.listdir(root)):
+        if not comp_dir.startswith("competition="):
+            continue
+        for season_dir in sorted(os.listdir(os.path.join(root, comp_dir))):
+            if season_dir.startswith("season="):
+                found.append((comp_dir.split("=", 1)[1], season_dir.split("=", 1)[1]))
+    return found
+
+
+def load_partitions(root: str = PARTITIONS_DIR, competitions: list = None, seasons: list = None,
+                    columns: list = None) -> pd.DataFrame:
+    """
+    Đọc và nối các phân vùng (giải, mùa) được chọn; chỉ các phân vùng khớp bộ lọc mới được đọc.
+    Thêm hai cột "Competition" và "Season".
+    """
+    frames = []
+    for competition, season in list_partitions(root):
+        if competitions and competition not in competitions:
+            continue
+        if seasons and season not in seasons:
+            continue
+        df = load_results(partition_csv_path(competition, season, root), columns=columns)
+        frames.append(df.assign(Competition=competition, Season=season))
+    if not frames:
+        return pd.DataFrame(columns=(columns or columns_to_keep) + ["Competition", "Season"])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,443 @@
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from group_stats import OVERALL_LABEL, aggregate_label, parse_quantile
+from instrumentation import traced
+from ranking import DIRECTIONS, RANKING_COLUMNS, rank_within, select_global, select_grouped
+from schema import RESULTS_CSV_PATH, RESULTS_SCHEMA, iter_results
+
+# --- Cấu hình thống kê theo khối (dữ liệu không vừa bộ nhớ) ---
+DEFAULT_MEMORY_MB = 256
+# Phần ngân sách bộ nhớ dành cho khối dữ liệu đang xử lý (phần còn lại cho sketch, bộ đệm top-k, pandas)
+CHUNK_BUDGET_SHARE = 0.5
+CHUNK_COPIES = 6  # Số bản sao của ma trận khối cùng lúc (đọc, float64, chuyển vị, khóa -x, sắp xếp)
+MIN_CHUNK_ROWS = 1_000
+# Độ chính xác của sketch phân vị: sai số hạng khoảng 1.7/SKETCH_K (~1% với 200); mỗi sketch giữ
+# khoảng 3 * SKETCH_K giá trị. Nhóm có không quá SKETCH_K giá trị được tính chính xác.
+SKETCH_K = 200
+MIN_SKETCH_K = 16
+SKETCH_SEED = 0
+
+
+def chunk_rows_for_budget(n_cols: int, memory_mb: float = DEFAULT_MEMORY_MB) -> int:
+    """Số hàng mỗi khối để ma trận khối (và các bản sao tạm) nằm trong phần ngân sách dành cho nó."""
+    row_bytes = max(1, n_cols) * 8 * CHUNK_COPIES
+    return max(MIN_CHUNK_ROWS, int(memory_mb * 2**20 * CHUNK_BUDGET_SHARE / row_bytes))
+
+
+def sketch_k_for_budget(n_groups: int, n_cols: int, memory_mb: float = DEFAULT_MEMORY_MB,
+                        max_k: int = SKETCH_K) -> int:
+    """
+    Độ lớn k của sketch để mọi sketch (toàn giải và mỗi nhóm, mỗi sketch khoảng 3 * k hàng) nằm trong phần ngân sách
+    không dành cho khối dữ liệu; không nhỏ hơn MIN_SKETCH_K (nhiều nhóm quá thì độ chính xác giảm trước).
+    """
+    budget_values = memory_mb * 2**20 * (1 - CHUNK_BUDGET_SHARE) / 8
+    k = int(budget_values / (3 * (n_groups + 1) * max(1, n_cols)))
+    return max(MIN_SKETCH_K, min(max_k, k))
+
+
+def count_groups(results_path: str, by: str, chunk_rows: int) -> int:
+    """Số giá trị khác nhau của cột `by` (chỉ đọc cột này); 0 nếu không có cột."""
+    names = set()
+    try:
+        for chunk in iter_results(results_path, chunk_rows, columns=[by]):
+            names.update(chunk[by].dropna().unique())
+    except (KeyError, ValueError):  # Không có cột `by`
+        return 0
+    return len(names)
+
+
+class RunningMoments:
+    """
+    Số đếm, trung bình, tổng bình phương độ lệch (M2), min và max của từng cột (bỏ qua NaN),
+    cập nhật theo khối và gộp được với nhau theo công thức Welford/Chan (ổn định số học,
+    không cần giữ dữ liệu).
+    """
+
+    def __init__(self, n_cols: int):
+        self.count = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+
+    def merge_arrays(self, count, mean, m2, minimum, maximum):
+        total = self.count + count
+        has_new = count > 0
+        weight = np.divide(count, total, out=np.zeros_like(total), where=total > 0)
+        delta = np.where(has_new, mean - self.mean, 0.0)
+        self.m2 = self.m2 + np.where(has_new, m2 + delta ** 2 * self.count * weight, 0.0)
+        self.mean = self.mean + delta * weight
+        self.count = total
+        self.min = np.minimum(self.min, minimum)
+        self.max = np.maximum(self.max, maximum)
+
+    def update(self, block: np.ndarray):
+        """Thêm một khối dạng (hàng, cột)."""
+        valid = ~np.isnan(block)
+        count = valid.sum(axis=0).astype("float64")
+        total = np.where(valid, block, 0.0).sum(axis=0)
+        mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+        m2 = np.where(valid, (block - mean) ** 2, 0.0).sum(axis=0)
+        self.merge_arrays(count, mean, m2, np.where(valid, block, np.inf).min(axis=0, initial=np.inf),
+                          np.where(valid, block, -np.inf).max(axis=0, initial=-np.inf))
+
+    def merge(self, other: "RunningMoments"):
+        self.merge_arrays(other.count, other.mean, other.m2, other.min, other.max)
+
+    def add_constant(self, value: np.ndarray, count: np.ndarray):
+        """Thêm `count` lần giá trị `value` cho từng cột (ví dụ ô thiếu được điền bằng trung bình)."""
+        count = np.where(np.isnan(value), 0.0, count)
+        value = np.nan_to_num(value)
+        self.merge_arrays(count, value, np.zeros_like(value), np.where(count > 0, value, np.inf),
+                          np.where(count > 0, value, -np.inf))
+
+    def copy(self) -> "RunningMoments":
+        other = RunningMoments(len(self.count))
+        other.merge(self)
+        return other
+
+    def statistic(self, name: str) -> np.ndarray:
+        """"mean", "std" (ddof=1 như pandas), "min" hoặc "max"; NaN khi không đủ giá trị."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if name == "mean":
+                return np.where(self.count > 0, self.mean, np.nan)
+            if name == "std":
+                return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        if name in ("min", "max"):
+            values = self.min if name == "min" else self.max
+            return np.where(self.count > 0, values, np.nan)
+        raise ValueError(f"Thống kê không tính được từ moments: {name!r}")
+
+
+class QuantileSketch:
+    """
+    Sketch phân vị kiểu KLL cho nhiều cột cùng lúc: các tầng là mảng (giá trị, cột), giá trị ở tầng h đại diện
+    cho 2^h giá trị gốc, NaN là ô trống (cột đó thiếu giá trị ở hàng này). Khi tổng số hàng vượt tổng sức chứa,
+    tầng thấp nhất đang đầy được sắp xếp theo từng cột và giữ lại một nửa (xen kẽ, điểm bắt đầu ngẫu nhiên)
+    đẩy lên tầng trên. Bộ nhớ giới hạn ở khoảng 3 * k hàng mỗi sketch, sai số hạng khoảng 1.7 / k
+    (ô trống bị ghép cặp với giá trị có thể thêm tối đa một đơn vị trọng số mỗi lần nén).
+    Gộp được với sketch khác; khi chưa phải nén (không quá k hàng), phân vị là chính xác.
+    """
+
+    def __init__(self, n_cols: int, k: int = SKETCH_K, rng: np.random.Generator = None):
+        self.n_cols = n_cols
+        self.k = k
+        self.rng = rng if rng is not None else np.random.default_rng(SKETCH_SEED)
+        self.levels = []
+        self.size = 0  # Số hàng đang giữ
+        self._add_level()
+
+    def _add_level(self):
+        """Thêm một tầng trên cùng; sức chứa: tầng trên cùng k, mỗi tầng thấp hơn bằng 2/3 tầng trên nó."""
+        self.levels.append(np.zeros((0, self.n_cols)))
+        height = len(self.levels)
+        self.capacities = [max(2, int(math.ceil(self.k * (2 / 3) ** (height - level - 1)))) for level in range(height)]
+        self.total_capacity = sum(self.capacities)
+
+    def _compress(self):
+        """
+        Nén kiểu "lười": chỉ khi tổng số hàng vượt tổng sức chứa, mỗi lần nén tầng thấp nhất đang vượt
+        sức chứa của nó (luôn có ít nhất một tầng như vậy), đến khi vừa trở lại.
+        """
+        while self.size > self.total_capacity:
+            level = next(level for level, items in enumerate(self.levels) if len(items) > self.capacities[level])
+            if level + 1 == len(self.levels):
+                self._add_level()
+            items = np.sort(self.levels[level], axis=0)  # Từng cột, NaN xếp cuối
+            keep = items[:len(items) % 2].copy()  # Số lẻ: giữ lại một hàng ở tầng hiện tại (bản sao, không giữ cả mảng)
+            promoted = items[len(keep):][self.rng.integers(2)::2]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            self.levels[level] = keep
+            self.size -= len(items) - len(keep) - len(promoted)
+
+    def update(self, block: np.ndarray):
+        """Thêm một khối dạng (hàng, cột); hàng thiếu mọi cột bị bỏ qua."""
+        block = block[~np.isnan(block).all(axis=1)]
+        if len(block) == 0:
+            return
+        self.size += len(block)
+        self.levels[0] = np.concatenate([self.levels[0], block])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self._add_level()
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.size += other.size
+        self._compress()
+
+    def quantile(self, q: float, fill_values: np.ndarray = None, fill_counts: np.ndarray = None) -> np.ndarray:
+        """
+        Phân vị `q` (0-1) của từng cột với nội suy tuyến tính như pandas, coi như cột j có thêm `fill_counts[j]`
+        lần `fill_values[j]` (ô thiếu được điền bằng trung bình). NaN cho cột không có giá trị nào.
+        """
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        result = np.full(self.n_cols, np.nan)
+        for j in range(self.n_cols):
+            present = ~np.isnan(values[:, j])
+            col_values, col_weights = values[present, j], weights[present]
+            if fill_counts is not None and fill_counts[j] > 0 and not np.isnan(fill_values[j]):
+                col_values = np.append(col_values, fill_values[j])
+                col_weights = np.append(col_weights, float(fill_counts[j]))
+            if len(col_values) == 0:
+                continue
+            order = np.argsort(col_values, kind="stable")
+            col_values, cumulative = col_values[order], np.cumsum(col_weights[order])
+            position = q * (cumulative[-1] - 1)
+            lower = math.floor(position)
+            # Giá trị thứ i (tính từ 0) là giá trị đầu tiên có trọng số cộng dồn > i
+            below = col_values[np.searchsorted(cumulative, lower, side="right")]
+            above = col_values[min(np.searchsorted(cumulative, lower + 1, side="right"), len(col_values) - 1)]
+            result[j] = below + (above - below) * (position - lower)
+        return result
+
+
+class TopKBuffer:
+    """
+    Giữ tối đa k ứng viên có khóa nhỏ nhất cho mỗi (cột, nhóm); bằng khóa thì hàng đứng trước thắng,
+    như rank_top_bottom. Bộ nhớ không tăng theo số hàng đã đọc.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.keys = np.zeros(0)
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.cols = np.zeros(0, dtype=np.int64)
+        self.groups = np.zeros(0, dtype=np.int64)
+
+    def push(self, keys, rows, cols, groups):
+        keys = np.concatenate([self.keys, keys])
+        rows = np.concatenate([self.rows, rows])
+        cols = np.concatenate([self.cols, cols])
+        groups = np.concatenate([self.groups, groups])
+        order = np.lexsort((rows, keys, groups, cols))
+        order = order[rank_within(cols[order], groups[order]) <= self.k]
+        self.keys, self.rows, self.cols, self.groups = keys[order], rows[order], cols[order], groups[order]
+
+
+def _first_k(rows, cols, groups, k):
+    """Giữ k phần tử đầu của mỗi khối (cột, nhóm) liên tiếp."""
+    keep = rank_within(cols, groups) <= k
+    return rows[keep], cols[keep], groups[keep]
+
+
+class StreamingStats:
+    """
+    Thống kê của P2 tính theo từng khối, bộ nhớ không phụ thuộc số hàng:
+    - mean/std/min/max cho toàn giải và từng đội bằng RunningMoments;
+    - median và q<nn> bằng một QuantileSketch (mọi cột cùng lúc) cho toàn giải và cho mỗi đội;
+    - top/bottom k mỗi cột (toàn giải và, nếu cần, trong từng đội) bằng TopKBuffer.
+    Các ô thiếu được tính như khi điền bằng trung bình toàn giải của cột (như P2 làm trên cả bảng):
+    số ô thiếu được đếm, trung bình chỉ biết khi đọc hết nên phần điền được thêm vào lúc tổng hợp.
+    """
+
+    def __init__(self, numeric_cols: list, by: str = "Squad", k: int = 3, rank_by_group: bool = False,
+                 sketch_k: int = SKETCH_K, display_cols=("Player", "Squad")):
+        self.numeric_cols = list(numeric_cols)
+        self.by = by
+        self.k = k
+        self.rank_by_group = rank_by_group
+        self.sketch_k = sketch_k
+        self.display_cols = list(display_cols)
+        self.rng = np.random.default_rng(SKETCH_SEED)
+        n_cols = len(self.numeric_cols)
+        self.group_names = []  # Nhóm thứ i có mã i + 1; mã 0 là toàn giải
+        self._group_codes = {}
+        self.moments = [RunningMoments(n_cols)]
+        self.sketches = [QuantileSketch(n_cols, sketch_k, self.rng)]
+        self.group_rows = [0]
+        self.is_integer = np.ones(n_cols, dtype=bool)  # Cột nguyên trong mọi khối (in như load_results)
+        self.top = {direction: TopKBuffer(k) for direction in DIRECTIONS}
+        self.group_top = {direction: TopKBuffer(k) for direction in DIRECTIONS}
+        # k ô thiếu đầu tiên của mỗi cột (và mỗi (cột, nhóm)): ứng viên top/bottom sau khi điền trung bình
+        self.missing = TopKBuffer(k)
+        self.group_missing = TopKBuffer(k)
+        self.labels = {}  # Hàng -> giá trị các cột hiển thị, chỉ cho hàng đang là ứng viên
+        self.n_rows = 0
+
+    def _codes(self, keys: pd.Series) -> np.ndarray:
+        """Mã nhóm ổn định giữa các khối (theo thứ tự xuất hiện), -1 cho giá trị thiếu."""
+        codes = np.full(len(keys), -1, dtype=np.int64)
+        inverse, uniques = pd.factorize(keys)
+        for name in uniques:
+            if name not in self._group_codes:
+                self._group_codes[name] = len(self.group_names)
+                self.group_names.append(name)
+                self.moments.append(RunningMoments(len(self.numeric_cols)))
+                self.sketches.append(QuantileSketch(len(self.numeric_cols), self.sketch_k, self.rng))
+                self.group_rows.append(0)
+        mapping = np.array([self._group_codes[name] for name in uniques], dtype=np.int64)
+        codes[inverse >= 0] = mapping[inverse[inverse >= 0]]
+        return codes
+
+    def _update_slot(self, slot: int, block: np.ndarray):
+        self.moments[slot].update(block)
+        self.group_rows[slot] += len(block)
+        self.sketches[slot].update(block)
+
+    def _push_rankings(self, matrix_t, offset, codes):
+        n_cols, n_rows = matrix_t.shape
+        ties = np.zeros(n_rows, dtype=np.int64)
+        missing_cols, missing_rows = np.nonzero(np.isnan(matrix_t))
+        rows, cols, _ = _first_k(missing_rows, missing_cols, np.zeros(len(missing_rows), dtype=np.int64), self.k)
+        self.missing.push((rows + offset).astype("float64"), rows + offset, cols, np.zeros(len(rows), dtype=np.int64))
+        if self.rank_by_group:
+            in_group = codes[missing_rows] >= 0
+            order = np.lexsort((missing_rows[in_group], codes[missing_rows[in_group]], missing_cols[in_group]))
+            rows, cols, groups = _first_k(missing_rows[in_group][order], missing_cols[in_group][order],
+                                          codes[missing_rows[in_group]][order], self.k)
+            self.group_missing.push((rows + offset).astype("float64"), rows + offset, cols, groups)
+        for direction in DIRECTIONS:
+            keys = -matrix_t if direction == "top" else matrix_t
+            rows, cols, groups = select_global(keys, self.k, ties)
+            self.top[direction].push(keys[cols, rows], rows + offset, cols, groups)
+            if self.rank_by_group:
+                rows, cols, groups = select_grouped(keys, self.k, ties, codes)
+                rows, cols, groups = _first_k(rows, cols, groups, self.k)
+                self.group_top[direction].push(keys[cols, rows], rows + offset, cols, groups)
+
+    def _candidate_rows(self) -> np.ndarray:
+        buffers = list(self.top.values()) + list(self.group_top.values()) + [self.missing, self.group_missing]
+        return np.unique(np.concatenate([buffer.rows for buffer in buffers]))
+
+    def update(self, chunk: pd.DataFrame):
+        """Thêm một khối hàng (theo thứ tự hàng của bảng đầy đủ)."""
+        numeric = chunk[self.numeric_cols]
+        self.is_integer &= np.array([pd.api.types.is_integer_dtype(dtype) for dtype in numeric.dtypes])
+        matrix = numeric.to_numpy(dtype="float64", na_value=np.nan)
+        codes = (self._codes(chunk[self.by]) if self.by in chunk.columns
+                 else np.full(len(chunk), -1, dtype=np.int64))
+        self._update_slot(0, matrix)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for block_rows in np.split(order, bounds):
+            if len(block_rows) and codes[block_rows[0]] >= 0:
+                self._update_slot(codes[block_rows[0]] + 1, matrix[block_rows])
+
+        offset = self.n_rows
+        if len(chunk):
+            self._push_rankings(np.ascontiguousarray(matrix.T), offset, codes)
+        self.n_rows += len(chunk)
+        display = [col for col in self.display_cols if col in chunk.columns]
+        candidates = self._candidate_rows()
+        new_rows = candidates[candidates >= offset]
+        values = chunk[display].to_numpy(dtype=object)
+        for row in new_rows:
+            self.labels[int(row)] = tuple(values[row - offset])  # Bản sao: không giữ cả mảng của khối
+        self.labels = {row: self.labels[row] for row in candidates.tolist()}
+        self._display = display
+
+    def _fill_counts(self, slot: int) -> np.ndarray:
+        return self.group_rows[slot] - self.moments[slot].count
+
+    def group_stats(self, aggregates, overall_label: str = OVERALL_LABEL) -> pd.DataFrame:
+        """Bảng như group_stats.group_stats trên dữ liệu đã điền trung bình: hàng toàn giải rồi từng nhóm theo tên."""
+        labels = [aggregate_label(name) for name in aggregates]
+        fill = self.moments[0].statistic("mean")
+        slots = [0] + [self._group_codes[name] + 1 for name in sorted(self.group_names)]
+        table = []
+        for slot in slots:
+            moments = self.moments[slot].copy()
+            fill_counts = self._fill_counts(slot)
+            moments.add_constant(fill, fill_counts)
+            stats = []
+            for name in aggregates:
+                q = parse_quantile(name)
+                if q is None:
+                    stats.append(moments.statistic(name))
+                    continue
+                stats.append(self.sketches[slot].quantile(q, fill, fill_counts))
+            table.append(np.stack(stats, axis=-1).reshape(-1))
+        columns = [f"{label} của {col}" for col in self.numeric_cols for label in labels]
+        result = pd.DataFrame(np.array(table).reshape(len(slots), len(columns)), columns=columns)
+        keys = pd.DataFrame({self.by: [overall_label] + sorted(self.group_names)}, dtype=object)
+        return pd.concat([keys, result], axis=1)
+
+    def _final_buffer(self, buffer: TopKBuffer, missing: TopKBuffer, direction: str) -> TopKBuffer:
+        """Ứng viên đã đọc cộng với các ô thiếu (mang giá trị trung bình toàn giải của cột), giữ k mỗi (cột, nhóm)."""
+        fill = self.moments[0].statistic("mean")
+        final = TopKBuffer(self.k)
+        final.push(buffer.keys, buffer.rows, buffer.cols, buffer.groups)
+        fill_keys = -fill[missing.cols] if direction == "top" else fill[missing.cols]
+        usable = ~np.isnan(fill_keys)
+        final.push(fill_keys[usable], missing.rows[usable], missing.cols[usable], missing.groups[usable])
+        return final
+
+    def rankings(self, by_group: bool = False):
+        """
+        Xếp hạng top/bottom k như ranking.rank_top_bottom trên dữ liệu đã điền trung bình.
+
+        Returns:
+            tuple: (bảng xếp hạng với cột Row trỏ vào bảng hiển thị, bảng hiển thị gồm các cột hiển thị và
+                giá trị của các ô được xếp hạng), dùng trực tiếp với ranking.write_rankings_text/write_rankings.
+        """
+        rows = np.array(sorted(self.labels), dtype=np.int64)
+        display = pd.DataFrame(np.array([self.labels[row] for row in rows.tolist()], dtype=object).reshape(
+            len(rows), len(self._display)), columns=self._display)
+        cell_values = np.full((len(rows), len(self.numeric_cols)), np.nan)
+        group_order = np.argsort(np.argsort(np.array(self.group_names, dtype=object))) if self.group_names else None
+        frames = []
+        buffers, missing = (self.group_top, self.group_missing) if by_group else (self.top, self.missing)
+        for direction in DIRECTIONS:
+            final = self._final_buffer(buffers[direction], missing, direction)
+            # Nhóm xếp theo tên (như pd.factorize(sort=True) của rank_top_bottom), không theo mã xuất hiện
+            sort_groups = group_order[final.groups] if by_group else final.groups
+            order = np.lexsort((final.rows, final.keys, sort_groups, final.cols))
+            cand_rows, cols, groups = final.rows[order], final.cols[order], final.groups[order]
+            values = -final.keys[order] if direction == "top" else final.keys[order]
+            positions = np.searchsorted(rows, cand_rows)
+            cell_values[positions, cols] = values
+            frames.append(pd.DataFrame({
+                "Stat": np.asarray(self.numeric_cols, dtype=object)[cols],
+                "Direction": direction,
+                "Group": np.asarray(self.group_names, dtype=object)[groups] if by_group else OVERALL_LABEL,
+                "Rank": rank_within(cols, groups),
+                "Row": positions,
+                "Value": values,
+            }, columns=RANKING_COLUMNS))
+        for j, col in enumerate(self.numeric_cols):
+            # Ô không được xếp hạng ở cột này để trống; cột nguyên dùng Int64 để vẫn in như số nguyên
+            display[col] = pd.Series(cell_values[:, j]).astype("Int64" if self.is_integer[j] else "float64")
+        return pd.concat(frames, ignore_index=True), display
+
+    @property
+    def sketch_values(self) -> int:
+        """Tổng số ô đang giữ trong mọi sketch."""
+        return sum(sketch.size for sketch in self.sketches) * len(self.numeric_cols)
+
+
+@traced()
+def stream_stats(results_path: str = RESULTS_CSV_PATH, memory_mb: float = DEFAULT_MEMORY_MB, by: str = "Squad",
+                 k: int = 3, rank_by_group: bool = False, sketch_k: int = SKETCH_K) -> StreamingStats:
+    """
+    Đọc `results_path` theo khối (kích thước theo `memory_mb`) và tích lũy mọi thống kê của P2.
+
+    Returns:
+        StreamingStats: Bộ tích lũy đã đọc hết dữ liệu (None nếu bảng trống).
+    """
+    chunk_rows = chunk_rows_for_budget(len(RESULTS_SCHEMA), memory_mb)
+    n_groups = count_groups(results_path, by, chunk_rows)
+    budget_k = sketch_k_for_budget(n_groups, len(RESULTS_SCHEMA), memory_mb, sketch_k)
+    if budget_k < sketch_k:
+        print(f"Giảm độ lớn sketch từ {sketch_k} xuống {budget_k} để {n_groups} nhóm vừa {memory_mb:g} MB "
+              f"(sai số hạng của median khoảng {1.7 / budget_k:.1%}).")
+    stats = None
+    n_chunks = 0
+    for chunk in iter_results(results_path, chunk_rows):
+        if stats is None:
+            numeric_cols = chunk.select_dtypes(include="number").columns.tolist()
+            stats = StreamingStats(numeric_cols, by=by, k=k, rank_by_group=rank_by_group, sketch_k=budget_k)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            stats.update(chunk)
+        n_chunks += 1
+    if stats is not None:
+        print(f"Đã đọc {stats.n_rows} hàng theo {n_chunks} khối (tối đa {chunk_rows} hàng/khối), "
+              f"sketch giữ {stats.sketch_values} giá trị.")
+    return stats
@@ -0,0 +1,129 @@
+import re
+
+import lxml.etree
+import pandas as pd
+
+from instrumentation import traced
+
+# Khoảng trắng thừa trong ô, thu gọn giống pd.read_html
+_WHITESPACE_RE = re.compile(r"[\r\n]+|\s{2,}")
+_CELL_TAGS = {"td", "th"}
+_SECTION_TAGS = {"thead", "tbody", "tfoot"}
+
+
+def find_table(html: str, table_id: str):
+    """
+    Tìm mã HTML của bảng `table_id` bằng một lần quét chuỗi, kể cả khi bảng nằm trong comment HTML
+    (fbref ẩn phần lớn bảng trong comment và chỉ hiện chúng bằng JavaScript).
+
+    Returns:
+        str: Đoạn "<table ...>...</table>", hoặc None nếu không có.
+    """
+    match = re.search(rf'<table\b[^>]*\bid=["\']{re.escape(table_id)}["\']', html)
+    if match is None:
+        return None
+    end = html.find("</table>", match.end())
+    return html[match.start():] if end < 0 else html[match.start():end + len("</table>")]
+
+
+def dedupe_columns(columns: list) -> list:
+    """Tên cột như pd.read_html: cột trùng tên thành "X.1", "X.2"..., cột không tên thành "Unnamed: i"."""
+    counts = {}
+    result = []
+    for i, col in enumerate(columns):
+        col = col or f"Unnamed: {i}"
+        n = counts.get(col, 0)
+        result.append(col if n == 0 else f"{col}.{n}")
+        counts[col] = n + 1
+    return result
+
+
+class _TableCollector:
+    """
+    Đích của trình phân tích lxml (kiểu SAX, không dựng cây): gom văn bản từng ô thành các hàng,
+    tách hàng trong thead khỏi hàng trong tbody/tfoot.
+    """
+
+    def __init__(self):
+        self.head_rows, self.body_rows, self.foot_rows = [], [], []
+        self._section = "tbody"
+        self._row = None
+        self._cell = None
+        self._colspan = 1
+        self._depth = 0  # Bảng lồng nhau: chỉ lấy hàng của bảng ngoài cùng
+
+    def start(self, tag, attrib):
+        if tag == "table":
+            self._depth += 1
+        elif self._depth != 1:
+            return
+        elif tag in _SECTION_TAGS:
+            self._section = tag
+        elif tag == "tr":
+            self._row = []
+        elif tag in _CELL_TAGS and self._row is not None:
+            self._cell = []
+            try:
+                self._colspan = max(1, int(attrib.get("colspan", 1)))
+            except ValueError:
+                self._colspan = 1
+
+    def end(self, tag):
+        if tag == "table":
+            self._depth -= 1
+        elif self._depth != 1:
+            return
+        elif tag in _CELL_TAGS and self._cell is not None:
+            text = _WHITESPACE_RE.sub(" ", "".join(self._cell).strip())
+            self._row.extend([text] * self._colspan)  # Ô gộp cột được lặp lại như pd.read_html
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            rows = {"thead": self.head_rows, "tfoot": self.foot_rows}.get(self._section, self.body_rows)
+            rows.append(self._row)
+            self._row = None
+        elif tag in _SECTION_TAGS:
+            self._section = "tbody"
+
+    def data(self, text):
+        if self._cell is not None:
+            self._cell.append(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.head_rows + self.body_rows + self.foot_rows
+
+
+def read_table(markup: str, header: int = 1) -> pd.DataFrame:
+    """
+    Phân tích một bảng HTML thẳng thành các cột (không dựng cây DOM, không phân tích lại lần hai),
+    cùng cách đặt tên cột và lấy văn bản ô như pd.read_html(header=`header`). Ô trống là NaN;
+    mọi cột giữ kiểu chuỗi (cleaning.clean_fbref_table gán kiểu số sau).
+    """
+    parser = lxml.etree.HTMLParser(target=_TableCollector())
+    rows = lxml.etree.fromstring(markup, parser)
+    if len(rows) <= header:
+        raise ValueError("Bảng không có hàng tiêu đề")
+    columns = dedupe_columns(rows[header])
+    width = len(columns)
+    data = [[] for _ in range(width)]
+    for row in rows[header + 1:]:
+        for i in range(width):
+            data[i].append((row[i] or None) if i < len(row) else None)
+    return pd.DataFrame(dict(zip(columns, data)))
+
+
+@traced()
+def extract_table(html: str, table_id: str, header: int = 1) -> pd.DataFrame:
+    """
+    Tách bảng `table_id` của một trang (kể cả trong comment) thành DataFrame, thay cho
+    BeautifulSoup trên cả trang rồi pd.read_html.
+
+    Raises:
+        ValueError: Trang không có bảng `table_id`.
+    """
+    markup = find_table(html, table_id)
+    if markup is None:
+        raise ValueError(f"Không tìm thấy bảng '{table_id}' trong trang")
+    return read_table(markup, header)
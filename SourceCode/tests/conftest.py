@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Các module nằm phẳng trong SourceCode (chạy pytest từ thư mục SourceCode hoặc thư mục gốc)
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+if SOURCE_DIR not in sys.path:
+    sys.path.insert(0, SOURCE_DIR)
@@ -0,0 +1,94 @@
+"""Làm sạch bảng fbref đã lưu (tests/fixtures): kết quả phải giống cách cũ làm từng ô."""
+import math
+import os
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cleaning import MISSING_STRINGS, TEXT_COLUMNS, clean_numeric, coerce_numeric_columns, drop_header_rows
+from conftest import FIXTURES_DIR
+
+
+def read_fixture(name="fbref_stats_standard.html"):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return pd.read_html(StringIO(f.read()), header=1)[0]
+
+
+def old_cell(value):
+    """Cách cũ: làm sạch và chuyển từng ô sang số."""
+    if not isinstance(value, str):
+        return float(value) if value is not None and not pd.isna(value) else math.nan
+    text = value.replace(",", "").replace("%", "").strip()
+    if text in MISSING_STRINGS:
+        return math.nan
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def old_drop_header_rows(df):
+    """Cách cũ: bỏ hàng có "Rk" ở cột Rk (tiêu đề lặp lại) và hàng không có tên cầu thủ (hàng phân cách)."""
+    df = df[~df["Rk"].astype(str).str.contains("Rk", na=False)]
+    return df[df.apply(lambda row: isinstance(row["Player"], str), axis=1)]
+
+
+@pytest.fixture
+def raw():
+    return read_fixture()
+
+
+def test_fixture_has_noise(raw):
+    # Bảo đảm tệp mẫu thật sự chứa các trường hợp cần kiểm tra
+    cells = raw.astype(str).to_numpy().ravel()
+    assert (raw["Rk"] == "Rk").sum() == 1
+    assert raw["Player"].isna().sum() == 1
+    assert "N/a" in cells
+    assert any("," in cell for cell in cells)
+    assert any(cell.startswith("+") for cell in cells)
+
+
+def test_drop_header_rows_matches_old_path(raw):
+    cleaned = drop_header_rows(raw)
+    expected = old_drop_header_rows(raw)
+    assert cleaned.index.tolist() == expected.index.tolist()
+    assert cleaned["Player"].tolist() == ["Max Aarons", "Tyler Adams", "Tosin Adarabioyo", "Simon Adingra",
+                                          "Ola Aina", "Rayan Aït-Nouri"]
+
+
+def test_clean_numeric_matches_old_cells(raw):
+    rows = drop_header_rows(raw)
+    for col in ("Min", "+/-", "Cmp%", "Gls.1"):
+        expected = [old_cell(value) for value in rows[col]]
+        np.testing.assert_array_equal(clean_numeric(rows[col]).to_numpy(dtype=float), expected)
+    assert clean_numeric(rows["Min"]).tolist() == [86, 2187, 1003, 1371, 3090, 3104]
+    assert clean_numeric(rows["+/-"]).tolist() == [-2, 7, 0, 3, 12, -9]
+
+
+def test_clean_numeric_keeps_numeric_column():
+    col = pd.Series([1.5, np.nan, 3.0], name="xG")
+    assert clean_numeric(col) is col
+
+
+def test_coerce_numeric_columns_matches_old_cells(raw):
+    rows = drop_header_rows(raw)
+    cleaned = coerce_numeric_columns(rows)
+    assert cleaned.index.tolist() == rows.index.tolist()
+    for col in rows.columns:
+        if col in TEXT_COLUMNS:
+            # Cột văn bản (Age "25-010", Pos "FW,MF") giữ nguyên
+            assert cleaned[col].tolist() == rows[col].tolist()
+            continue
+        assert pd.api.types.is_numeric_dtype(cleaned[col]), col
+        expected = [old_cell(value) for value in rows[col]]
+        np.testing.assert_array_equal(cleaned[col].to_numpy(dtype=float), expected, err_msg=col)
+    assert cleaned["Cmp%"].isna().tolist() == [False, False, True, False, False, True]
+
+
+def test_coerce_numeric_columns_leaves_mixed_text_column():
+    df = pd.DataFrame({"Note": ["12", "abc", None], "Gls": ["1", "N/a", "2"]}, dtype=object)
+    cleaned = coerce_numeric_columns(df)
+    assert cleaned["Note"].tolist() == ["12", "abc", None]
+    assert cleaned["Gls"].tolist()[::2] == [1, 2] and math.isnan(cleaned["Gls"].iloc[1])
@@ -0,0 +1,78 @@
+"""Bảng định danh cầu thủ của P4: kết quả giống so khớp mờ, cặp chỉ định thủ công được giữ nguyên."""
+import os
+
+import pandas as pd
+import pytest
+
+from fbref_fixtures import make_transfer_datasets
+from identity_map import IdentityMap
+from P4 import FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT, combine_data_and_add_values
+
+
+@pytest.fixture(scope="module")
+def datasets():
+    return make_transfer_datasets(200)
+
+
+@pytest.fixture
+def identity_map(tmp_path):
+    return IdentityMap(os.path.join(tmp_path, "identity.sqlite"))
+
+
+def combine(df_stats, df_scraped, identity_map=None):
+    return combine_data_and_add_values(df_stats.copy(), df_scraped, FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT,
+                                       identity_map)
+
+
+def test_cold_and_warm_runs_match_fuzzy_matching(datasets, identity_map):
+    df_stats, df_scraped = datasets
+    no_map = combine(df_stats, df_scraped)
+    cold = combine(df_stats, df_scraped, identity_map)
+    assert len(identity_map.entries()) == len(no_map)
+    warm = combine(df_stats, df_scraped, identity_map)
+    pd.testing.assert_frame_equal(no_map, cold)
+    pd.testing.assert_frame_equal(cold, warm)
+
+
+def test_new_players_are_matched_and_recorded(datasets, identity_map):
+    df_stats, df_scraped = datasets
+    combine(df_stats, df_scraped, identity_map)
+    changed = df_stats.copy()
+    changed.loc[:4, "Player"] = changed.loc[:4, "Player"] + " Jr"
+    pd.testing.assert_frame_equal(combine(changed, df_scraped), combine(changed, df_scraped, identity_map))
+    recorded = set(identity_map.entries()["Player"])
+    assert set(changed.loc[:4, "Player"]) <= recorded
+
+
+def test_manual_override_survives_fuzzy_record(datasets, identity_map):
+    df_stats, df_scraped = datasets
+    player, squad = df_stats.loc[0, "Player"], df_stats.loc[0, "Squad"]
+    target = df_scraped.loc[df_scraped["Player"] != player].iloc[-1]
+    identity_map.set_override(player, squad, target["Player"], target["Team"])
+    identity_map.record([player], [squad], ["Someone Else"], [None], [99.0])
+    entry = identity_map.lookup([player], [squad]).iloc[0]
+    assert (entry["Site_Player"], entry["Source"]) == (target["Player"], "manual")
+
+    combined = combine(df_stats, df_scraped, identity_map)
+    row = combined.loc[combined["Player"] == player].iloc[0]
+    assert row["Transfer_Value"] == target["Value_Scraped"]
+    # Lần chạy so khớp mờ (ghi lại mọi cặp) không ghi đè cặp thủ công
+    assert identity_map.lookup([player], [squad]).iloc[0]["Source"] == "manual"
+
+
+def test_stale_site_name_is_matched_again(datasets, identity_map):
+    df_stats, df_scraped = datasets
+    player, squad = df_stats.loc[0, "Player"], df_stats.loc[0, "Squad"]
+    identity_map.record([player], [squad], ["Retired Name"], [None], [100.0])
+    pd.testing.assert_frame_equal(combine(df_stats, df_scraped), combine(df_stats, df_scraped, identity_map))
+
+
+def test_fingerprint_tracks_only_manual_overrides(identity_map):
+    empty = identity_map.fingerprint()
+    identity_map.record(["A Player"], ["Arsenal"], ["A. Player"], ["Arsenal"], [95.0])
+    assert identity_map.fingerprint() == empty
+    identity_map.set_override("B Player", "Chelsea", "B. Player")
+    assert identity_map.fingerprint() != empty
+    assert identity_map.remove("B Player", "Chelsea")
+    assert not identity_map.remove("B Player", "Chelsea")
+    assert identity_map.fingerprint() == empty
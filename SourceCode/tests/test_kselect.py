@@ -0,0 +1,48 @@
+"""Chọn số cụm K với các dải k ngắn (một k, k = 1) cho mọi tiêu chí."""
+import numpy as np
+import pytest
+
+from kselect import elbow_k, select_k
+
+
+@pytest.fixture
+def X():
+    return np.random.default_rng(0).normal(size=(200, 4))
+
+
+def test_elbow_single_k():
+    assert elbow_k([4], [10.0]) == 4
+    with pytest.raises(ValueError):
+        elbow_k([], [])
+
+
+def test_inertia_single_k(X):
+    selection = select_k(X, [1], n_jobs=1)
+    assert selection.k == 1
+    assert selection.model.n_clusters == 1
+
+
+@pytest.mark.parametrize("score", ["silhouette", "calinski_harabasz"])
+def test_score_rejects_only_k_1(X, score):
+    with pytest.raises(ValueError, match="k >= 2"):
+        select_k(X, [1], score=score, n_jobs=1)
+
+
+@pytest.mark.parametrize("score", ["silhouette", "calinski_harabasz"])
+def test_score_ignores_k_1(X, score):
+    selection = select_k(X, [1, 2, 3], score=score, n_jobs=1)
+    assert selection.k in (2, 3)
+    assert np.isnan(selection.scores[0])
+
+
+def test_score_all_nan_falls_back_to_elbow():
+    X = np.ones((50, 3))  # Mọi điểm trùng nhau: mọi mô hình chỉ có một cụm
+    with pytest.warns(Warning):
+        selection = select_k(X, [1, 2], score="silhouette", n_jobs=1)
+    assert np.all(np.isnan(selection.scores))
+    assert selection.k == elbow_k(selection.ks, selection.inertia)
+
+
+def test_empty_k_range(X):
+    with pytest.raises(ValueError):
+        select_k(X, [], n_jobs=1)
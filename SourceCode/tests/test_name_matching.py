@@ -0,0 +1,76 @@
+"""So khớp tên cầu thủ của P4 phải cho cùng kết quả với process.extractOne trên toàn bộ danh sách."""
+import numpy as np
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz, process
+
+import name_matching
+from fbref_fixtures import make_transfer_datasets
+from name_matching import IncrementalMatcher, match_names
+from P4 import FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT, combine_data_and_add_values
+
+THRESHOLD = FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT
+
+
+@pytest.fixture(scope="module")
+def datasets():
+    return make_transfer_datasets(300, unmatched_share=0.1)
+
+
+def extract_one(query_names, choice_names, threshold):
+    """Cách cũ: process.extractOne cho từng tên; (-1, NaN) khi điểm dưới ngưỡng."""
+    best, scores = [], []
+    for name in query_names:
+        _, score, index = process.extractOne(name, choice_names, scorer=fuzz.token_sort_ratio)
+        best.append(index if score >= threshold else -1)
+        scores.append(score if score >= threshold else np.nan)
+    return np.asarray(best), np.asarray(scores)
+
+
+def old_combine(df_stats, df_scraped, threshold):
+    """Cách cũ của P4: iterrows + extractOne rồi lọc bảng giá trị theo tên khớp."""
+    df = df_stats.copy()
+    df["Transfer_Value"] = None
+    names = df_scraped["Player"].dropna().astype(str).tolist()
+    for index, row in df.iterrows():
+        best_name, score, _ = process.extractOne(str(row["Player"]), names, scorer=fuzz.token_sort_ratio)
+        if score >= threshold:
+            values = df_scraped.loc[df_scraped["Player"] == best_name, "Value_Scraped"]
+            if not values.empty:
+                df.at[index, "Transfer_Value"] = values.iloc[0]
+                df.at[index, "Match_Score"] = score
+    return df.dropna(subset=["Transfer_Value"]).reset_index(drop=True)
+
+
+def assert_same_matches(actual, expected):
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_allclose(actual[1], expected[1], atol=name_matching.SCORE_EPSILON)
+
+
+@pytest.mark.parametrize("blocking", [False, True])
+def test_match_names_matches_extract_one(datasets, monkeypatch, blocking):
+    df_stats, df_scraped = datasets
+    if blocking:
+        monkeypatch.setattr(name_matching, "BLOCKING_MIN_PAIRS", 0)  # Luôn chia khối rồi kiểm tra lại
+    queries, choices = df_stats["Player"].tolist(), df_scraped["Player"].tolist()
+    result = match_names(queries, choices, THRESHOLD, df_stats["Squad"].tolist(), df_scraped["Team"].tolist())
+    assert_same_matches(result, extract_one(queries, choices, THRESHOLD))
+    assert (result[0] >= 0).sum() > 0.8 * len(queries)
+
+
+def test_incremental_matcher_matches_whole_list(datasets):
+    df_stats, df_scraped = datasets
+    queries, choices = df_stats["Player"].tolist(), df_scraped["Player"].tolist()
+    bounds = [0, 70, 180, len(choices)]
+    matcher = IncrementalMatcher(queries, THRESHOLD)
+    for part in (2, 0, 1):  # Các phần đến không theo thứ tự
+        matcher.add(part, choices[bounds[part]:bounds[part + 1]])
+    result = matcher.result({part: bounds[part] for part in range(3)})
+    assert_same_matches(result, extract_one(queries, choices, THRESHOLD))
+
+
+def test_combine_matches_old_path(datasets):
+    df_stats, df_scraped = datasets
+    expected = old_combine(df_stats, df_scraped, THRESHOLD)
+    combined = combine_data_and_add_values(df_stats.copy(), df_scraped, THRESHOLD)
+    pd.testing.assert_frame_equal(expected, combined, check_dtype=False)
@@ -0,0 +1,115 @@
+"""Truy vấn trên chỉ mục dựng sẵn (player_query) phải cho cùng kết quả với lọc và tính bằng pandas."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fbref_fixtures import make_results_frame
+from player_query import PlayerIndex, PlayerQueryService
+from schema import load_results, write_results
+
+FILTERS = [{}, {"squad": "Squad 0003"}, {"pos": "MF"}, {"nation": "ENG"}, {"nation": "eng ENG", "pos": "DF"},
+           {"min_minutes": 1500}, {"squad": "Squad 0007", "pos": "FW", "min_minutes": 500}]
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    path = os.path.join(tmp_path_factory.mktemp("query"), "results.csv")
+    write_results(make_results_frame(400, n_squads=10), path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def df(csv_path):
+    return load_results(csv_path)
+
+
+@pytest.fixture(scope="module")
+def index(df):
+    return PlayerIndex(df)
+
+
+def pandas_filter(df, squad=None, pos=None, nation=None, min_minutes=None):
+    """Cách cũ: lọc DataFrame bằng pandas."""
+    mask = np.ones(len(df), dtype=bool)
+    if squad is not None:
+        mask &= (df["Squad"] == squad).to_numpy()
+    if pos is not None:
+        mask &= df["Pos"].str.split(",").apply(lambda parts: pos in parts).to_numpy()
+    if nation is not None:
+        mask &= df["Nation"].str.split().str[-1].eq(nation.split()[-1]).to_numpy()
+    if min_minutes is not None:
+        mask &= (df["Min"] >= min_minutes).fillna(False).to_numpy()
+    return df[mask]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_rows_match_pandas_filter(df, index, filters):
+    assert index.rows(**filters).tolist() == pandas_filter(df, **filters).index.tolist()
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("stat", ["xG", "Gls"])
+def test_top_matches_nlargest(df, index, filters, stat):
+    subset = pandas_filter(df, **filters).dropna(subset=[stat])  # nlargest chèn hàng NaN khi thiếu giá trị
+    top = index.top(stat, 10, **filters)
+    assert top["Player"].tolist() == subset.nlargest(10, stat, keep="first")["Player"].tolist()
+    assert top["Rank"].tolist() == list(range(1, len(top) + 1))
+    bottom = index.top(stat, 10, ascending=True, **filters)
+    assert bottom["Player"].tolist() == subset.nsmallest(10, stat, keep="first")["Player"].tolist()
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.5, 0.9, 1.0])
+def test_quantile_matches_pandas(df, index, filters, q):
+    expected = pandas_filter(df, **filters)["xG"].quantile(q)
+    assert index.quantile("xG", q, **filters) == pytest.approx(expected, rel=1e-12)
+
+
+def test_quantile_out_of_range(index):
+    for q in (-0.1, 1.5, 90):
+        with pytest.raises(ValueError, match=r"\[0, 1\]"):
+            index.quantile("xG", q)
+
+
+def test_quantile_of_empty_selection(index):
+    assert np.isnan(index.quantile("xG", 0.5, squad="Không có đội này"))
+
+
+@pytest.mark.parametrize("filters", [{}, {"squad": "Squad 0003"}, {"pos": "MF"}])
+def test_percentile_rank_matches_pandas(df, index, filters):
+    subset = pandas_filter(df, **filters)
+    values = subset["Gls"].dropna()
+    for player in subset.loc[values.index, "Player"].iloc[:20]:
+        value = values[subset.loc[values.index, "Player"] == player].iloc[0]
+        assert index.percentile_rank("Gls", player, **filters) == pytest.approx(100.0 * (values <= value).mean())
+
+
+def test_percentile_rank_errors(df, index):
+    with pytest.raises(KeyError):
+        index.percentile_rank("xG", "Không có cầu thủ này")
+    with pytest.raises(KeyError):
+        index.percentile_rank("Không có cột", df.loc[0, "Player"])
+    missing = df.loc[df["xG"].isna(), "Player"].iloc[0]
+    with pytest.raises(ValueError):
+        index.percentile_rank("xG", missing)
+
+
+def test_service_caches_and_reloads(tmp_path, df):
+    path = os.path.join(tmp_path, "results.csv")
+    write_results(df, path)
+    service = PlayerQueryService(path)
+    first = service.top("xG", 5)
+    first.loc[0, "Player"] = "đã sửa"  # Bản sao: không làm hỏng kết quả trong bộ đệm
+    again = service.top("xG", 5)
+    assert again["Player"].tolist() == PlayerIndex(df).top("xG", 5)["Player"].tolist()
+    assert service.cache_info().hits == 1 and service.loads == 1
+
+    changed = df.copy()
+    changed.loc[0, "xG"] = changed["xG"].max() + 1
+    write_results(changed, path)
+    os.utime(path, ns=(0, 10**18))  # Chắc chắn đổi thời điểm sửa dù ghi lại trong cùng một tích đồng hồ
+    assert service.top("xG", 1)["Player"].iloc[0] == changed.loc[0, "Player"]
+    assert service.loads == 2
+    pd.testing.assert_frame_equal(service.select(squad="Squad 0003"), PlayerIndex(changed).select(squad="Squad 0003"))
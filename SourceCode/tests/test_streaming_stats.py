@@ -0,0 +1,115 @@
+"""Chế độ theo khối của P2 so với chế độ thường (nạp cả bảng) trên một bảng nhỏ đọc thành nhiều khối."""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import P2
+from fbref_fixtures import make_results_frame
+from group_stats import group_stats
+from schema import load_results, write_results
+from streaming_stats import MIN_CHUNK_ROWS, stream_stats
+
+N_PLAYERS = 3 * MIN_CHUNK_ROWS + 123  # Ít nhất 4 khối với ngân sách nhỏ nhất
+MEMORY_MB = 1
+
+
+@pytest.fixture(scope="module")
+def source_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("p2_source")
+    write_results(make_results_frame(N_PLAYERS, n_squads=12), os.path.join(directory, "results.csv"))
+    return directory
+
+
+@pytest.fixture
+def work_dir(source_dir, tmp_path, monkeypatch):
+    """Thư mục chạy P2 (manifest trong .cache của thư mục này) với bản sao results.csv/results.feather."""
+    for name in os.listdir(source_dir):
+        shutil.copy(os.path.join(source_dir, name), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def read_text(name):
+    with open(name, encoding="utf-8") as f:
+        return f.read()
+
+
+def run_exact(**options):
+    P2.run_stats(histograms="off", **options)
+
+
+def run_chunked(memory_mb=MEMORY_MB, **options):
+    P2.run_stats_chunked(memory_mb=memory_mb, **options)
+
+
+def median_rank_error(values: np.ndarray, value: float) -> float:
+    """Khoảng cách (phần của số giá trị) từ 0.5 đến đoạn hạng mà `value` chiếm trong `values`."""
+    values = np.sort(values[~np.isnan(values)])
+    tolerance = 1e-9 * max(1.0, abs(value))
+    low = np.searchsorted(values, value - tolerance, "left") / len(values)
+    high = np.searchsorted(values, value + tolerance, "right") / len(values)
+    return max(0.0, low - 0.5, 0.5 - high)
+
+
+def test_chunked_outputs_match_exact(work_dir):
+    run_exact()
+    exact_top = read_text("top_3.txt"), read_text(P2.RANKINGS_OUTPUT)
+    exact = pd.read_csv("results2.csv")
+    results2 = read_text("results2.csv")
+
+    run_chunked(force=True)
+    assert (read_text("top_3.txt"), read_text(P2.RANKINGS_OUTPUT)) == exact_top
+    assert read_text("results2.csv") == results2  # Không ghi đè bảng chính xác
+    approx = pd.read_csv(P2.RESULTS2_APPROX_OUTPUT)
+    assert approx.columns.tolist() == exact.columns.tolist()
+    assert approx["Squad"].tolist() == exact["Squad"].tolist()
+    for label in ("Mean", "Std"):
+        cols = [col for col in exact.columns if col.startswith(label + " ")]
+        np.testing.assert_allclose(approx[cols], exact[cols], rtol=1e-9, equal_nan=True, err_msg=label)
+
+
+def test_chunked_medians_within_sketch_error(work_dir):
+    stats = stream_stats("results.csv", MEMORY_MB, k=P2.TOP_K)
+    assert stats.n_rows == N_PLAYERS
+    approx = stats.group_stats(("median",))
+    df = load_results("results.csv")
+    numeric = df[stats.numeric_cols].fillna(df[stats.numeric_cols].mean())
+    exact = group_stats(numeric.assign(Squad=df["Squad"]), stats.numeric_cols, aggregates=("median",))
+    assert approx["Squad"].tolist() == exact["Squad"].tolist()
+    bound = 2 * 1.7 / stats.sketch_k
+    for col in stats.numeric_cols:
+        value = approx.loc[0, f"Median của {col}"]
+        assert median_rank_error(numeric[col].to_numpy(dtype="float64"), value) <= bound, col
+
+
+def test_switching_mode_never_keeps_the_other_modes_output(work_dir, capsys):
+    run_exact()
+    results2 = read_text("results2.csv")
+    run_chunked()
+    assert "CẢNH BÁO" in capsys.readouterr().out
+    assert read_text("results2.csv") == results2
+
+    # Chế độ thường vẫn có results2.csv chính xác từ lần chạy trước: bỏ qua là đúng
+    run_exact()
+    assert read_text("results2.csv") == results2
+    os.remove("results2.csv")
+    run_exact()
+    assert read_text("results2.csv") == results2
+
+    # Cùng ngân sách: bỏ qua; đổi ngân sách: chạy lại
+    capsys.readouterr()
+    run_chunked()
+    assert "Bỏ qua việc tạo 'top_3.txt'" in capsys.readouterr().out
+    run_chunked(memory_mb=64)
+    assert f"Ghi tệp '{P2.RESULTS2_APPROX_OUTPUT}' hoàn tất" in capsys.readouterr().out
+
+
+
+def test_exact_mode_ignores_histogram_layout(work_dir, capsys):
+    run_exact()
+    capsys.readouterr()
+    run_exact(hist_layout="single")
+    assert "Bỏ qua việc tạo 'top_3.txt'" in capsys.readouterr().out
@@ -0,0 +1,70 @@
+"""Tách bảng fbref khỏi trang: sau cleaning.clean_fbref_table phải giống BeautifulSoup + pd.read_html."""
+import os
+from io import StringIO
+
+import pandas as pd
+import pytest
+from bs4 import BeautifulSoup
+
+from cleaning import clean_fbref_table
+from conftest import FIXTURES_DIR
+from fbref_fixtures import make_players, make_table_html
+from table_extract import extract_table, find_table
+
+TABLE_ID = "stats_standard"
+
+
+def old_parse_table(html, table_id):
+    """Cách cũ của P1: BeautifulSoup trên cả trang, rồi pd.read_html trên đoạn mã của bảng."""
+    table = BeautifulSoup(html, "html.parser").find("table", {"id": table_id})
+    return clean_fbref_table(pd.read_html(StringIO(str(table)), header=1)[0])
+
+
+def new_parse_table(html, table_id):
+    return clean_fbref_table(extract_table(html, table_id))
+
+
+def wrap_page(table, commented=False):
+    if commented:
+        table = f"\n<!--\n{table}\n-->\n"
+    return (f"<html><head><script>var x = '<table id=\"fake\">';</script></head><body>"
+            f"<div id='all_{TABLE_ID}'>{table}</div></body></html>")
+
+
+@pytest.fixture
+def saved_table():
+    with open(os.path.join(FIXTURES_DIR, "fbref_stats_standard.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def synthetic_table():
+    return make_table_html(TABLE_ID, make_players(60), header_every=25)
+
+
+def test_saved_page_matches_read_html(saved_table):
+    html = wrap_page(saved_table)
+    pd.testing.assert_frame_equal(old_parse_table(html, TABLE_ID), new_parse_table(html, TABLE_ID))
+    raw = extract_table(html, TABLE_ID)
+    assert raw.columns.tolist() == pd.read_html(StringIO(saved_table), header=1)[0].columns.tolist()
+
+
+def test_synthetic_page_matches_read_html(synthetic_table):
+    html = wrap_page(synthetic_table)
+    expected = old_parse_table(html, TABLE_ID)
+    assert len(expected) == 60
+    pd.testing.assert_frame_equal(expected, new_parse_table(html, TABLE_ID))
+
+
+@pytest.mark.parametrize("fixture", ["saved_table", "synthetic_table"])
+def test_commented_table_matches_visible_table(request, fixture):
+    table = request.getfixturevalue(fixture)
+    visible = new_parse_table(wrap_page(table), TABLE_ID)
+    pd.testing.assert_frame_equal(visible, new_parse_table(wrap_page(table, commented=True), TABLE_ID))
+
+
+def test_missing_table(saved_table):
+    html = wrap_page(saved_table)
+    assert find_table(html, "stats_keeper") is None
+    with pytest.raises(ValueError, match="stats_keeper"):
+        extract_table(html, "stats_keeper")
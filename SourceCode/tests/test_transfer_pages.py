@@ -0,0 +1,147 @@
+"""Quét các trang giá trị cầu thủ của P4 trên máy chủ giả lập cục bộ (trang footballtransfers giả)."""
+import os
+from urllib.parse import urlsplit
+
+import pandas as pd
+import pytest
+
+import P4
+from fbref_fixtures import make_players, make_transfer_page_html, serve_directory, write_transfer_pages
+from fetcher import HttpFetcher, url_to_filename
+
+BASE_URL = P4.BASE_URL_SCRAPING
+PER_PAGE = 25
+
+
+class RecordingFetcher:
+    """Bọc một fetcher và ghi lại các URL đã tải."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.urls = []
+
+    def fetch(self, url, table_id=None, table_class=None):
+        self.urls.append(url)
+        return self.inner.fetch(url, table_id=table_id, table_class=table_class)
+
+    def close(self):
+        self.inner.close()
+
+
+def page_path(directory, page):
+    return os.path.join(directory, url_to_filename(P4.page_url(BASE_URL, page)))
+
+
+def read_page(directory, page):
+    with open(page_path(directory, page), encoding="utf-8") as f:
+        return f.read()
+
+
+def write_unpaginated_pages(directory, page_sizes):
+    """Các trang không có thanh phân trang, trang thứ i có page_sizes[i - 1] cầu thủ."""
+    os.makedirs(directory, exist_ok=True)
+    players = make_players(sum(page_sizes))
+    start = 0
+    for page, size in enumerate(page_sizes, start=1):
+        html = make_transfer_page_html(players[start:start + size], page, 1, urlsplit(BASE_URL).path,
+                                       P4.PLAYER_TABLE_CLASS)
+        start += size
+        with open(page_path(directory, page), "w", encoding="utf-8") as f:
+            f.write(html)
+    return players
+
+
+@pytest.fixture
+def serve():
+    """Phục vụ một thư mục trang; trả về fetcher HTTP (không dùng trình duyệt dự phòng) ghi lại các URL."""
+    servers, fetchers = [], []
+
+    def start(directory):
+        server, source = serve_directory(directory)
+        servers.append(server)
+        fetcher = RecordingFetcher(HttpFetcher(base_url=source))
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield start
+    for fetcher in fetchers:
+        fetcher.close()
+    for server in servers:
+        server.shutdown()
+
+
+def collect(fetcher, **options):
+    pages = dict(P4.iter_player_pages(BASE_URL, fetcher, max_workers=2, **options))
+    return pages, pd.concat([pages[page] for page in sorted(pages)], ignore_index=True)
+
+
+def test_find_last_page(tmp_path):
+    write_transfer_pages(str(tmp_path), BASE_URL, P4.PLAYER_TABLE_CLASS, n_players=110)
+    assert P4.find_last_page(read_page(tmp_path, 1), BASE_URL) == 5
+    assert P4.find_last_page(read_page(tmp_path, 3), BASE_URL) == 5
+
+
+def test_find_last_page_without_pagination(tmp_path):
+    write_unpaginated_pages(str(tmp_path), [PER_PAGE])
+    assert P4.find_last_page(read_page(tmp_path, 1), BASE_URL) is None
+    assert P4.find_last_page("", BASE_URL) is None
+
+
+def test_parse_player_rows(tmp_path):
+    write_transfer_pages(str(tmp_path), BASE_URL, P4.PLAYER_TABLE_CLASS, n_players=30)
+    players = make_players(30)
+    rows = P4.parse_player_rows(read_page(tmp_path, 2), 2)
+    assert [row["Player"] for row in rows] == [player["Player"] for player in players[PER_PAGE:]]
+    assert [row["Team"] for row in rows] == [player["Squad"] for player in players[PER_PAGE:]]
+    assert all(row["Value_Scraped"].startswith("€") for row in rows)
+
+
+def test_parse_player_rows_empty_page(tmp_path):
+    write_unpaginated_pages(str(tmp_path), [0])
+    assert P4.parse_player_rows(read_page(tmp_path, 1), 1) == []
+    assert P4.parse_player_rows("", 1) == []
+    assert P4.parse_player_rows("<html><body><p>Maintenance</p></body></html>", 1) == []
+
+
+def test_iter_player_pages_uses_last_page(tmp_path, serve):
+    write_transfer_pages(str(tmp_path), BASE_URL, P4.PLAYER_TABLE_CLASS, n_players=110)
+    fetcher = serve(str(tmp_path))
+    pages, rows = collect(fetcher)
+    assert sorted(pages) == [1, 2, 3, 4, 5]
+    assert rows["Player"].tolist() == [player["Player"] for player in make_players(110)]
+    # Trang cuối đọc từ thanh phân trang: không tải trang nào sau trang 5
+    assert sorted(fetcher.urls) == sorted(P4.page_url(BASE_URL, page) for page in range(1, 6))
+
+
+def test_iter_player_pages_stops_at_empty_page(tmp_path, serve):
+    players = write_unpaginated_pages(str(tmp_path), [PER_PAGE, PER_PAGE, 0, PER_PAGE, PER_PAGE])
+    fetcher = serve(str(tmp_path))
+    pages, rows = collect(fetcher)
+    # Không có thanh phân trang: tải từng đợt 2 trang, đợt chứa trang 3 (trống) là đợt cuối
+    assert sorted(pages) == [1, 2, 3]
+    assert pages[3].empty
+    assert rows["Player"].tolist() == [player["Player"] for player in players[:2 * PER_PAGE]]
+    assert P4.page_url(BASE_URL, 4) not in fetcher.urls
+
+
+def test_iter_player_pages_skips_failed_page(tmp_path, serve):
+    write_transfer_pages(str(tmp_path), BASE_URL, P4.PLAYER_TABLE_CLASS, n_players=110)
+    os.remove(page_path(tmp_path, 3))  # Máy chủ trả 404 cho trang 3
+    fetcher = serve(str(tmp_path))
+    pages, rows = collect(fetcher)
+    assert sorted(pages) == [1, 2, 4, 5]
+    expected = [player["Player"] for i, player in enumerate(make_players(110)) if i // PER_PAGE != 2]
+    assert rows["Player"].tolist() == expected
+
+
+def test_streamed_combine_matches_whole_table(tmp_path, serve):
+    write_transfer_pages(str(tmp_path), BASE_URL, P4.PLAYER_TABLE_CLASS, n_players=110)
+    fetcher = serve(str(tmp_path))
+    whole = P4.scrape_player_values(BASE_URL, fetcher=fetcher, max_workers=2)
+    stats = pd.DataFrame(make_players(110))[["Player", "Squad"]].assign(Min=1500)
+    threshold = P4.FUZZY_MATCH_SIMILARITY_THRESHOLD_PERCENT
+    expected = P4.combine_data_and_add_values(stats.copy(), whole, threshold)
+    streamed = P4.combine_data_and_add_values(
+        stats.copy(), P4.iter_player_pages(BASE_URL, fetcher, max_workers=2), threshold)
+    assert len(expected) == 110
+    pd.testing.assert_frame_equal(expected, streamed)